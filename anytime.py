@@ -0,0 +1,246 @@
+"""Anytime routing under a latency deadline, by Anytime Repairing A* (ARA*).
+
+The search starts as A* with its heuristic inflated by a weight w > 1. That
+finds a route quickly, costing at most w times the best one. The search then
+lowers the weight and repairs itself rather than starting over. A city whose
+cost drops after it was expanded is not reopened but set aside as
+inconsistent. It is queued again, with the rest of the frontier, for the next
+pass. Each pass therefore redoes only the work the lower weight changes. The
+passes at weight 1 are plain A* and end with the best route.
+
+The route found is never more than bound times the best. The bound is the
+smaller of two values:
+
+- the weight of the last complete pass
+- cost / min(g + h), taken over the frontier and the inconsistent cities
+
+Every best route passes through one of those cities at its true cost. So when
+the heuristic is consistent, as the ALT landmark bounds are, the bound is
+proven. The straight-line heuristic is not always consistent on these data,
+and then the bound is only an estimate.
+"""
+from itertools import chain
+from math import inf
+from route_search import RouteSearch, route_node
+from time import perf_counter
+
+DEFAULT_WEIGHT = 2.5
+DEFAULT_WEIGHT_STEP = 0.5
+
+
+class AnytimeSearch(RouteSearch):
+    """
+    A class to hold the state of a single anytime route query.
+
+    solve() can be given a deadline. It then returns the best route found by
+    that time, with its suboptimality bound in self.bound. Calling solve()
+    again resumes the search, so each further call can only improve the
+    route and tighten the bound.
+    """
+
+    def __init__(self, road_network, *, start, end, opt, precompute_heuristic=None,
+                 landmarks=None, timed=False, weight=DEFAULT_WEIGHT,
+                 weight_step=DEFAULT_WEIGHT_STEP, max_frontier=None, max_closed=None):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork to search. It is not modified.
+            start: Name of the starting city or location.
+            end: Name of the ending city or location.
+            opt: Optimization method.
+            precompute_heuristic: See GoalHeuristic.
+            landmarks: See RouteSearch.
+            timed: See RouteSearch.
+            weight: Heuristic weight of the first pass, at least 1.
+            weight_step: How much each pass lowers the weight, at least. It
+                         drops straight to the bound already proven if that
+                         is lower.
+            max_frontier: If not None, stop for good once the frontier holds
+                         this many cities, keeping the best route so far.
+            max_closed: If not None, stop for good once a pass has expanded
+                         this many cities, keeping the best route so far.
+        """
+        if weight < 1:
+            raise ValueError(f'The weight must be at least 1, not {weight}.')
+        if weight_step <= 0:
+            raise ValueError(f'The weight step must be positive, not {weight_step}.')
+
+        super().__init__(road_network, start=start, end=end, opt=opt,
+                         precompute_heuristic=precompute_heuristic, landmarks=landmarks,
+                         timed=timed)
+        self.weight = weight
+        self.weight_step = weight_step
+        self.max_frontier = max_frontier
+        self.max_closed = max_closed
+
+        self.inconsistent = set()   # Closed cities whose gofs dropped in this pass.
+        self.best = None            # Best route found so far, type Node.
+        self.bound = inf            # Suboptimality bound of self.best.
+        self.pass_weight = inf      # Weight of the last complete pass.
+        self.started = False
+        self.finished = False       # The route is optimal, or there is none.
+        self.capped = False         # A size cap stopped the search.
+        self.improvements = list()  # (solve seconds, cost, bound) for each better route.
+        self.call_start = 0.00      # When the current solve() call began.
+
+    def priority(self, label):
+        """
+        Return the frontier priority of the given label: fofs with hofs
+        inflated by the current weight, then hofs.
+        :param label: type Label.
+        :return: tuple.
+        """
+        return label.gofs + self.weight * label.hofs, label.hofs
+
+    def reopen(self, city_id):
+        """
+        Set the given city, whose gofs just dropped, aside for the next pass
+        if it is closed.
+        :param city_id: city id in the road network.
+        """
+        if city_id in self.closed:
+            self.inconsistent.add(city_id)
+
+    def queue(self, successors):
+        """
+        Queue the given successors, except closed ones, which reopen() has
+        set aside.
+        :param successors: list of Label.
+        """
+        closed = self.closed
+        for successor in successors:
+            if successor.city not in closed and successor.gofs + successor.hofs < inf:
+                self.fringe.push(successor.city, self.priority(successor))
+
+    def solve(self, deadline=None):
+        """
+        Improve the route between the start city and end city until it is
+        proven optimal, the deadline passes or a size cap is reached. Counters
+        and timings, summed over every call, are left in self.stats.
+        :param deadline: Seconds this call may take, or None for no limit.
+        :return: type Node for the end city, the best route found so far, or
+                 None if there is none yet.
+        """
+        self.call_start = perf_counter()
+        stop = inf if deadline is None else self.call_start + deadline
+        try:
+            return self.search(stop)
+        finally:
+            self.update_stats().solve_seconds += perf_counter() - self.call_start
+
+    def search(self, stop):
+        """
+        Run passes for solve() until the route is optimal or the search
+        stops.
+        :param stop: perf_counter() value at which to stop.
+        :return: type Node for the end city, or None.
+        """
+        if not self.started:
+            self.started = True
+            start = self.begin()
+            if self.is_goal(start) or start.hofs == inf:
+                # There already, or the heuristic proves there is no route.
+                self.finished = True
+                self.record()
+                return self.best
+
+        while not (self.finished or self.capped):
+            if not self.improve_path(stop):
+                self.record()
+                break
+
+            self.pass_weight = self.weight
+            self.record()
+            # At weight 1 a pass that set cities aside is repeated, so that the
+            # last one reopens them as A* would.
+            if ((self.weight == 1.00 and not self.inconsistent) or self.best is None
+                    or self.bound <= 1.00):
+                self.finished = True
+                self.bound = 1.00 if self.best is not None else inf
+            else:
+                self.next_pass()
+
+        return self.best
+
+    def improve_path(self, stop):
+        """
+        Expand cities at the current weight until no queued city has a lower
+        priority than the end city's cost.
+        :param stop: perf_counter() value at which to stop.
+        :return: True if the pass completed, False if it stopped early.
+        """
+        fringe = self.fringe
+        labels = self.labels
+        closed = self.closed
+        max_frontier = inf if self.max_frontier is None else self.max_frontier
+        max_closed = inf if self.max_closed is None else self.max_closed
+
+        while fringe:
+            if perf_counter() >= stop:
+                return False
+            if len(fringe) >= max_frontier or len(closed) >= max_closed:
+                self.capped = True
+                return False
+
+            goal = labels.get(self.end_city)
+            _, (priority, _) = fringe.peek()
+            if goal is not None and goal.gofs <= priority:
+                break
+            self.expand(self.pop())
+
+        return True
+
+    def next_pass(self):
+        """
+        Lower the weight, and queue the frontier and the inconsistent cities
+        at their new priorities with nothing closed.
+        """
+        self.weight = max(1.00, min(self.weight - self.weight_step, self.bound))
+
+        labels = self.labels
+        cities = list(chain(self.fringe, self.inconsistent))
+        self.fringe.clear()
+        for city_id in cities:
+            self.fringe.push(city_id, self.priority(labels[city_id]))
+        self.inconsistent.clear()
+        self.closed.clear()
+
+    def lower_bound(self):
+        """
+        Return the smallest gofs + hofs over the frontier and the
+        inconsistent cities, a lower bound on the cost of the best route
+        whenever the heuristic is admissible, or inf if both are empty.
+        """
+        labels = self.labels
+        return min((labels[city_id].gofs + labels[city_id].hofs
+                    for city_id in chain(self.fringe, self.inconsistent)), default=inf)
+
+    def record(self):
+        """
+        Keep the route to the end city if it beats self.best, and update
+        self.bound.
+        """
+        goal = self.labels.get(self.end_city)
+        if goal is None:
+            return
+
+        if self.best is None or goal.gofs < self.best.gofs:
+            # Following parents can only find a route cheaper than goal.gofs,
+            # if cities on it improved later, so its cost is summed afresh.
+
+            cities, roads = self.path_to(goal)
+            self.best = route_node(self.road_network, cities, roads,
+                                   sum(self.costs[road_id] for road_id in roads))
+            improved = True
+        else:
+            improved = False
+
+        lowest = self.lower_bound()
+        if lowest >= self.best.gofs:
+            self.bound = 1.00
+        else:
+            self.bound = min(self.pass_weight, self.best.gofs / lowest if lowest > 0 else inf)
+
+        if improved:
+            seconds = self.stats.solve_seconds + perf_counter() - self.call_start
+            self.improvements.append((seconds, self.best.gofs, self.bound))
@@ -0,0 +1,168 @@
+"""Answer many route queries in one process or a pool of worker processes.
+
+Queries are read from CSV, with a header naming the start, end and, optionally,
+opt and algorithm columns, or from JSONL objects with the same keys. Results
+are written as one JSON object per query, in input order, as soon as each is
+known.
+
+The solver, and through it the road network, is created once before the pool
+starts. Forked workers inherit it, and its arrays are read-only views of the
+mapped graph cache, so the workers share one copy of the network in memory.
+Workers started some other way build their own solver from the same cache.
+"""
+from itertools import chain
+from multiprocessing import Pool
+from route_solver import RouteSolver
+import csv
+import json
+import os
+
+# The solver used by solve_query(). Set before the pool starts so forked
+# workers inherit it; other workers build one in init_worker().
+_solver = None
+
+QUERY_FIELDS = ('start', 'end', 'opt', 'algorithm')
+
+
+def query_error(query):
+    """
+    Return the reason the given query dict cannot be answered, or None. The
+    start, end and opt are required, and every field must be a string.
+    """
+    for field in QUERY_FIELDS:
+        value = query.get(field)
+        if value is not None and not isinstance(value, str):
+            return f'The {field} must be a string, not {value!r}.'
+    if not (query.get('start') and query.get('end') and query.get('opt')):
+        return 'A query needs a start, an end and an opt.'
+    return None
+
+
+def read_queries(f, *, format=None, opt=None, algorithm=None):
+    """
+    Yield a dict for each query read from the given text file. A line that
+    cannot be read yields a dict with an 'error' key, so that results stay
+    aligned with the input.
+    :param f: Text file of CSV or JSONL queries.
+    :param format: 'csv', 'jsonl', or None to tell from the first line.
+    :param opt: Optimization method for queries that do not name one.
+    :param algorithm: Algorithm for queries that do not name one.
+    """
+    first = f.readline()
+    lines = chain([first], f)   # Works for stdin, which cannot seek back.
+    if format is None:
+        format = 'jsonl' if first.lstrip().startswith('{') else 'csv'
+
+    if format == 'csv':
+        rows = csv.DictReader(lines)
+    else:
+        rows = (line for line in lines if line.strip())
+
+    for row in rows:
+        if format != 'csv':
+            try:
+                row = json.loads(row)
+            except ValueError as e:
+                yield {'error': f'Malformed query: {e}'}
+                continue
+            if not isinstance(row, dict):
+                yield {'error': f'Malformed query: {row!r}'}
+                continue
+
+        query = {'start': row.get('start'), 'end': row.get('end'),
+                 'opt': row.get('opt') or opt,
+                 'algorithm': row.get('algorithm') or algorithm}
+        error = query_error(query)
+        if error is not None:
+            query['error'] = error
+        yield query
+
+
+def init_worker(solver_options):
+    """
+    Create the shared solver unless this process already has one, e.g.
+    inherited from the parent.
+    """
+    global _solver
+    if _solver is None:
+        _solver = RouteSolver(**solver_options)
+
+
+def answer(query):
+    """
+    Return the result dict for the given query dict, answered by the shared
+    solver. A query that fails for any reason gets an 'error' key rather than
+    ending the batch.
+    """
+    record = {'start': query.get('start'), 'end': query.get('end'),
+              'opt': query.get('opt')}
+
+    if 'error' in query:
+        record['error'] = query['error']
+        return record
+
+    try:
+        if _solver.cache is None:
+            search = _solver.search(query['start'], query['end'], query['opt'],
+                                    query.get('algorithm'))
+            solution = search.solve()
+            record['expanded'] = search.expanded
+        else:
+            solution = _solver.route(query['start'], query['end'], query['opt'],
+                                     query.get('algorithm'))
+    except KeyError as e:
+        record['error'] = f'Unknown city {e.args[0]!r}.'
+        return record
+    except ValueError as e:
+        record['error'] = str(e)
+        return record
+    except Exception as e:
+        record['error'] = f'Query failed: {e!r}'
+        return record
+
+    if solution is None:
+        record['found'] = False
+    else:
+        record.update(found=True, cost=solution.gofs, segments=solution.data.segments,
+                      distance=solution.data.distance, hours=solution.data.hours,
+                      accidents=solution.data.accidents, path=solution.path)
+    return record
+
+
+def solve_query(query):
+    """
+    Return the JSON line for the given query dict.
+    """
+    return json.dumps(answer(query))
+
+
+def run_batch(queries, out, *, workers=1, chunksize=64, **solver_options):
+    """
+    Answer the given queries and write one JSON line per query to out, in
+    input order. Return the number of queries answered.
+    :param queries: Iterable of query dicts, as from read_queries().
+    :param out: Text file to write to.
+    :param workers: Number of processes, or None for one per CPU.
+    :param chunksize: Queries sent to a worker at a time.
+    :param solver_options: Passed to RouteSolver.
+    """
+    global _solver
+    _solver = RouteSolver(**solver_options)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    count = 0
+
+    try:
+        if workers <= 1:
+            for line in map(solve_query, queries):
+                out.write(line + '\n')
+                count += 1
+        else:
+            with Pool(workers, initializer=init_worker,
+                      initargs=(solver_options,)) as pool:
+                for line in pool.imap(solve_query, queries, chunksize):
+                    out.write(line + '\n')
+                    count += 1
+    finally:
+        _solver = None
+
+    return count
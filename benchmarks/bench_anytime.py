@@ -0,0 +1,80 @@
+"""Measure what the anytime search returns under a deadline: how often it has
+a route, the bound it proves and how far the route really is from the best.
+
+The queries are the cross-country pairs of bench_suite's corpus, the ones
+where plain A* is slowest. Each is first solved exactly with A* for
+reference.
+
+    $> python3 benchmarks/bench_anytime.py --deadlines 0.5 1 2 5 --queries 30
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_suite import build_corpus     # noqa: E402
+from road_network import OPTIMIZATIONS     # noqa: E402
+from route_solver import RouteSolver     # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark anytime search under deadlines.')
+    ap.add_argument('--deadlines', type=float, nargs='+', default=[0.5, 1, 2, 5],
+                    help='Deadlines in milliseconds (default: 0.5 1 2 5).')
+    ap.add_argument('--queries', type=int, default=30,
+                    help='Cross-country city pairs per optimization method (default: 30).')
+    ap.add_argument('--opt', choices=OPTIMIZATIONS, default='time')
+    ap.add_argument('--weight', type=float, default=None,
+                    help='Weight of the first pass (default: anytime.DEFAULT_WEIGHT).')
+    ap.add_argument('--no-landmarks', action='store_true',
+                    help='Use the straight-line heuristic, whose bounds are only estimates.')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    solver = RouteSolver(landmarks=False if args.no_landmarks else None)
+    pairs = build_corpus(args.seed, args.queries)['cross-country']
+    options = {} if args.weight is None else {'weight': args.weight}
+
+    exact = list()
+    latencies = list()
+    for start, end in pairs:
+        start_time = time.perf_counter()
+        solution = solver.search(start, end, args.opt, 'astar').solve()
+        latencies.append(time.perf_counter() - start_time)
+        exact.append(None if solution is None else solution.gofs)
+
+    print(f'{len(pairs)} cross-country queries, opt = {args.opt}, '
+          f'{"straight-line" if solver.landmarks is None else "ALT"} heuristic; '
+          f'A* median {statistics.median(latencies) * 1e3:.2f} ms, '
+          f'max {max(latencies) * 1e3:.2f} ms.')
+    print(f'  {"deadline":>10}{"routed":>9}{"finished":>10}{"mean bound":>12}'
+          f'{"max bound":>11}{"mean ratio":>12}{"max ratio":>11}{"violations":>12}')
+
+    for deadline in args.deadlines:
+        bounds = list()
+        ratios = list()
+        finished = violations = 0
+        for (start, end), best in zip(pairs, exact):
+            search = solver.search(start, end, args.opt, 'anytime', **options)
+            solution = search.solve(deadline / 1e3)
+            if solution is None or best is None:
+                continue
+            ratio = solution.gofs / best if best > 0 else 1.00
+            bounds.append(search.bound)
+            ratios.append(ratio)
+            finished += search.finished
+            violations += ratio > search.bound * (1 + 1e-9)
+
+        if not ratios:
+            print(f'  {deadline:>8.2f}ms{0:>9}')
+            continue
+        print(f'  {deadline:>8.2f}ms{len(ratios):>9}{finished:>10}'
+              f'{statistics.mean(bounds):>12.4f}{max(bounds):>11.4f}'
+              f'{statistics.mean(ratios):>12.4f}{max(ratios):>11.4f}{violations:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compare cities expanded and time taken by unidirectional and bidirectional
+A* on long queries, for every optimization method. With the ALT landmark
+table, the default, bidirectional search often expands more cities than A*;
+the change column is negative when it expands fewer.
+
+    $> python3 benchmarks/bench_bidirectional.py
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from road_network import OPTIMIZATIONS     # noqa: E402
+from route_solver import RouteSolver     # noqa: E402
+
+PAIRS = (
+    ('Bangor,_Maine', 'Little_Rock,_Arkansas'),
+    ('Seattle,_Washington', 'Miami,_Florida'),
+    ('San_Diego,_California', 'Boston,_Massachusetts'),
+    ('Madison,_Indiana', 'Chicago,_Illinois'),
+)
+
+
+def run(solver, start, end, opt, algorithm):
+    """Return (cities expanded, seconds, route cost) for one query.
+    """
+    start_time = time.perf_counter()
+    search = solver.search(start, end, opt, algorithm)
+    solution = search.solve()
+    seconds = time.perf_counter() - start_time
+    return search.expanded, seconds, None if solution is None else solution.gofs
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark bidirectional A*.')
+    ap.add_argument('--opt', choices=list(OPTIMIZATIONS), action='append',
+                    help='Optimization method (repeatable; default: all).')
+    args = ap.parse_args()
+
+    solver = RouteSolver()
+    total = {'astar': 0, 'bidirectional': 0}
+
+    print(f'{"opt":<10} {"query":<50} {"astar":>8} {"bidir":>8} {"change":>7}'
+          f' {"astar ms":>9} {"bidir ms":>9}')
+    for opt in args.opt or OPTIMIZATIONS:
+        for start, end in PAIRS:
+            astar = run(solver, start, end, opt, 'astar')
+            bidirectional = run(solver, start, end, opt, 'bidirectional')
+            total['astar'] += astar[0]
+            total['bidirectional'] += bidirectional[0]
+
+            change = bidirectional[0] / astar[0] - 1 if astar[0] else 0
+            print(f'{opt:<10} {start + " -> " + end:<50} {astar[0]:>8} '
+                  f'{bidirectional[0]:>8} {change:>+7.1%} {astar[1] * 1e3:>9.1f} '
+                  f'{bidirectional[1] * 1e3:>9.1f}')
+
+    difference = total['bidirectional'] - total['astar']
+    print(f'Total expanded: astar {total["astar"]}, bidirectional '
+          f'{total["bidirectional"]} ({abs(difference)} '
+          f'{"more" if difference > 0 else "fewer"}, '
+          f'{abs(difference) / total["astar"]:.1%}).')
+
+
+if __name__ == '__main__':
+    main()
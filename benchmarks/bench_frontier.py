@@ -0,0 +1,92 @@
+"""Measure push, pop and decrease-key throughput of the search frontier
+against queue.PriorityQueue, which the solver used before.
+
+    $> python3 benchmarks/bench_frontier.py --items 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from queue import PriorityQueue
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frontier import Frontier     # noqa: E402
+
+
+def timed(func, *args):
+    """Return the time in seconds taken by func(*args).
+    """
+    start_time = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start_time
+
+
+def frontier_push(frontier, priorities):
+    for item, priority in enumerate(priorities):
+        frontier.push(item, (priority, item))
+
+
+def frontier_decrease(frontier, priorities):
+    for item, priority in enumerate(priorities):
+        frontier.push(item, (priority / 2, item))
+
+
+def frontier_pop(frontier):
+    while frontier:
+        frontier.pop()
+
+
+def queue_push(queue, priorities):
+    for item, priority in enumerate(priorities):
+        queue.put((priority, item))
+
+
+def queue_decrease(queue, priorities):
+    # The old solver tested membership and removed entries with linear scans
+    # of queue.queue. Only a sample is timed, since the full run is quadratic.
+    for item, priority in enumerate(priorities):
+        entry = (priority, item)
+        if entry in queue.queue:
+            queue.queue.remove(entry)
+        queue.put((priority / 2, item))
+
+
+def queue_pop(queue):
+    while not queue.empty():
+        queue.get()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark the search frontier.')
+    ap.add_argument('--items', type=int, default=100000,
+                    help='Number of items to push and pop.')
+    ap.add_argument('--scan-sample', type=int, default=500,
+                    help='Number of PriorityQueue decrease-keys to time.')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    priorities = [rng.random() for _ in range(args.items)]
+    sample = priorities[:args.scan_sample]
+
+    frontier = Frontier()
+    results = [('Frontier', 'push', timed(frontier_push, frontier, priorities), args.items),
+               ('Frontier', 'decrease-key', timed(frontier_decrease, frontier, priorities), args.items),
+               ('Frontier', 'pop', timed(frontier_pop, frontier), args.items)]
+
+    queue = PriorityQueue()
+    results += [('PriorityQueue', 'push', timed(queue_push, queue, priorities), args.items),
+                ('PriorityQueue', 'decrease-key', timed(queue_decrease, queue, sample), len(sample))]
+    queued = queue.qsize()
+    results.append(('PriorityQueue', 'pop', timed(queue_pop, queue), queued))
+
+    print(f'Items: {args.items}')
+    for name, operation, seconds, count in results:
+        rate = count / seconds if seconds else float('inf')
+        print(f'  {name:<14} {operation:<13} {rate:>14,.0f} ops/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Time contraction hierarchy preprocessing for each optimization method,
+and report the shortcuts it adds and the size of the stored file.
+
+    $> python3 benchmarks/bench_hierarchy_build.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from hierarchy import WITNESS_LIMIT, contract, save_hierarchy     # noqa: E402
+from road_network import OPTIMIZATIONS     # noqa: E402
+import graph_cache     # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark contraction hierarchy preprocessing.')
+    ap.add_argument('--witness-limit', type=int, default=WITNESS_LIMIT,
+                    help=f'Cities a witness search may settle (default: {WITNESS_LIMIT}).')
+    args = ap.parse_args()
+
+    network = graph_cache.load_network()
+    print(f'{len(network)} cities, {network.road_count} roads, '
+          f'witness limit {args.witness_limit}')
+    print(f'{"opt":<10} {"seconds":>8} {"edges":>8} {"shortcuts":>10} {"bytes":>10}')
+
+    with tempfile.TemporaryDirectory() as directory:
+        for opt in OPTIMIZATIONS:
+            start_time = time.perf_counter()
+            hierarchy = contract(network, opt, witness_limit=args.witness_limit)
+            seconds = time.perf_counter() - start_time
+
+            path = os.path.join(directory, f'{opt}.bin')
+            save_hierarchy(hierarchy, path=path)
+
+            print(f'{opt:<10} {seconds:>8.2f} {len(hierarchy.edge_cost):>8} '
+                  f'{hierarchy.shortcut_count:>10} {os.path.getsize(path):>10}')
+
+
+if __name__ == '__main__':
+    main()
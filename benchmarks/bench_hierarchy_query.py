@@ -0,0 +1,70 @@
+"""Compare query latency and cities expanded by A* and by the contraction
+hierarchy search over random city pairs, and check that both find routes of
+the same cost.
+
+    $> python3 hierarchy.py
+    $> python3 benchmarks/bench_hierarchy_query.py --queries 200
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from road_network import OPTIMIZATIONS     # noqa: E402
+from route_solver import RouteSolver     # noqa: E402
+
+
+def run(solver, pairs, opt, algorithm):
+    """Return (cities expanded, seconds, list of route costs) over the pairs.
+    """
+    expanded = 0
+    costs = list()
+    start_time = time.perf_counter()
+    for start, end in pairs:
+        search = solver.search(start, end, opt, algorithm)
+        solution = search.solve()
+        expanded += search.expanded
+        costs.append(None if solution is None else solution.gofs)
+    return expanded, time.perf_counter() - start_time, costs
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark contraction hierarchy queries.')
+    ap.add_argument('--queries', type=int, default=200,
+                    help='Number of random city pairs per optimization method.')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    solver = RouteSolver()
+    network = solver.road_network
+    rng = random.Random(args.seed)
+    pairs = [tuple(network.names[city_id] for city_id in rng.sample(range(len(network)), 2))
+             for _ in range(args.queries)]
+
+    heuristic = 'ALT' if solver.landmarks is not None else 'straight-line'
+    print(f'{args.queries} queries per method, A* with the {heuristic} heuristic')
+    print(f'{"opt":<10} {"load ms":>8} {"astar":>8} {"ch":>6} {"astar ms":>9}'
+          f' {"ch ms":>7} {"speedup":>8} {"differ":>7}')
+    for opt in OPTIMIZATIONS:
+        start_time = time.perf_counter()
+        solver.hierarchy(opt)
+        load = time.perf_counter() - start_time
+
+        astar = run(solver, pairs, opt, 'astar')
+        ch = run(solver, pairs, opt, 'hierarchy')
+
+        differ = sum(1 for a, b in zip(astar[2], ch[2])
+                     if (a is None) != (b is None)
+                     or (a is not None and abs(a - b) > 1e-9 * max(1.00, a)))
+
+        print(f'{opt:<10} {load * 1e3:>8.1f} {astar[0]:>8} {ch[0]:>6} '
+              f'{astar[1] / args.queries * 1e3:>9.3f} '
+              f'{ch[1] / args.queries * 1e3:>7.3f} '
+              f'{astar[1] / max(ch[1], 1e-9):>7.1f}x {differ:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Time k-shortest routes for k = 3, 5 and 10 on cross-country city pairs,
+with spur searches guided by the shared tree from the end city and, with
+--naive, with plain Dijkstra spur searches as in textbook Yen.
+
+    $> python3 benchmarks/bench_k_shortest.py --pairs 10 --naive
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_suite import build_corpus     # noqa: E402
+from k_shortest import KShortestSearch     # noqa: E402
+import graph_cache     # noqa: E402
+
+KS = (3, 5, 10)
+
+
+def run(network, pairs, opt, k, reuse_tree):
+    """Return (seconds, spur searches, cities expanded, routes found) over the
+    pairs.
+    """
+    searches = expanded = routes = 0
+    start_time = time.perf_counter()
+    for start, end in pairs:
+        search = KShortestSearch(network, start=start, end=end, opt=opt, k=k,
+                                 reuse_tree=reuse_tree)
+        routes += len(search.solve())
+        searches += search.spur_searches
+        expanded += search.expanded
+    return time.perf_counter() - start_time, searches, expanded, routes
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark k-shortest routes.')
+    ap.add_argument('--pairs', type=int, default=10, help='Cross-country city pairs.')
+    ap.add_argument('--opt', default='time')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--naive', action='store_true',
+                    help='Also time plain Dijkstra spur searches (slow).')
+    args = ap.parse_args()
+
+    network = graph_cache.load_network()
+    pairs = build_corpus(args.seed, args.pairs)['cross-country']
+
+    print(f'{args.pairs} cross-country pairs, opt {args.opt}')
+    print(f'{"k":>3} {"ms/query":>9} {"spurs":>7} {"expanded":>9} {"routes":>7}'
+          + (f' {"naive ms":>9} {"expanded":>9} {"speedup":>8}' if args.naive else ''))
+    for k in KS:
+        seconds, searches, expanded, routes = run(network, pairs, args.opt, k, True)
+        line = (f'{k:>3} {seconds / len(pairs) * 1e3:>9.1f} {searches:>7} {expanded:>9} '
+                f'{routes:>7}')
+        if args.naive:
+            naive_seconds, _, naive_expanded, _ = run(network, pairs, args.opt, k, False)
+            line += (f' {naive_seconds / len(pairs) * 1e3:>9.1f} {naive_expanded:>9}'
+                     f' {naive_seconds / seconds:>7.1f}x')
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
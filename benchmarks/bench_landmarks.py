@@ -0,0 +1,68 @@
+"""Compare cities expanded and time taken by A* with the straight-line
+heuristic and with ALT landmark bounds, over random city pairs.
+
+    $> python3 landmarks.py
+    $> python3 benchmarks/bench_landmarks.py --queries 100
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from landmarks import load_landmarks     # noqa: E402
+from road_network import OPTIMIZATIONS     # noqa: E402
+from route_solver import RouteSolver     # noqa: E402
+
+
+def run(solver, pairs, opt):
+    """Return (cities expanded, seconds, list of route costs) over the pairs.
+    """
+    expanded = 0
+    costs = list()
+    start_time = time.perf_counter()
+    for start, end in pairs:
+        search = solver.search(start, end, opt)
+        solution = search.solve()
+        expanded += search.expanded
+        costs.append(None if solution is None else solution.gofs)
+    return expanded, time.perf_counter() - start_time, costs
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark ALT landmark heuristics.')
+    ap.add_argument('--queries', type=int, default=100,
+                    help='Number of random city pairs per optimization method.')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    straight_line = RouteSolver(landmarks=False)
+    table = load_landmarks(straight_line.road_network)
+    alt = RouteSolver(network=straight_line.road_network, landmarks=table)
+
+    network = straight_line.road_network
+    rng = random.Random(args.seed)
+    pairs = [tuple(network.names[city_id] for city_id in rng.sample(range(len(network)), 2))
+             for _ in range(args.queries)]
+
+    print(f'{len(table)} landmarks, {args.queries} queries per method')
+    print(f'{"opt":<10} {"straight":>10} {"alt":>8} {"ratio":>7} {"straight ms":>12}'
+          f' {"alt ms":>8} {"cheaper":>8}')
+    for opt in OPTIMIZATIONS:
+        base = run(straight_line, pairs, opt)
+        landmark = run(alt, pairs, opt)
+
+        # Routes the straight-line search returned above the ALT optimum.
+        cheaper = sum(1 for a, b in zip(landmark[2], base[2])
+                      if a is not None and b is not None and a < b - 1e-9)
+
+        print(f'{opt:<10} {base[0]:>10} {landmark[0]:>8} '
+              f'{base[0] / max(landmark[0], 1):>6.1f}x '
+              f'{base[1] / args.queries * 1e3:>12.2f} '
+              f'{landmark[1] / args.queries * 1e3:>8.2f} {cheaper:>8}')
+
+
+if __name__ == '__main__':
+    main()
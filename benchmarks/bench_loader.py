@@ -0,0 +1,140 @@
+"""Measure how peak memory grows with the size of the road segments file.
+
+Synthetic city GPS and road segments files of increasing size are written to a
+temporary directory. Each one is parsed by RoadNetwork.from_files() in a fresh
+process, which reports its peak RSS after the parse less its peak RSS before.
+A least-squares line through the results gives the memory cost per road.
+--readlines measures the same files read whole, with a RoadData object per
+row, for comparison.
+
+    $> python3 benchmarks/bench_loader.py --sizes 100000 200000 400000 800000
+"""
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from road_data import RoadData     # noqa: E402
+from road_network import RoadNetwork     # noqa: E402
+
+
+def peak_rss_kb():
+    """Return this process's peak RSS in KiB.
+    """
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == 'darwin' else 1)
+
+
+def write_dataset(directory, roads, seed=0):
+    """Write city GPS and road segments files with the given number of roads,
+    about two per city, and return their paths.
+    """
+    rng = random.Random(seed)
+    cities = max(2, roads // 2)
+    city_names = [f'City_{i},_State_{i % 50}' for i in range(cities)]
+    road_names = [f'US_{i}' for i in range(3000)]
+    gps_path = Path(directory, f'city-gps-{roads}.txt')
+    roads_path = Path(directory, f'road-segments-{roads}.txt')
+
+    with open(gps_path, 'w') as f:
+        for name in city_names:
+            if rng.random() < 0.8:  # The rest are junctions.
+                f.write(f'{name} {rng.uniform(25, 49):.6f} {rng.uniform(-124, -67):.6f}\n')
+
+    with open(roads_path, 'w') as f:
+        for _ in range(roads):
+            city1, city2 = rng.sample(city_names, 2)
+            f.write(f'{city1} {city2} {rng.randint(1, 100)} {rng.choice((25, 35, 45, 55, 65))} '
+                    f'{rng.choice(road_names)}\n')
+
+    return str(gps_path), str(roads_path)
+
+
+def load_readlines(gps_path, roads_path):
+    """Load the files the way the original solver did, for comparison.
+    """
+    with open(gps_path) as f:
+        cities = [line.split() for line in f.readlines()]
+    with open(roads_path) as f:
+        roads = list()
+        for line in f.readlines():
+            tokens = line.split()
+            roads.append(RoadData(tokens[4], city1=tokens[0], city2=tokens[1],
+                                  dist=int(tokens[2]), speed=int(tokens[3])))
+    return cities, roads
+
+
+def measure(loader, gps_path, roads_path):
+    """Load the given files in this process and print a JSON line with the
+    growth of peak RSS and the time taken.
+    """
+    before = peak_rss_kb()
+    start_time = time.perf_counter()
+    loaded = RoadNetwork.from_files(gps_path, roads_path) if loader == 'stream' \
+        else load_readlines(gps_path, roads_path)
+    seconds = time.perf_counter() - start_time
+    print(json.dumps({'rss_kb': peak_rss_kb() - before, 'seconds': seconds}))
+    return loaded
+
+
+def run(loader, gps_path, roads_path):
+    """Return the measure() result for the given files, from a fresh process.
+    """
+    output = subprocess.run([sys.executable, __file__, '--measure', loader, gps_path, roads_path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def fit(xs, ys):
+    """Return (slope, intercept) of the least-squares line through the points.
+    """
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+             / sum((x - mean_x) ** 2 for x in xs))
+    return slope, mean_y - slope * mean_x
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark loader memory against input size.')
+    ap.add_argument('--sizes', type=int, nargs='+', default=[100000, 200000, 400000, 800000],
+                    help='Road counts to generate (default: 100000 to 800000).')
+    ap.add_argument('--readlines', action='store_true',
+                    help='Also measure reading whole files into one object per row.')
+    ap.add_argument('--measure', nargs=3, metavar=('LOADER', 'GPS', 'ROADS'),
+                    help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    loaders = ['stream', 'readlines'] if args.readlines else ['stream']
+    results = {loader: list() for loader in loaders}
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f'{"roads":>10} {"loader":>10} {"peak RSS":>12} {"per road":>10} {"time":>9}')
+        for roads in args.sizes:
+            paths = write_dataset(directory, roads)
+            for loader in loaders:
+                result = run(loader, *paths)
+                results[loader].append(result['rss_kb'])
+                print(f'{roads:>10} {loader:>10} {result["rss_kb"] / 1024:>8.1f} MiB '
+                      f'{result["rss_kb"] * 1024 / roads:>6.0f} B {result["seconds"]:>8.2f}s')
+
+    if len(args.sizes) > 1:
+        for loader in loaders:
+            slope, intercept = fit(args.sizes, [kb * 1024 for kb in results[loader]])
+            print(f'{loader}: {slope:.0f} bytes per road + {intercept / 2 ** 20:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Compare nearest-city lookup with the k-d tree, one point at a time and in
+a NumPy batch, against a brute-force great-circle scan of every city.
+
+Points are drawn uniformly from the bounding box of the cities, with a fixed
+seed. Every method must return the same distances as the scan.
+
+    $> python3 benchmarks/bench_spatial_index.py --points 2000 --k 5
+"""
+import argparse
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from heuristics import great_circle     # noqa: E402
+from spatial_index import CityIndex, np     # noqa: E402
+import graph_cache     # noqa: E402
+
+
+def brute_force(network, cities, lat, lng, k):
+    """Return the k nearest cities to the point by scanning all of them.
+    """
+    return [(network.names[city_id], miles) for miles, city_id in heapq.nsmallest(
+        k, ((great_circle(lat, lng, network.lat[city_id], network.lng[city_id]), city_id)
+            for city_id in cities))]
+
+
+def timed(func):
+    """Return (result of func(), seconds taken).
+    """
+    start_time = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start_time
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark nearest-city lookup.')
+    ap.add_argument('--points', type=int, default=2000, help='Query points (default: 2000).')
+    ap.add_argument('--k', type=int, default=5, help='Cities per point (default: 5).')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    network = graph_cache.load_network()
+    cities = [city_id for city_id in range(len(network)) if network.has_coordinates(city_id)]
+    lats = [network.lat[city_id] for city_id in cities]
+    lngs = [network.lng[city_id] for city_id in cities]
+    rng = random.Random(args.seed)
+    points = [(rng.uniform(min(lats), max(lats)), rng.uniform(min(lngs), max(lngs)))
+              for _ in range(args.points)]
+
+    index, build = timed(lambda: CityIndex(network))
+    expected, scan = timed(lambda: [brute_force(network, cities, lat, lng, args.k)
+                                    for lat, lng in points])
+    tree, single = timed(lambda: [index.nearest(lat, lng, args.k) for lat, lng in points])
+    batch, vectorized = timed(lambda: index.nearest_many(points, args.k))
+
+    def distances(results):
+        return [[round(miles, 9) for _, miles in nearest] for nearest in results]
+
+    for name, results in (('tree', tree), ('batch', batch)):
+        if distances(results) != distances(expected):
+            sys.exit(f'{name} results differ from the brute-force scan.')
+
+    per_point = 1e6 / len(points)
+    print(f'{len(cities)} cities, {len(points)} points, k = {args.k}; '
+          f'tree built in {build * 1e3:.1f} ms.')
+    print(f'  brute-force scan:\t{scan * per_point:9.1f} us/point')
+    print(f'  k-d tree:\t\t{single * per_point:9.1f} us/point\t{scan / single:6.1f}x')
+    print(f'  batch ({"NumPy" if np is not None else "tree, no NumPy"}):'
+          f'\t{vectorized * per_point:9.1f} us/point\t{scan / vectorized:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
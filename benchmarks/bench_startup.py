@@ -0,0 +1,45 @@
+"""Compare network load time from the text files against mapping the
+compiled binary cache.
+
+    $> python3 benchmarks/bench_startup.py --repeat 20
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import graph_cache     # noqa: E402
+from road_network import RoadNetwork     # noqa: E402
+
+
+def best_of(repeat, func):
+    """Return the fastest of repeat timings of func(), in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark network startup.')
+    ap.add_argument('--repeat', type=int, default=20,
+                    help='Number of timings to take the best of.')
+    args = ap.parse_args()
+
+    graph_cache.load_network()  # Make sure the cache is current.
+
+    parse = best_of(args.repeat, RoadNetwork.from_files)
+    mapped = best_of(args.repeat, graph_cache.map_network)
+
+    print(f'  parse text files:\t{parse * 1e3:.2f} ms')
+    print(f'  map binary cache:\t{mapped * 1e3:.2f} ms')
+    print(f'  speedup:\t\t{parse / mapped:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
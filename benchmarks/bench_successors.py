@@ -0,0 +1,77 @@
+"""Compare the cost of finding a city's roads with the RoadNetwork index
+against the original scan over every (city1, city2) key in road_data.
+
+    $> python3 benchmarks/bench_successors.py --cities 500 --repeat 5
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from route_solver import RouteSolver     # noqa: E402
+
+
+def scan_neighbors(road_data, name):
+    """Return the neighbors of the named city by scanning every road, the
+    way RouteSolver.successors originally did.
+    """
+    neighbors = list()
+    for pair in road_data.keys():
+        if name in pair:
+            index = {0: 1, 1: 0}[pair.index(name)]
+            neighbors.append((pair[index], road_data[pair]))
+    return neighbors
+
+
+def indexed_neighbors(road_network, name):
+    """Return the neighbors of the named city from the RoadNetwork index.
+    """
+    names = road_network.names
+    return [(names[city_id], road_id)
+            for city_id, road_id in road_network.neighbors(road_network.ids[name])]
+
+
+def best_of(repeat, func, *args):
+    """Return the fastest of repeat timings of func(*args), in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Benchmark successor expansion.')
+    ap.add_argument('--cities', type=int, default=500,
+                    help='Number of cities to expand per timing.')
+    ap.add_argument('--repeat', type=int, default=5,
+                    help='Number of timings to take the best of.')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    solver = RouteSolver(start='Madison,_Indiana', end='Chicago,_Illinois',
+                         opt='distance')
+    rng = random.Random(args.seed)
+    names = rng.sample(solver.road_network.names, args.cities)
+
+    def run(neighbors_of, index):
+        for name in names:
+            neighbors_of(index, name)
+
+    scan = best_of(args.repeat, run, scan_neighbors, solver.build_road_data())
+    indexed = best_of(args.repeat, run, indexed_neighbors, solver.road_network)
+
+    print(f'Roads: {solver.road_network.road_count}, '
+          f'cities: {len(solver.road_network)}, expansions: {args.cities}')
+    print(f'  full scan:\t{scan / args.cities * 1e6:.2f} us/expansion')
+    print(f'  indexed:\t{indexed / args.cities * 1e6:.2f} us/expansion')
+    print(f'  speedup:\t{scan / indexed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
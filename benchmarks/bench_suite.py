@@ -0,0 +1,184 @@
+"""Reproducible route benchmark with regression comparison.
+
+The corpus is a seeded sample of city pairs from the GPS file, bucketed by
+great-circle distance, so every run on the same data asks the same queries.
+Each query is timed for every optimization method. The run records latency
+percentiles, expansions, load time and peak RSS to a JSON file. Comparing
+two files flags every metric that got worse by more than the threshold.
+
+    $> python3 benchmarks/bench_suite.py run --output before.json
+    ... change something ...
+    $> python3 benchmarks/bench_suite.py run --output after.json
+    $> python3 benchmarks/bench_suite.py compare before.json after.json --threshold 0.10
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from heuristics import great_circle     # noqa: E402
+from road_network import OPTIMIZATIONS     # noqa: E402
+from route_solver import ALGORITHMS, RouteSolver     # noqa: E402
+import config     # noqa: E402
+
+# Bucket name -> (lowest, highest) great-circle miles.
+BUCKETS = {'short': (0, 100), 'medium': (100, 600), 'cross-country': (1500, float('inf'))}
+
+# Metrics compared by compare(); larger is worse for all of them.
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_expanded')
+
+
+def read_gps_cities(path=config.CITY_GPS_PATH):
+    """Return a sorted list of (name, lat, lng) from the city GPS file.
+    """
+    cities = list()
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 3:
+                cities.append((fields[0], float(fields[1]), float(fields[2])))
+    return sorted(cities)
+
+
+def build_corpus(seed, per_bucket, path=config.CITY_GPS_PATH):
+    """Return bucket name -> list of [start, end] pairs, sampled with the given
+    seed until every bucket holds per_bucket pairs.
+    """
+    cities = read_gps_cities(path)
+    rng = random.Random(seed)
+    corpus = {bucket: list() for bucket in BUCKETS}
+
+    while any(len(pairs) < per_bucket for pairs in corpus.values()):
+        (start, lat1, lng1), (end, lat2, lng2) = rng.sample(cities, 2)
+        miles = great_circle(lat1, lng1, lat2, lng2)
+        for bucket, (lowest, highest) in BUCKETS.items():
+            if lowest <= miles < highest and len(corpus[bucket]) < per_bucket:
+                corpus[bucket].append([start, end])
+
+    return corpus
+
+
+def percentile(values, p):
+    """Return the nearest-rank p-th percentile (0 < p <= 100) of values.
+    """
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, -(-len(ordered) * p // 100) - 1))]
+
+
+def run(args):
+    load_start = time.perf_counter()
+    solver = RouteSolver(algorithm=args.algorithm)
+    load_seconds = time.perf_counter() - load_start
+
+    corpus = build_corpus(args.seed, args.per_bucket)
+    results = dict()
+
+    for opt in OPTIMIZATIONS:
+        for bucket, pairs in corpus.items():
+            latencies = list()
+            expanded = list()
+            for start, end in pairs:
+                best = float('inf')
+                for _ in range(args.repeat):
+                    query_start = time.perf_counter()
+                    search = solver.search(start, end, opt)
+                    search.solve()
+                    best = min(best, time.perf_counter() - query_start)
+                latencies.append(best * 1e3)
+                expanded.append(search.expanded)
+
+            key = f'{opt}/{bucket}'
+            results[key] = {
+                'queries': len(pairs),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'mean_expanded': sum(expanded) / len(expanded),
+            }
+            print(f'{key:<26} p50 {results[key]["p50_ms"]:8.3f} ms'
+                  f'  p99 {results[key]["p99_ms"]:8.3f} ms'
+                  f'  expanded {results[key]["mean_expanded"]:9.1f}')
+
+    report = {
+        'meta': {'seed': args.seed, 'per_bucket': args.per_bucket, 'repeat': args.repeat,
+                 'algorithm': args.algorithm, 'landmarks': solver.landmarks is not None,
+                 'python': platform.python_version(), 'machine': platform.machine(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'load_seconds': load_seconds,
+        # ru_maxrss is in KiB on Linux and bytes on macOS.
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                       // (1024 if sys.platform == 'darwin' else 1),
+        'corpus': corpus,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f'Load {load_seconds * 1e3:.1f} ms, peak RSS {report["peak_rss_kb"]} KiB; '
+          f'wrote {args.output}')
+
+
+def compare(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    if old['corpus'] != new['corpus']:
+        print('Warning: the two runs used different corpora.')
+
+    rows = [('load_seconds', old['load_seconds'], new['load_seconds']),
+            ('peak_rss_kb', old['peak_rss_kb'], new['peak_rss_kb'])]
+    for key in old['results']:
+        if key in new['results']:
+            for metric in METRICS:
+                rows.append((f'{key} {metric}', old['results'][key][metric],
+                             new['results'][key][metric]))
+
+    regressions = 0
+    print(f'{"metric":<40} {"old":>12} {"new":>12} {"change":>8}')
+    for name, before, after in rows:
+        change = (after - before) / before if before else 0.00
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'{name:<40} {before:>12.3f} {after:>12.3f} {change:>+7.1%}{flag}')
+
+    print(f'{regressions} regressions above {args.threshold:.0%}.')
+    return 1 if regressions else 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Reproducible route benchmark suite.')
+    commands = ap.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the corpus and write a result file.')
+    run_parser.add_argument('--output', required=True, help='Result JSON file.')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--per-bucket', type=int, default=50,
+                            help='City pairs per distance bucket (default: 50).')
+    run_parser.add_argument('--repeat', type=int, default=3,
+                            help='Runs per query; the fastest is kept (default: 3).')
+    run_parser.add_argument('--algorithm', default='astar', choices=list(ALGORITHMS))
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files.')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Flag changes worse than this fraction (default: 0.10).')
+
+    args = ap.parse_args()
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == '__main__':
+    main()
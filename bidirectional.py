@@ -0,0 +1,159 @@
+from math import inf
+from route_search import RouteSearch, route_node
+from time import perf_counter
+
+
+class AveragePotential:
+    """
+    A class to combine the heuristics toward both ends of a bidirectional
+    search into one potential, (toward(v) - away(v)) / 2.
+
+    The forward side uses toward = the end city's heuristic and away = the
+    start city's, and the backward side the reverse, so the two potentials
+    sum to zero at every city. This is what lets the two searches share one
+    stopping test.
+    """
+
+    def __init__(self, toward, away):
+        self.toward = toward
+        self.away = away
+
+    def __call__(self, city_id):
+        return (self.toward(city_id) - self.away(city_id)) / 2
+
+
+class BidirectionalSearch:
+    """
+    A class to search for a route from both ends at once.
+
+    Roads can be traveled in either direction, so the backward search is an
+    ordinary RouteSearch from the end city toward the start city. Whenever a
+    side reaches a city the other side has also reached, the two partial
+    paths form a candidate route, and the cheapest one is kept as mu.
+
+    Both sides use AveragePotential as their hofs. The forward and backward
+    potentials sum to zero at every city, so every route through a city v
+    costs at least top_forward + top_backward, the sum of the two smallest
+    fringe priorities. The search stops once that sum reaches mu. The test is
+    the same for every cost function. For segments, the potential is 0
+    everywhere except the two ends, so the search is a bidirectional
+    breadth-first search. The result is optimal whenever the underlying
+    heuristics are consistent.
+    """
+
+    def __init__(self, road_network, *, start, end, opt,
+                 precompute_heuristic=None, landmarks=None, timed=False):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork to search. It is not modified.
+            start: Name of the starting city or location.
+            end: Name of the ending city or location.
+            opt: Optimization method.
+            precompute_heuristic: See GoalHeuristic.
+            landmarks: See RouteSearch.
+            timed: See RouteSearch.
+        """
+        self.road_network = road_network
+        self.cost_function = opt
+        self.forward = RouteSearch(road_network, start=start, end=end, opt=opt,
+                                   precompute_heuristic=precompute_heuristic,
+                                   landmarks=landmarks, timed=timed)
+        self.backward = RouteSearch(road_network, start=end, end=start, opt=opt,
+                                    precompute_heuristic=precompute_heuristic,
+                                    landmarks=landmarks, timed=timed)
+
+        toward_end = self.forward.heuristic
+        toward_start = self.backward.heuristic
+        self.forward.heuristic = AveragePotential(toward_end, toward_start)
+        self.backward.heuristic = AveragePotential(toward_start, toward_end)
+
+        self.mu = inf  # Cost of the best route found so far.
+        self.meeting = None  # City id where the best route's halves meet.
+        self.solve_seconds = 0.00
+
+    @property
+    def expanded(self):
+        return self.forward.expanded + self.backward.expanded
+
+    @property
+    def stats(self):
+        """
+        Return the combined SearchStats of both sides.
+        """
+        stats = self.forward.update_stats() + self.backward.update_stats()
+        stats.solve_seconds = self.solve_seconds
+        return stats
+
+    def meet(self, label, other):
+        """
+        Update mu if the given label, from one side, and the other side's
+        label for the same city form a cheaper route.
+        :param label: type Label.
+        :param other: the RouteSearch for the other side.
+        """
+        other_label = other.labels.get(label.city)
+        if other_label is not None and label.gofs + other_label.gofs < self.mu:
+            self.mu = label.gofs + other_label.gofs
+            self.meeting = label.city
+
+    def solve(self):
+        """
+        Find the best route between the start city and end city or fail.
+        :return: type Node for the end city, or None.
+        """
+        solve_start = perf_counter()
+        try:
+            return self.search()
+        finally:
+            self.solve_seconds = perf_counter() - solve_start
+
+    def search(self):
+        """
+        Run the search for solve().
+        :return: type Node for the end city, or None.
+        """
+        forward = self.forward
+        backward = self.backward
+
+        self.meet(forward.begin(), backward)
+        self.meet(backward.begin(), forward)
+
+        while forward.fringe and backward.fringe:
+            _, (forward_fofs, _) = forward.fringe.peek()
+            _, (backward_fofs, _) = backward.fringe.peek()
+
+            if forward_fofs + backward_fofs >= self.mu:
+                break
+
+            # Expand the side whose best city looks cheaper, so the two
+            # searches grow toward each other at the same rate.
+
+            if forward_fofs <= backward_fofs:
+                side, other = forward, backward
+            else:
+                side, other = backward, forward
+
+            for successor in side.expand(side.pop()):
+                self.meet(successor, other)
+
+        if self.meeting is None:
+            # You can't get there from here.
+            return
+
+        return self.route_via(self.meeting)
+
+    def route_via(self, city_id):
+        """
+        Return the route from the start city through the given city to the
+        end city as a Node, as RouteSearch.route_to() does.
+        :param city_id: a city labeled by both sides.
+        :return: type Node.
+        """
+        cities, roads = self.forward.path_to(self.forward.labels[city_id])
+        back_cities, back_roads = self.backward.path_to(self.backward.labels[city_id])
+
+        cities += reversed(back_cities[:-1])
+        roads += reversed(back_roads)
+
+        return route_node(self.road_network, cities, roads, self.mu)
@@ -5,6 +5,10 @@ ROOT_PATH = str(Path(os.path.dirname(os.path.realpath(__file__)))).replace("\\",
 
 CITY_GPS_PATH = f'{ROOT_PATH}/city-gps.txt'
 ROAD_SEGMENTS_PATH = f'{ROOT_PATH}/road-segments.txt'
+GRAPH_CACHE_PATH = f'{ROOT_PATH}/road-network.bin'     # Compiled by graph_cache.py.
+LANDMARKS_PATH = f'{ROOT_PATH}/landmarks.bin'      # Computed by landmarks.py.
+HIERARCHY_PATH = f'{ROOT_PATH}/hierarchy-{{opt}}.bin'    # Computed by hierarchy.py, per opt.
+ROUTE_CACHE_PATH = f'{ROOT_PATH}/route-cache.sqlite'     # Written by route_cache.py.
 
 LOG_CONFIG = f'logging.ini'    # Config file for log files.
 LOG_PATH = f'{ROOT_PATH}/'  # Path for log files.
@@ -0,0 +1,102 @@
+from heapq import heappop, heappush
+from itertools import count
+
+REMOVED = object()  # Placeholder for the item of a stale heap entry.
+
+
+class Frontier:
+    """A class to represent the open set of a best-first search.
+
+    A binary min-heap (heapq) with an index from each queued item to its live
+    heap entry. Membership tests are O(1). Lowering the priority of a queued
+    item pushes a new entry and marks the old one stale, so decrease-key is
+    O(log n); stale entries are skipped when they reach the top of the heap.
+
+    Items must be hashable and each item is queued at most once. Entries with
+    equal priorities come out in the order they were pushed, so items
+    themselves are never compared.
+    """
+
+    def __init__(self):
+        """Initialize an instance of this class.
+        """
+        self.heap = list()          # [priority, sequence, item] entries.
+        self.entries = dict()       # item -> live heap entry.
+        self.sequence = count()     # Tie-breaker for equal priorities.
+        self.pushes = 0             # Entries pushed, including decrease-keys.
+        self.pops = 0               # Live items popped.
+        self.stale_pops = 0         # Stale entries skipped by pop().
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def __iter__(self):
+        """Yield the queued items, in no particular order.
+        """
+        return iter(self.entries)
+
+    def priority(self, item):
+        """Return the queued priority of the given item. Raise KeyError if the
+        item is not queued.
+        """
+        return self.entries[item][0]
+
+    def push(self, item, priority):
+        """Queue the given item, or lower its priority if it is already queued.
+        Return True if the frontier changed, False if the item was already
+        queued with a priority no greater than the given one.
+        """
+        entry = self.entries.get(item)
+
+        if entry is not None:
+            if not priority < entry[0]:
+                return False
+            entry[2] = REMOVED
+
+        entry = [priority, next(self.sequence), item]
+        self.entries[item] = entry
+        heappush(self.heap, entry)
+        self.pushes += 1
+        return True
+
+    def peek(self):
+        """Return (item, priority) for the lowest-priority item without
+        removing it. Raise IndexError if the frontier is empty.
+        """
+        heap = self.heap
+        while heap and heap[0][2] is REMOVED:
+            heappop(heap)
+            self.stale_pops += 1
+        priority, _, item = heap[0]
+        return item, priority
+
+    def pop(self):
+        """Remove and return (item, priority) for the lowest-priority item.
+        Raise IndexError if the frontier is empty.
+        """
+        heap = self.heap
+        while True:
+            priority, _, item = heappop(heap)
+            if item is not REMOVED:
+                del self.entries[item]
+                self.pops += 1
+                return item, priority
+            self.stale_pops += 1
+
+    def remove(self, item):
+        """Remove the given item from the frontier and return its priority.
+        Raise KeyError if the item is not queued.
+        """
+        entry = self.entries.pop(item)
+        entry[2] = REMOVED
+        return entry[0]
+
+    def clear(self):
+        self.heap.clear()
+        self.entries.clear()
@@ -0,0 +1,267 @@
+"""Compile the road network to a binary cache and map it back on later runs.
+
+The cache file holds a fixed header followed by the RoadNetwork arrays in the
+order listed in SECTIONS, each padded to an 8-byte boundary. Arrays are stored
+in native byte order so they can be used straight from the mapped file through
+memoryview casts, without copying.
+
+The name tables follow, and then the report of malformed lines that
+RoadNetwork.from_files() skipped, so that a network mapped from the cache
+carries the same report as the one that was compiled.
+
+The header records the size, mtime and SHA-256 of both source text files. A
+cache is used only if every file still has the same size and either the same
+mtime or the same hash, so editing either file triggers a rebuild.
+
+To compile the cache ahead of time:
+
+    $> python3 graph_cache.py
+"""
+from hashlib import sha256
+import json
+from road_network import RoadNetwork
+import argparse
+import mmap
+import os
+import struct
+import config
+
+MAGIC = b'RSGRAPH\x00'
+VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+
+# magic, version, byte order mark, city count, road count, then size, mtime
+# and SHA-256 of the city GPS file and of the road segments file, then the
+# number of malformed lines skipped and the number listed.
+HEADER = struct.Struct('=8sIIqqqq32sqq32sqq')
+
+# (attribute, typecode, length) for each array section. Lengths are resolved
+# by section_length().
+SECTIONS = (
+    ('lat', 'd', 'cities'),
+    ('lng', 'd', 'cities'),
+    ('offsets', 'q', 'cities+1'),
+    ('targets', 'i', 'adjacency'),
+    ('edges', 'i', 'adjacency'),
+    ('city1', 'i', 'roads'),
+    ('city2', 'i', 'roads'),
+    ('dist', 'd', 'roads'),
+    ('speed', 'd', 'roads'),
+    ('hours', 'd', 'roads'),
+    ('hours_bike', 'd', 'roads'),
+    ('accidents', 'd', 'roads'),
+)
+
+
+class StaleCacheError(Exception):
+    """Raised when a cache file is missing, malformed or out of date."""
+
+
+def file_hash(path):
+    """Return the SHA-256 digest of the given file.
+    """
+    digest = sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def fingerprint(path):
+    """Return (size, mtime in ns, SHA-256) for the given file.
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, file_hash(path)
+
+
+def is_unchanged(path, size, mtime_ns, digest):
+    """Return True if the given file still matches the recorded fingerprint.
+    The hash is only computed when the size matches but the mtime does not.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime_ns:
+        return True
+    return file_hash(path) == digest
+
+
+def section_length(length, *, cities, roads, adjacency):
+    return {'cities': cities, 'cities+1': cities + 1, 'roads': roads,
+            'adjacency': adjacency}[length]
+
+
+def padding(size):
+    return -size % 8
+
+
+def pack_names(names):
+    """Return (offsets, blob) for the given list of names encoded as UTF-8.
+    """
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = [0]
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    return struct.pack(f'={len(offsets)}q', *offsets), b''.join(encoded)
+
+
+def unpack_names(view, position, count):
+    """Return (names, next position) for a name table at the given position of
+    the mapped file. Raise ValueError if the table runs past the end of it.
+    """
+    if position + 8 * (count + 1) > len(view):
+        raise ValueError('truncated name offsets')
+    offsets = view[position:position + 8 * (count + 1)].cast('q')
+    position += 8 * (count + 1)
+    if not 0 <= offsets[count] <= len(view) - position:
+        raise ValueError('truncated names')
+    blob = view[position:position + offsets[count]]
+    names = [bytes(blob[offsets[i]:offsets[i + 1]]).decode('utf-8')
+             for i in range(count)]
+    position += offsets[count]
+    return names, position + padding(position)
+
+
+def compile_network(network=None, *, cache_path=None, city_gps_path=None,
+                    road_segments_path=None):
+    """Write the given network (parsed from the source files if None) to the
+    cache file and return the network.
+    """
+    cache_path = config.GRAPH_CACHE_PATH if cache_path is None else cache_path
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+
+    # Fingerprint the sources before parsing them, so that an edit made while
+    # compiling leaves a cache that is already stale rather than one that
+    # silently disagrees with the files.
+
+    gps_fingerprint = fingerprint(city_gps_path)
+    roads_fingerprint = fingerprint(road_segments_path)
+
+    if network is None:
+        network = RoadNetwork.from_files(city_gps_path, road_segments_path)
+
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(network),
+                            network.road_count, *gps_fingerprint,
+                            *roads_fingerprint, network.malformed_count,
+                            len(network.malformed)))
+
+        for attribute, typecode, _ in SECTIONS:
+            data = memoryview(getattr(network, attribute)).cast('B')
+            f.write(data)
+            f.write(bytes(padding(len(data))))
+
+        malformed = [json.dumps(list(entry)) for entry in network.malformed]
+        for names in (network.names, network.road_names, malformed):
+            offsets, blob = pack_names(names)
+            f.write(offsets)
+            f.write(blob)
+            f.write(bytes(padding(len(blob))))
+
+    os.replace(tmp_path, cache_path)
+    return network
+
+
+def map_network(*, cache_path=None, city_gps_path=None, road_segments_path=None):
+    """Return a RoadNetwork whose arrays are zero-copy views of the mapped
+    cache file. Raise StaleCacheError if the cache cannot be used.
+    """
+    cache_path = config.GRAPH_CACHE_PATH if cache_path is None else cache_path
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+
+    try:
+        with open(cache_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise StaleCacheError(f'Cannot map {cache_path}: {e}')
+
+    if len(mapped) < HEADER.size:
+        raise StaleCacheError(f'Truncated cache file {cache_path}.')
+
+    (magic, version, byte_order_mark, cities, roads, gps_size, gps_mtime,
+     gps_hash, roads_size, roads_mtime, roads_hash, malformed_count,
+     malformed_listed) = HEADER.unpack_from(mapped)
+
+    if (magic, version, byte_order_mark) != (MAGIC, VERSION, BYTE_ORDER_MARK):
+        raise StaleCacheError(f'Incompatible cache file {cache_path}.')
+    if not (is_unchanged(city_gps_path, gps_size, gps_mtime, gps_hash)
+            and is_unchanged(road_segments_path, roads_size, roads_mtime, roads_hash)):
+        raise StaleCacheError(f'Source files changed since {cache_path} was compiled.')
+
+    view = memoryview(mapped)
+    position = HEADER.size
+    arrays = dict()
+    adjacency = 0
+
+    try:
+        for attribute, typecode, length in SECTIONS:
+            count = section_length(length, cities=cities, roads=roads,
+                                   adjacency=adjacency)
+            size = struct.calcsize(typecode) * count
+            if count < 0 or position + size > len(mapped):
+                raise ValueError(f'truncated {attribute} section')
+            arrays[attribute] = view[position:position + size].cast(typecode)
+            position += size + padding(size)
+            if attribute == 'offsets':
+                adjacency = arrays['offsets'][cities]
+
+        names, position = unpack_names(view, position, cities)
+        road_names, position = unpack_names(view, position, roads)
+        malformed, position = unpack_names(view, position, malformed_listed)
+        if position != len(mapped):
+            raise ValueError(f'{len(mapped)} bytes, expected {position}')
+        malformed = [tuple(json.loads(entry)) for entry in malformed]
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise StaleCacheError(f'Malformed cache file {cache_path}: {e}')
+
+    network = RoadNetwork(names=names, road_names=road_names, **arrays)
+    network.malformed = malformed
+    network.malformed_count = malformed_count
+    return network
+
+
+def load_network(*, cache_path=None, city_gps_path=None, road_segments_path=None):
+    """Return the road network, mapping the binary cache if it is current and
+    recompiling it from the source files otherwise. If the cache cannot be
+    written, the network parsed from the source files is returned.
+    """
+    paths = {'cache_path': cache_path, 'city_gps_path': city_gps_path,
+             'road_segments_path': road_segments_path}
+    try:
+        return map_network(**paths)
+    except StaleCacheError:
+        pass
+
+    try:
+        compile_network(**paths)
+        return map_network(**paths)
+    except (OSError, StaleCacheError):
+        return RoadNetwork.from_files(city_gps_path, road_segments_path)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description='Compile the road network cache.')
+    ap.add_argument('--force', action='store_true',
+                    help='Recompile even if the cache is current.')
+    args = ap.parse_args()
+
+    try:
+        if args.force:
+            raise StaleCacheError('Forced recompile.')
+        network = map_network()
+        print(f'Cache is current: {config.GRAPH_CACHE_PATH}')
+    except StaleCacheError:
+        network = compile_network()
+        print(f'Compiled {config.GRAPH_CACHE_PATH}')
+    print(f'\t{len(network)} cities, {network.road_count} roads, '
+          f'{os.path.getsize(config.GRAPH_CACHE_PATH)} bytes')
+    if network.malformed_count:
+        print(f'\t{network.malformed_count} malformed lines skipped')
@@ -0,0 +1,234 @@
+"""Estimates of the remaining cost of a route, used as A* hofs values.
+
+NumPy is optional. When it is installed, GoalHeuristic computes the bound for
+every city in one vectorized pass before the search starts; without it the
+bound is computed per city as the search reaches it.
+"""
+from heapq import heappop, heappush
+from math import atan, cos, isnan, radians, sin, sqrt
+from road_data import bike_accidents, car_hours
+
+try:
+    import numpy as np
+except ImportError:     # pragma: no cover - exercised only without NumPy.
+    np = None
+
+EARTH_RADIUS = 3958.8  # miles
+
+
+def great_circle(lat1, lng1, lat2, lng2):
+    """
+    Return the distance in miles between the given coordinates, in degrees.
+    """
+
+    lat1 = radians(lat1)
+    lng1 = radians(lng1)
+    lat2 = radians(lat2)
+    lng2 = radians(lng2)
+    delta_lng = abs(lng2 - lng1)
+    cos_delta_lng = cos(delta_lng)
+    cos_lat1 = cos(lat1)
+    cos_lat2 = cos(lat2)
+    sin_delta_lng = sin(delta_lng)
+    sin_lat1 = sin(lat1)
+    sin_lat2 = sin(lat2)
+
+    term_a = (cos_lat2 * sin_delta_lng) ** 2
+    term_b = (cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_delta_lng) ** 2
+    term_c = sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * cos_delta_lng
+
+    try:
+        central_angle = atan(sqrt(term_a + term_b) / term_c)
+    except ZeroDivisionError:
+        return 0
+
+    return EARTH_RADIUS * central_angle
+
+
+def great_circle_to(lat, lng, lat2, lng2):
+    """
+    Return a NumPy array of the distance in miles from every (lat, lng) pair
+    in the given arrays to the given coordinates, computed with the same
+    formula as great_circle(). Entries for NaN coordinates are NaN.
+    """
+    lat1 = np.radians(np.asarray(lat, dtype=np.float64))
+    lng1 = np.radians(np.asarray(lng, dtype=np.float64))
+    lat2 = radians(lat2)
+    lng2 = radians(lng2)
+
+    delta_lng = np.abs(lng2 - lng1)
+    cos_delta_lng = np.cos(delta_lng)
+    cos_lat1 = np.cos(lat1)
+    sin_lat1 = np.sin(lat1)
+    cos_lat2 = cos(lat2)
+    sin_lat2 = sin(lat2)
+
+    term_a = (cos_lat2 * np.sin(delta_lng)) ** 2
+    term_b = (cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_delta_lng) ** 2
+    term_c = sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * cos_delta_lng
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        central_angle = np.arctan(np.sqrt(term_a + term_b) / term_c)
+    central_angle[term_c == 0] = 0
+
+    return EARTH_RADIUS * central_angle
+
+
+class GoalHeuristic:
+    """A class to estimate the cost of reaching one goal city, for one
+    optimization method.
+
+    Cities with a GPS row are bounded by their straight-line distance to the
+    goal, scaled to the objective by the cheapest possible cost per mile.
+    Junctions that appear only in the road segments file have no coordinates.
+    A junction v next to a city u over a road costing c still satisfies
+    cost(v) >= cost(u) - c, so its bound is the largest such value over its
+    neighbors, or 0.
+
+    These are lower bounds only where every road is at least as long as the
+    straight line between its cities. Some roads in this data are shorter, so
+    the estimates can overestimate, and a search guided by them alone may
+    return a costlier route than the best. The ALT bounds in landmarks.py hold
+    on any data.
+    """
+
+    def __init__(self, road_network, goal, opt, *, precompute=None):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork being searched.
+            goal: City id of the goal city.
+            opt: Optimization method.
+            precompute: If True, compute every city's value up front. If
+                         None, precompute only when NumPy is installed.
+        """
+        self.road_network = road_network
+        self.goal = goal
+        self.opt = opt
+        self.costs = road_network.costs(opt)
+
+        lowest_speed, highest_speed = road_network.speed_range()
+        self.per_mile = {'segments': 0.00, 'distance': 1.00,
+                         'time': car_hours(1, highest_speed),
+                         'accidents': bike_accidents(1, lowest_speed)}[opt]
+        self.goal_has_coordinates = road_network.has_coordinates(goal)
+
+        precompute = np is not None if precompute is None else precompute
+        self.values = self.precompute() if precompute else None
+
+    def __call__(self, city_id):
+        """
+        Return the hofs value of the given city.
+        :param city_id: city id in the road network.
+        :return: float.
+        """
+        if self.values is not None:
+            return self.values[city_id]
+
+        if city_id == self.goal:
+            return 0.00
+        if self.opt == 'segments':
+            return 1
+        if self.road_network.has_coordinates(city_id):
+            return self.straight_line(city_id)
+
+        # A junction: bound it through its neighbors with coordinates.
+
+        network = self.road_network
+        bound = 0.00
+        for neighbor_id, road_id in network.neighbors(city_id):
+            if network.has_coordinates(neighbor_id):
+                bound = max(bound, self.straight_line(neighbor_id) - self.costs[road_id])
+        return bound
+
+    def straight_line(self, city_id):
+        """
+        Return the straight-line bound for a city with coordinates.
+        """
+        if not self.goal_has_coordinates:
+            return 0.00
+
+        network = self.road_network
+        return self.per_mile * great_circle(network.lat[city_id], network.lng[city_id],
+                                            network.lat[self.goal], network.lng[self.goal])
+
+    def precompute(self):
+        """
+        Return a list of the hofs value of every city.
+        """
+        network = self.road_network
+        goal = self.goal
+
+        if self.opt == 'segments':
+            values = [1] * len(network)
+            values[goal] = 0.00
+            return values
+
+        if not self.goal_has_coordinates:
+            return [0.00] * len(network)
+
+        if np is not None:
+            miles = great_circle_to(network.lat, network.lng,
+                                    network.lat[goal], network.lng[goal])
+            values = miles * self.per_mile
+            values[goal] = 0.00
+            self.bound_junctions_vectorized(values)
+            return values.tolist()
+
+        values = [self.straight_line(city_id) for city_id in range(len(network))]
+        values[goal] = 0.00
+        self.bound_junctions(values)
+        return values
+
+    def bound_junctions_vectorized(self, values):
+        """
+        Replace the NaN values of junctions in the given NumPy array with
+        bounds propagated from their neighbors, as bound_junctions() does.
+        Each round relaxes every road incident to a junction at once; rounds
+        repeat until no bound improves, which takes as many rounds as the
+        longest chain of junctions.
+        """
+        junctions, neighbors, roads = (np.asarray(a, dtype=np.intp)
+                                       for a in self.road_network.junction_roads())
+        costs = np.asarray(self.costs, dtype=np.float64)[roads]
+
+        values[junctions] = 0.00
+        while True:
+            bounds = np.zeros(len(values))
+            np.maximum.at(bounds, junctions, values[neighbors] - costs)
+            improved = bounds[junctions] > values[junctions]
+            if not improved.any():
+                return
+            values[junctions] = np.maximum(values[junctions], bounds[junctions])
+
+    def bound_junctions(self, values):
+        """
+        Replace the NaN values of junctions in the given list with bounds
+        propagated from their neighbors. The largest bound is settled first,
+        so every junction gets the tightest value reachable through any chain
+        of junctions.
+        """
+        network = self.road_network
+        costs = self.costs
+        heap = list()
+
+        for city_id in network.junctions():
+            values[city_id] = 0.00
+            for neighbor_id, road_id in network.neighbors(city_id):
+                if not isnan(network.lat[neighbor_id]):
+                    bound = values[neighbor_id] - costs[road_id]
+                    if bound > values[city_id]:
+                        values[city_id] = bound
+            if values[city_id] > 0:
+                heappush(heap, (-values[city_id], city_id))
+
+        while heap:
+            bound, city_id = heappop(heap)
+            if -bound < values[city_id]:
+                continue
+            for neighbor_id, road_id in network.neighbors(city_id):
+                if isnan(network.lat[neighbor_id]):
+                    candidate = values[city_id] - costs[road_id]
+                    if candidate > values[neighbor_id]:
+                        values[neighbor_id] = candidate
+                        heappush(heap, (-candidate, neighbor_id))
@@ -0,0 +1,601 @@
+"""Contraction hierarchies for fast point-to-point queries.
+
+Preprocessing contracts the cities one at a time, cheapest first. Contracting
+a city removes it from the remaining graph. For every pair of its remaining
+neighbors whose cheapest connection ran through it, a shortcut edge is added
+that remembers the two edges it replaces. The order of contraction is the
+city's rank. A query then only needs to follow edges toward higher-ranked
+cities, searching upward from both ends until the two searches meet, and
+unpack the shortcuts it used into the original roads.
+
+A hierarchy is computed once per optimization method and written next to the
+data files, fingerprinted against them like the road network cache (see
+graph_cache.py). To build all of them ahead of time:
+
+    $> python3 hierarchy.py
+"""
+from array import array
+from graph_cache import StaleCacheError, fingerprint, is_unchanged, padding
+from heapq import heappop, heappush
+from math import inf
+from road_network import OPTIMIZATIONS
+from route_search import route_node
+from search_stats import SearchStats
+import argparse
+import mmap
+import os
+import struct
+import time
+import config
+import graph_cache
+
+MAGIC = b'RSHIER\x00\x00'
+VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+
+# Default number of cities a witness search may settle before giving up. A
+# search that gives up adds the shortcut anyway, which is never wrong, only
+# slightly wasteful.
+WITNESS_LIMIT = 60
+
+# magic, version, byte order mark, city count, road count, edge count, upward
+# edge count, then size, mtime and SHA-256 of the city GPS file and of the road
+# segments file.
+HEADER = struct.Struct('=8sIIqqqqqq32sqq32s')
+
+# (attribute, typecode, length) for each array section.
+SECTIONS = (
+    ('rank', 'i', 'cities'),
+    ('up_offsets', 'q', 'cities+1'),
+    ('up_targets', 'i', 'upward'),
+    ('up_edges', 'i', 'upward'),
+    ('edge_a', 'i', 'edges'),
+    ('edge_b', 'i', 'edges'),
+    ('edge_cost', 'd', 'edges'),
+    ('edge_road', 'i', 'edges'),
+    ('edge_first', 'i', 'edges'),
+    ('edge_second', 'i', 'edges'),
+)
+
+
+class ContractionHierarchy:
+    """A class to hold a contraction hierarchy for one optimization method.
+    """
+
+    def __init__(self, *, opt, road_count, rank, up_offsets, up_targets, up_edges,
+                 edge_a, edge_b, edge_cost, edge_road, edge_first, edge_second):
+        """Initialize an instance of this class.
+
+        Edges are undirected and connect edge_a and edge_b. An original edge
+        has the id of the cheapest road between its cities in edge_road and
+        -1 in edge_first and edge_second. A shortcut has -1 in edge_road;
+        edge_first is the replaced edge that touches edge_a and edge_second
+        the one that touches edge_b.
+
+        Parameters:
+            opt: Optimization method the costs are for.
+            road_count: Number of roads in the contracted network.
+            rank: City id -> contraction order.
+            up_offsets: CSR row offsets into up_targets and up_edges.
+            up_targets: Higher-ranked neighbor for each upward entry.
+            up_edges: Edge id for each upward entry.
+            edge_a, edge_b: Edge id -> the two cities it connects.
+            edge_cost: Edge id -> cost.
+            edge_road: Edge id -> road id, or -1 for a shortcut.
+            edge_first, edge_second: Edge id -> replaced edges, or -1.
+        """
+        self.opt = opt
+        self.road_count = road_count
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_edges = up_edges
+        self.edge_a = edge_a
+        self.edge_b = edge_b
+        self.edge_cost = edge_cost
+        self.edge_road = edge_road
+        self.edge_first = edge_first
+        self.edge_second = edge_second
+
+    def fits(self, road_network):
+        """Return True if the hierarchy has the given network's city and road
+        counts. A hierarchy of any other network gives wrong routes.
+        """
+        return (len(self.rank) == len(road_network)
+                and self.road_count == road_network.road_count)
+
+    @property
+    def shortcut_count(self):
+        return sum(1 for road_id in self.edge_road if road_id < 0)
+
+    def unpack(self, edge, city_id, cities, roads):
+        """
+        Append the cities and roads that the given edge covers, traveled
+        from the given end, to the given lists. city_id itself is not
+        appended.
+        """
+        edge_a = self.edge_a
+        edge_b = self.edge_b
+        stack = [(edge, city_id)]
+
+        while stack:
+            edge, city_id = stack.pop()
+            a = edge_a[edge]
+            b = edge_b[edge]
+
+            if self.edge_road[edge] >= 0:
+                roads.append(self.edge_road[edge])
+                cities.append(b if city_id == a else a)
+                continue
+
+            first = self.edge_first[edge]
+            second = self.edge_second[edge]
+            middle = edge_b[first] if edge_a[first] == a else edge_a[first]
+
+            # The stack is last in, first out, so the half that is traveled
+            # first goes on top.
+
+            if city_id == a:
+                stack.append((second, middle))
+                stack.append((first, a))
+            else:
+                stack.append((first, middle))
+                stack.append((second, b))
+
+
+class Contractor:
+    """A class to hold the state of one preprocessing run.
+    """
+
+    def __init__(self, road_network, opt, *, witness_limit=WITNESS_LIMIT):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork to contract. It is not modified.
+            opt: Optimization method.
+            witness_limit: See WITNESS_LIMIT.
+        """
+        self.road_network = road_network
+        self.opt = opt
+        self.witness_limit = witness_limit
+
+        self.edge_a = array('i')
+        self.edge_b = array('i')
+        self.edge_cost = array('d')
+        self.edge_road = array('i')
+        self.edge_first = array('i')
+        self.edge_second = array('i')
+
+        # City id -> {neighbor id: edge id} over the cities not yet
+        # contracted, keeping only the cheapest edge between two cities.
+        # Closed roads, whose cost is inf, are left out.
+
+        self.graph = [dict() for _ in range(len(road_network))]
+        self.deleted = [0] * len(road_network)   # Contracted neighbors.
+
+        costs = road_network.costs(opt)
+        for road_id in range(road_network.road_count):
+            a = road_network.city1[road_id]
+            b = road_network.city2[road_id]
+            if a != b and costs[road_id] < inf:
+                self.connect(a, b, costs[road_id], road_id, -1, -1)
+
+    def connect(self, a, b, cost, road_id, first, second):
+        """
+        Add an edge between a and b unless a cheaper one already exists.
+        """
+        existing = self.graph[a].get(b)
+        if existing is not None and self.edge_cost[existing] <= cost:
+            return
+
+        edge = len(self.edge_cost)
+        self.edge_a.append(a)
+        self.edge_b.append(b)
+        self.edge_cost.append(cost)
+        self.edge_road.append(road_id)
+        self.edge_first.append(first)
+        self.edge_second.append(second)
+        self.graph[a][b] = edge
+        self.graph[b][a] = edge
+
+    def witness_costs(self, source, excluded, max_cost, targets):
+        """
+        Return the costs found from source to nearby cities without passing
+        through excluded, searching no further than max_cost, all targets or
+        the witness limit.
+        """
+        graph = self.graph
+        edge_cost = self.edge_cost
+        best = {source: 0.00}
+        remaining = set(targets)
+        heap = [(0.00, source)]
+        settled = 0
+
+        while heap:
+            cost, city_id = heappop(heap)
+            if cost > best[city_id]:
+                continue
+            if cost > max_cost:
+                break
+            remaining.discard(city_id)
+            settled += 1
+            if not remaining or settled > self.witness_limit:
+                break
+
+            for neighbor_id, edge in graph[city_id].items():
+                if neighbor_id == excluded:
+                    continue
+                candidate = cost + edge_cost[edge]
+                if candidate < best.get(neighbor_id, inf):
+                    best[neighbor_id] = candidate
+                    heappush(heap, (candidate, neighbor_id))
+
+        return best
+
+    def shortcuts(self, city_id):
+        """
+        Return (a, b, cost, first edge, second edge) for every shortcut that
+        contracting the given city would need.
+        """
+        edge_cost = self.edge_cost
+        neighbors = list(self.graph[city_id].items())
+        shortcuts = list()
+
+        for i, (a, first) in enumerate(neighbors[:-1]):
+            others = neighbors[i + 1:]
+            max_cost = edge_cost[first] + max(edge_cost[edge] for _, edge in others)
+            witnesses = self.witness_costs(a, city_id, max_cost,
+                                           [b for b, _ in others])
+            for b, second in others:
+                cost = edge_cost[first] + edge_cost[second]
+                if witnesses.get(b, inf) > cost:
+                    shortcuts.append((a, b, cost, first, second))
+
+        return shortcuts
+
+    def priority(self, city_id):
+        """
+        Return the contraction priority of the given city: the edge
+        difference plus the number of contracted neighbors, which spreads
+        contraction evenly over the graph.
+        """
+        return (len(self.shortcuts(city_id)) - len(self.graph[city_id])
+                + self.deleted[city_id])
+
+    def run(self):
+        """
+        Contract every city and return the ContractionHierarchy.
+        """
+        city_count = len(self.road_network)
+        graph = self.graph
+        rank = array('i', [0]) * city_count
+        upward = [None] * city_count
+
+        heap = [(self.priority(city_id), city_id) for city_id in range(city_count)]
+        heap.sort()
+        order = 0
+
+        while heap:
+            _, city_id = heappop(heap)
+
+            # Priorities go stale as neighbors are contracted. Recompute
+            # lazily and put the city back if it is no longer the cheapest.
+
+            priority = self.priority(city_id)
+            if heap and priority > heap[0][0]:
+                heappush(heap, (priority, city_id))
+                continue
+
+            for a, b, cost, first, second in self.shortcuts(city_id):
+                self.connect(a, b, cost, -1, first, second)
+
+            rank[city_id] = order
+            order += 1
+            upward[city_id] = list(graph[city_id].items())
+
+            for neighbor_id in graph[city_id]:
+                del graph[neighbor_id][city_id]
+                self.deleted[neighbor_id] += 1
+            graph[city_id] = dict()
+
+        up_offsets = array('q', [0])
+        up_targets = array('i')
+        up_edges = array('i')
+        for city_id in range(city_count):
+            for neighbor_id, edge in upward[city_id]:
+                up_targets.append(neighbor_id)
+                up_edges.append(edge)
+            up_offsets.append(len(up_targets))
+
+        return ContractionHierarchy(
+            opt=self.opt, road_count=self.road_network.road_count, rank=rank, up_offsets=up_offsets,
+            up_targets=up_targets, up_edges=up_edges, edge_a=self.edge_a,
+            edge_b=self.edge_b, edge_cost=self.edge_cost,
+            edge_road=self.edge_road, edge_first=self.edge_first,
+            edge_second=self.edge_second)
+
+
+def contract(road_network, opt, *, witness_limit=WITNESS_LIMIT):
+    """
+    Return a ContractionHierarchy for the given network and optimization
+    method.
+    """
+    return Contractor(road_network, opt, witness_limit=witness_limit).run()
+
+
+def hierarchy_path(opt):
+    return config.HIERARCHY_PATH.format(opt=opt)
+
+
+def section_length(length, *, cities, edges, upward):
+    return {'cities': cities, 'cities+1': cities + 1, 'edges': edges,
+            'upward': upward}[length]
+
+
+def save_hierarchy(hierarchy, *, path=None, city_gps_path=None, road_segments_path=None):
+    """
+    Write the given hierarchy, with the fingerprints of the source files it
+    was computed from, to path.
+    """
+    path = hierarchy_path(hierarchy.opt) if path is None else path
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(hierarchy.rank),
+                            hierarchy.road_count, len(hierarchy.edge_cost), len(hierarchy.up_edges),
+                            *fingerprint(city_gps_path), *fingerprint(road_segments_path)))
+        for attribute, _, _ in SECTIONS:
+            data = memoryview(getattr(hierarchy, attribute)).cast('B')
+            f.write(data)
+            f.write(bytes(padding(len(data))))
+
+    os.replace(tmp_path, path)
+
+
+def map_hierarchy(opt, *, path=None, city_gps_path=None, road_segments_path=None):
+    """
+    Return a ContractionHierarchy whose arrays are zero-copy views of the
+    mapped file. Raise StaleCacheError if it is missing or out of date.
+    """
+    path = hierarchy_path(opt) if path is None else path
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise StaleCacheError(f'Cannot map {path}: {e}')
+
+    if len(mapped) < HEADER.size:
+        raise StaleCacheError(f'Truncated hierarchy file {path}.')
+
+    (magic, version, byte_order_mark, cities, roads, edges, upward, gps_size,
+     gps_mtime, gps_hash, roads_size, roads_mtime, roads_hash) = HEADER.unpack_from(mapped)
+
+    if (magic, version, byte_order_mark) != (MAGIC, VERSION, BYTE_ORDER_MARK):
+        raise StaleCacheError(f'Incompatible hierarchy file {path}.')
+    if not (is_unchanged(city_gps_path, gps_size, gps_mtime, gps_hash)
+            and is_unchanged(road_segments_path, roads_size, roads_mtime, roads_hash)):
+        raise StaleCacheError(f'Source files changed since {path} was computed.')
+
+    sizes = [struct.calcsize(typecode)
+             * section_length(length, cities=cities, edges=edges, upward=upward)
+             for _, typecode, length in SECTIONS]
+    expected = HEADER.size + sum(size + padding(size) for size in sizes)
+    if min(cities, edges, upward) < 0 or len(mapped) != expected:
+        raise StaleCacheError(f'Malformed hierarchy file {path}.')
+
+    view = memoryview(mapped)
+    position = HEADER.size
+    arrays = dict()
+
+    try:
+        for (attribute, typecode, _), size in zip(SECTIONS, sizes):
+            arrays[attribute] = view[position:position + size].cast(typecode)
+            position += size + padding(size)
+    except (TypeError, ValueError) as e:
+        raise StaleCacheError(f'Malformed hierarchy file {path}: {e}')
+
+    return ContractionHierarchy(opt=opt, road_count=roads, **arrays)
+
+
+def load_hierarchy(road_network, opt, **paths):
+    """
+    Return the stored hierarchy for the given optimization method, contracting
+    the network and saving the result first if there is no current one for the
+    given network. A stored hierarchy with other city or road counts is for
+    another network, and is replaced. If the result cannot be written, the
+    in-memory hierarchy is returned.
+    """
+    try:
+        hierarchy = map_hierarchy(opt, **paths)
+        if hierarchy.fits(road_network):
+            return hierarchy
+    except StaleCacheError:
+        pass
+
+    hierarchy = contract(road_network, opt)
+    try:
+        save_hierarchy(hierarchy, **paths)
+    except OSError:
+        pass
+    return hierarchy
+
+
+class HierarchySearch:
+    """
+    A class to answer a single route query on a ContractionHierarchy.
+
+    Both ends search upward only. Every optimal route has a highest-ranked
+    city, and each half of the route up to it can be made of upward edges, so
+    the two searches are certain to meet there. Each side stops once its
+    smallest queued cost reaches the best route found.
+    """
+
+    def __init__(self, road_network, *, start, end, opt, hierarchy, timed=False):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork the hierarchy was computed for.
+            start: Name of the starting city or location.
+            end: Name of the ending city or location.
+            opt: Optimization method.
+            hierarchy: A ContractionHierarchy for opt.
+            timed: Accepted for compatibility with the other searches. Only
+                         the whole search is timed; the upward searches
+                         are too short for per-step timers to be useful.
+        """
+        if opt not in OPTIMIZATIONS:
+            raise ValueError(f'Unknown optimization {opt!r}; expected one of '
+                             f'{", ".join(OPTIMIZATIONS)}.')
+        if hierarchy.opt != opt:
+            raise ValueError(f'Hierarchy is for {hierarchy.opt!r}, not {opt!r}.')
+
+        self.road_network = road_network
+        self.cost_function = opt
+        self.hierarchy = hierarchy
+        self.start_city = road_network.ids[start]
+        self.end_city = road_network.ids[end]
+        self.stats = SearchStats()
+
+    @property
+    def expanded(self):
+        return self.stats.expanded  # Number of cities settled by both sides.
+
+    def solve(self):
+        """
+        Find the best route between the start city and end city or fail.
+        Counters and timings are left in self.stats.
+        :return: type Node for the end city, or None.
+        """
+        solve_start = time.perf_counter()
+        try:
+            return self.search()
+        finally:
+            self.stats.solve_seconds = time.perf_counter() - solve_start
+
+    def search(self):
+        """
+        Run the search for solve().
+        :return: type Node for the end city, or None.
+        """
+        stats = self.stats
+        hierarchy = self.hierarchy
+        up_offsets = hierarchy.up_offsets
+        up_targets = hierarchy.up_targets
+        up_edges = hierarchy.up_edges
+        edge_cost = hierarchy.edge_cost
+
+        best = ({self.start_city: 0.00}, {self.end_city: 0.00})
+        parents = (dict(), dict())     # City id -> edge id used to reach it.
+        heaps = ([(0.00, self.start_city)], [(0.00, self.end_city)])
+        stats.pushes = 2
+        mu = inf
+        meeting = None
+
+        while heaps[0] or heaps[1]:
+            if not heaps[1] or (heaps[0] and heaps[0][0][0] <= heaps[1][0][0]):
+                side = 0
+            else:
+                side = 1
+
+            cost, city_id = heappop(heaps[side])
+            if cost > best[side][city_id]:
+                stats.stale_pops += 1
+                continue
+            stats.pops += 1
+            if cost >= mu:
+                heaps[side].clear()
+                continue
+            stats.expanded += 1
+            stats.peak_closed = stats.expanded
+
+            other = best[1 - side].get(city_id)
+            if other is not None and cost + other < mu:
+                mu = cost + other
+                meeting = city_id
+
+            # Stall on demand: roads are undirected, so an upward edge also
+            # leads down into this city. If a higher city this side has
+            # already reached gets here more cheaply that way, the city is
+            # not on a shortest upward path, and neither is anything it
+            # would reach.
+
+            reached = best[side]
+            row = range(up_offsets[city_id], up_offsets[city_id + 1])
+            if any(reached.get(up_targets[k], inf) + edge_cost[up_edges[k]] < cost
+                   for k in row):
+                continue
+
+            for k in row:
+                neighbor_id = up_targets[k]
+                candidate = cost + edge_cost[up_edges[k]]
+                if candidate < reached.get(neighbor_id, inf):
+                    reached[neighbor_id] = candidate
+                    parents[side][neighbor_id] = up_edges[k]
+                    heappush(heaps[side], (candidate, neighbor_id))
+                    stats.generated += 1
+                    stats.pushes += 1
+
+            stats.peak_frontier = max(stats.peak_frontier, len(heaps[0]) + len(heaps[1]))
+
+        if meeting is None:
+            # You can't get there from here.
+            return
+
+        return route_node(self.road_network, *self.unpack_route(meeting, parents), mu)
+
+    def unpack_route(self, meeting, parents):
+        """
+        Return (list of city ids, list of road ids) from the start city to
+        the end city through the meeting city.
+        """
+        hierarchy = self.hierarchy
+
+        def other_end(edge, city_id):
+            a = hierarchy.edge_a[edge]
+            return hierarchy.edge_b[edge] if a == city_id else a
+
+        # Edges from the meeting city back down to the start, then reversed.
+
+        forward = list()
+        city_id = meeting
+        while city_id != self.start_city:
+            edge = parents[0][city_id]
+            city_id = other_end(edge, city_id)
+            forward.append((edge, city_id))
+
+        cities = [self.start_city]
+        roads = list()
+        for edge, city_id in reversed(forward):
+            hierarchy.unpack(edge, city_id, cities, roads)
+
+        city_id = meeting
+        while city_id != self.end_city:
+            edge = parents[1][city_id]
+            hierarchy.unpack(edge, city_id, cities, roads)
+            city_id = other_end(edge, city_id)
+
+        return cities, roads
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description='Compute contraction hierarchies.')
+    ap.add_argument('--opt', choices=list(OPTIMIZATIONS), action='append',
+                    help='Optimization method (repeatable; default: all).')
+    args = ap.parse_args()
+
+    network = graph_cache.load_network()
+    for opt in args.opt or OPTIMIZATIONS:
+        start_time = time.perf_counter()
+        hierarchy = contract(network, opt)
+        save_hierarchy(hierarchy)
+        seconds = time.perf_counter() - start_time
+        print(f'Wrote {hierarchy_path(opt)} in {seconds:.1f} seconds.')
+        print(f'\t{len(hierarchy.edge_cost)} edges, {hierarchy.shortcut_count} '
+              f'shortcuts, {os.path.getsize(hierarchy_path(opt))} bytes')
@@ -0,0 +1,79 @@
+"""Isochrones: every city reachable from a starting city within a budget.
+
+Cities are yielded lazily, in order of increasing cost, as the search settles
+them, so a caller can stream a large reachable set without holding it. The
+search never queues a city beyond the budget and ends as soon as none is
+left within it.
+
+    $> python3 isochrone.py --start Bloomington,_Indiana --measure hours --budget 2
+    $> python3 isochrone.py --start Bloomington,_Indiana --measure dist --budget 100
+"""
+from shortest_paths import dijkstra
+import argparse
+import os
+import sys
+import graph_cache
+
+# Measure -> RoadNetwork.costs() key or road array, named as in RoadData.
+MEASURES = {
+    'segments': 'segments',     # Road segments.
+    'dist': 'distance',         # Miles.
+    'hours': 'time',            # Hours by car.
+    'hours_bike': None,         # Hours by bicycle.
+    'accidents': 'accidents',   # Expected cycling accidents.
+}
+
+
+def measure_costs(road_network, measure):
+    """
+    Return the road id -> cost array for the given measure, one of MEASURES.
+    """
+    if measure not in MEASURES:
+        raise ValueError(f'Unknown measure {measure!r}; expected one of '
+                         f'{", ".join(MEASURES)}.')
+    if MEASURES[measure] is None:
+        return road_network.hours_bike
+    return road_network.costs(MEASURES[measure])
+
+
+def reachable(road_network, start, budget, measure='hours'):
+    """
+    Yield (city name, cost, parent city name) for every city that can be
+    reached from the starting city at a cost of at most budget, cheapest
+    first. The starting city comes first, with cost 0 and parent None. Each
+    city's parent is the previous city on its cheapest route, so the results
+    form a tree.
+    :param road_network: type RoadNetwork.
+    :param start: Name of the starting city.
+    :param budget: Largest cost to include, in the units of the measure.
+    :param measure: One of MEASURES.
+    """
+    costs = measure_costs(road_network, measure)
+    source = road_network.ids[start]
+    if budget < 0:
+        return
+
+    names = road_network.names
+    for city_id, cost, parent, _ in dijkstra(road_network, source, costs, limit=budget):
+        yield names[city_id], cost, None if parent < 0 else names[parent]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description='List every city reachable within a budget, cheapest first, as'
+                    ' tab-separated city, cost and parent city.')
+    ap.add_argument('--start', required=True, help='The starting city.')
+    ap.add_argument('--budget', type=float, required=True,
+                    help='Largest cost to include, in the units of --measure.')
+    ap.add_argument('--measure', choices=list(MEASURES), default='hours',
+                    help='What the budget limits (default: hours).')
+    args = ap.parse_args()
+
+    network = graph_cache.load_network()
+    try:
+        for city, cost, parent in reachable(network, args.start, args.budget, args.measure):
+            sys.stdout.write(f'{city}\t{cost}\t{parent or ""}\n')
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader stopped early, e.g. `| head`. Nothing more to write.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
@@ -0,0 +1,256 @@
+"""K shortest loopless routes, by Yen's algorithm.
+
+The best route is found first. Each later route leaves one of the routes
+already found at some spur city, after following it exactly up to there, and
+then takes the best way on to the end city that avoids the cities before the
+spur and every road already used to leave the spur after the same root.
+
+One Dijkstra search from the end city is shared by all of these spur searches.
+It gives the exact cost from every city to the end city on the whole network,
+and the tree of best routes there.
+
+- When the tree route from a spur city avoids the banned cities and roads, it
+  is the spur route, and no search is needed.
+- Otherwise the spur search is an A* search that uses the tree costs as its
+  heuristic. Banning cities and roads can only raise costs, so the heuristic
+  stays admissible and consistent, and the search goes almost straight to
+  the end city.
+
+Every spur search reuses the same Frontier and label dict.
+"""
+from frontier import Frontier
+from heapq import heappop, heappush
+from itertools import count
+from math import inf
+from road_network import OPTIMIZATIONS
+from route_search import route_node
+from search_stats import SearchStats
+from shortest_paths import dijkstra
+from time import perf_counter
+
+
+class KShortestSearch:
+    """
+    A class to hold the state of a single k-shortest-routes query.
+    """
+
+    def __init__(self, road_network, *, start, end, opt, k, reuse_tree=True):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork to search. It is not modified.
+            start: Name of the starting city or location.
+            end: Name of the ending city or location.
+            opt: Optimization method the routes are ranked by.
+            k: Most routes to return.
+            reuse_tree: If False, every spur search is a plain Dijkstra
+                         search, as in textbook Yen. For benchmarks.
+        """
+        if opt not in OPTIMIZATIONS:
+            raise ValueError(f'Unknown optimization {opt!r}; expected one of '
+                             f'{", ".join(OPTIMIZATIONS)}.')
+        if k < 1:
+            raise ValueError(f'k must be at least 1, not {k}.')
+
+        self.road_network = road_network
+        self.cost_function = opt
+        self.costs = road_network.costs(opt)
+        self.start_city = road_network.ids[start]
+        self.end_city = road_network.ids[end]
+        self.k = k
+        self.reuse_tree = reuse_tree
+
+        self.to_end = None      # City id -> cost to the end city.
+        self.tree = None        # City id -> road toward the end city, or -1.
+        self.fringe = Frontier()
+        self.labels = dict()    # City id -> (gofs, parent, road), per spur search.
+        self.stats = SearchStats()
+        self.spur_searches = 0  # Spur routes that needed a search.
+        self.tree_spurs = 0     # Spur routes read off the tree.
+
+    @property
+    def expanded(self):
+        return self.stats.expanded
+
+    def other_end(self, road_id, city_id):
+        city1 = self.road_network.city1[road_id]
+        return self.road_network.city2[road_id] if city1 == city_id else city1
+
+    def build_tree(self):
+        """
+        Compute self.to_end and self.tree with one search from the end city.
+        """
+        network = self.road_network
+        self.to_end = [inf] * len(network)
+        self.tree = [-1] * len(network)
+        for city_id, cost, _, road_id in dijkstra(network, self.end_city, self.costs):
+            self.to_end[city_id] = cost
+            self.tree[city_id] = road_id
+
+    def route_cost(self, roads):
+        """
+        Return the cost of the given roads, summed from the start of the
+        route. Every route's cost is summed this way, so that routes of equal
+        cost compare equal however they were found.
+        """
+        costs = self.costs
+        total = 0.00
+        for road_id in roads:
+            total += costs[road_id]
+        return total
+
+    def tree_route(self, city_id):
+        """
+        Return (list of city ids, list of road ids) along the tree from the
+        given city to the end city.
+        """
+        cities = [city_id]
+        roads = list()
+        while city_id != self.end_city:
+            road_id = self.tree[city_id]
+            city_id = self.other_end(road_id, city_id)
+            cities.append(city_id)
+            roads.append(road_id)
+        return cities, roads
+
+    def spur_route(self, spur, banned_cities, banned_roads):
+        """
+        Return (cost, list of city ids, list of road ids) for the best route
+        from the spur city to the end city that visits none of the banned
+        cities and leaves the spur city by none of the banned roads, or None.
+        """
+        if self.reuse_tree:
+            if self.to_end[spur] == inf:
+                return None
+
+            # The tree route never returns to the spur, so only its first
+            # road can be a banned one.
+
+            cities, roads = self.tree_route(spur)
+            if ((not roads or roads[0] not in banned_roads)
+                    and banned_cities.isdisjoint(cities)):
+                self.tree_spurs += 1
+                return self.to_end[spur], cities, roads
+
+        self.spur_searches += 1
+        return self.search(spur, banned_cities, banned_roads)
+
+    def search(self, spur, banned_cities, banned_roads):
+        """
+        Run the A* search for spur_route(), reusing self.fringe and
+        self.labels.
+        """
+        network = self.road_network
+        costs = self.costs
+        to_end = self.to_end if self.reuse_tree else None
+        fringe = self.fringe
+        labels = self.labels
+        stats = self.stats
+
+        fringe.clear()
+        labels.clear()
+        closed = set()
+
+        labels[spur] = (0.00, -1, -1)
+        fringe.push(spur, 0.00)
+        stats.pushes += 1
+
+        while fringe:
+            city_id, _ = fringe.pop()
+            stats.pops += 1
+            gofs = labels[city_id][0]
+
+            if city_id == self.end_city:
+                cities = [city_id]
+                roads = list()
+                while labels[city_id][1] >= 0:
+                    _, city_id, road_id = labels[city_id]
+                    cities.append(city_id)
+                    roads.append(road_id)
+                cities.reverse()
+                roads.reverse()
+                return gofs, cities, roads
+
+            closed.add(city_id)
+            stats.expanded += 1
+
+            for neighbor_id, road_id in network.neighbors(city_id):
+                if neighbor_id in closed or neighbor_id in banned_cities:
+                    continue
+                if city_id == spur and road_id in banned_roads:
+                    continue
+                hofs = 0.00 if to_end is None else to_end[neighbor_id]
+                candidate = gofs + costs[road_id]
+                if candidate + hofs == inf:
+                    # A closed road, or no way on to the end city.
+                    continue
+
+                label = labels.get(neighbor_id)
+                if label is None or candidate < label[0]:
+                    labels[neighbor_id] = (candidate, city_id, road_id)
+                    fringe.push(neighbor_id, candidate + hofs)
+                    stats.generated += 1
+                    stats.pushes += 1
+
+        return None
+
+    def solve(self):
+        """
+        Find up to k loopless routes between the start city and end city.
+        :return: list of Node, cheapest first; empty if there is no route.
+        """
+        solve_start = perf_counter()
+        try:
+            return self.yen()
+        finally:
+            self.stats.stale_pops = self.fringe.stale_pops
+            self.stats.solve_seconds = perf_counter() - solve_start
+
+    def yen(self):
+        """
+        Run Yen's algorithm for solve().
+        :return: list of Node.
+        """
+        heuristic_start = perf_counter()
+        self.build_tree()
+        self.stats.heuristic_seconds = perf_counter() - heuristic_start
+
+        if self.to_end[self.start_city] == inf:
+            # You can't get there from here.
+            return list()
+
+        cities, roads = self.tree_route(self.start_city)
+        found = [(self.route_cost(roads), cities, roads)]
+        seen = {tuple(roads)}
+        candidates = list()     # Heap of (cost, road count, sequence, cities, roads).
+        sequence = count()
+
+        while len(found) < self.k:
+            _, cities, roads = found[-1]
+
+            for j, spur in enumerate(cities[:-1]):
+                root_roads = roads[:j]
+                banned_roads = {other_roads[j] for _, _, other_roads in found
+                                if len(other_roads) > j and other_roads[:j] == root_roads}
+                banned_cities = set(cities[:j])
+
+                spur_route = self.spur_route(spur, banned_cities, banned_roads)
+                if spur_route is None:
+                    continue
+
+                _, spur_cities, spur_roads = spur_route
+                candidate_roads = root_roads + spur_roads
+                if tuple(candidate_roads) in seen:
+                    continue
+                seen.add(tuple(candidate_roads))
+                heappush(candidates, (self.route_cost(candidate_roads), len(candidate_roads),
+                                      next(sequence), cities[:j] + spur_cities,
+                                      candidate_roads))
+
+            if not candidates:
+                break
+            cost, _, _, candidate_cities, candidate_roads = heappop(candidates)
+            found.append((cost, candidate_cities, candidate_roads))
+
+        return [route_node(self.road_network, cities, roads, cost)
+                for cost, cities, roads in found]
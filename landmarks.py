@@ -0,0 +1,326 @@
+"""ALT (A*, landmarks, triangle inequality) heuristics.
+
+An offline step picks a few landmark cities and stores the exact cost from
+each landmark to every city, for every optimization method. Roads are
+undirected, so for a landmark L, a city v and the goal t the triangle
+inequality gives cost(v, t) >= |cost(L, t) - cost(L, v)|. The largest of these
+bounds over all landmarks is admissible and consistent on any data, including
+the junctions and GPS rows that defeat the straight-line bound.
+
+The table is written next to the data files and mapped back on later runs in
+the same way as the road network cache (see graph_cache.py). RouteSolver
+computes it on first use if there is no current one. To build it ahead of
+time, or with a different number of landmarks:
+
+    $> python3 landmarks.py --count 16
+"""
+from array import array
+from graph_cache import StaleCacheError, fingerprint, is_unchanged, padding
+from math import inf
+from road_network import OPTIMIZATIONS
+from shortest_paths import one_to_all
+import argparse
+import mmap
+import os
+import struct
+import time
+import config
+import graph_cache
+
+try:
+    import numpy as np
+except ImportError:     # pragma: no cover - exercised only without NumPy.
+    np = None
+
+MAGIC = b'RSLMARK\x00'
+VERSION = 2
+BYTE_ORDER_MARK = 0x01020304
+DEFAULT_COUNT = 16
+
+# magic, version, byte order mark, landmark count, city count, road count,
+# then size, mtime and SHA-256 of the city GPS file and of the road segments
+# file.
+HEADER = struct.Struct('=8sIIqqqqq32sqq32s')
+
+
+class LandmarkTable:
+    """A class to hold the cost from each landmark to every city.
+    """
+
+    def __init__(self, landmarks, distances, road_count):
+        """Initialize an instance of this class.
+
+        Parameters:
+            landmarks: Landmark city ids.
+            distances: Optimization method -> flat array of
+                         len(landmarks) * city count costs. The cost from
+                         landmark i to city v is at i * city count + v, and is
+                         inf if v cannot be reached from the landmark.
+            road_count: Number of roads in the network the costs are for.
+        """
+        self.landmarks = landmarks
+        self.distances = distances
+        self.city_count = len(distances['distance']) // max(len(landmarks), 1)
+        self.road_count = road_count
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def fits(self, road_network):
+        """Return True if the table has the given network's city and road
+        counts. A table for any other network gives meaningless bounds.
+        """
+        return (len(self.landmarks) > 0 and self.city_count == len(road_network)
+                and self.road_count == road_network.road_count)
+
+    def row(self, opt, index):
+        """Return the costs from the given landmark (by index, not city id)
+        to every city.
+        """
+        n = self.city_count
+        return self.distances[opt][index * n:(index + 1) * n]
+
+    @classmethod
+    def compute(cls, road_network, count=DEFAULT_COUNT):
+        """Return a new instance with count landmarks chosen by
+        select_landmarks().
+        """
+        landmarks, rows = select_landmarks(road_network, count)
+
+        distances = dict()
+        for opt in OPTIMIZATIONS:
+            flat = array('d')
+            for index, landmark in enumerate(landmarks):
+                if opt == 'distance':
+                    flat.extend(rows[index])
+                else:
+                    flat.extend(one_to_all(road_network, landmark,
+                                           road_network.costs(opt)))
+            distances[opt] = flat
+
+        return cls(landmarks, distances, road_network.road_count)
+
+    def recompute(self, road_network, opts):
+        """Return a new instance with the same landmarks, whose costs for the
+        given optimization methods are computed afresh on the given network and
+        whose other costs are shared with this one.
+
+        Raising the cost of a road only raises true costs, so the bounds stay
+        admissible and consistent. A method needs recomputing only after a road
+        got cheaper in it.
+        """
+        distances = dict(self.distances)
+        for opt in opts:
+            flat = array('d')
+            for landmark in self.landmarks:
+                flat.extend(one_to_all(road_network, landmark, road_network.costs(opt)))
+            distances[opt] = flat
+        return LandmarkTable(self.landmarks, distances, self.road_count)
+
+
+def select_landmarks(road_network, count):
+    """
+    Return (landmark ids, distance rows) for count landmarks chosen by
+    farthest-point selection on road distance. The first landmark is the city
+    farthest from the best-connected city; each next one is the city farthest
+    from every landmark chosen so far, among the cities they can reach.
+    """
+    costs = road_network.costs('distance')
+    hub = max(range(len(road_network)),
+              key=lambda city_id: road_network.offsets[city_id + 1] - road_network.offsets[city_id])
+
+    nearest = one_to_all(road_network, hub, costs)
+    landmarks = list()
+    rows = list()
+
+    for _ in range(min(count, len(road_network))):
+        candidate = max((d, city_id) for city_id, d in enumerate(nearest)
+                        if d < inf and city_id not in landmarks)
+        landmark = candidate[1]
+        row = one_to_all(road_network, landmark, costs)
+        landmarks.append(landmark)
+        rows.append(row)
+
+        if len(landmarks) == 1:
+            nearest = row
+        else:
+            nearest = array('d', map(min, nearest, row))
+
+    return landmarks, rows
+
+
+def save_landmarks(table, *, path=None, city_gps_path=None, road_segments_path=None):
+    """
+    Write the given table, with the fingerprints of the source files it was
+    computed from, to path.
+    """
+    path = config.LANDMARKS_PATH if path is None else path
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDER_MARK, len(table),
+                            table.city_count, table.road_count, *fingerprint(city_gps_path),
+                            *fingerprint(road_segments_path)))
+        landmarks = array('i', table.landmarks).tobytes()
+        f.write(landmarks)
+        f.write(bytes(padding(len(landmarks))))
+        for opt in OPTIMIZATIONS:
+            f.write(memoryview(table.distances[opt]).cast('B'))
+
+    os.replace(tmp_path, path)
+
+
+def map_landmarks(*, path=None, city_gps_path=None, road_segments_path=None):
+    """
+    Return a LandmarkTable whose arrays are zero-copy views of the mapped
+    file. Raise StaleCacheError if it is missing or out of date.
+    """
+    path = config.LANDMARKS_PATH if path is None else path
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise StaleCacheError(f'Cannot map {path}: {e}')
+
+    if len(mapped) < HEADER.size:
+        raise StaleCacheError(f'Truncated landmark file {path}.')
+
+    (magic, version, byte_order_mark, count, cities, roads, gps_size, gps_mtime,
+     gps_hash, roads_size, roads_mtime, roads_hash) = HEADER.unpack_from(mapped)
+
+    if (magic, version, byte_order_mark) != (MAGIC, VERSION, BYTE_ORDER_MARK):
+        raise StaleCacheError(f'Incompatible landmark file {path}.')
+    if not (is_unchanged(city_gps_path, gps_size, gps_mtime, gps_hash)
+            and is_unchanged(road_segments_path, roads_size, roads_mtime, roads_hash)):
+        raise StaleCacheError(f'Source files changed since {path} was computed.')
+
+    size = 4 * count
+    expected = HEADER.size + size + padding(size) + 8 * count * cities * len(OPTIMIZATIONS)
+    if len(mapped) != expected:
+        raise StaleCacheError(f'Malformed landmark file {path}.')
+
+    view = memoryview(mapped)
+    position = HEADER.size
+    landmarks = view[position:position + size].cast('i')
+    position += size + padding(size)
+
+    distances = dict()
+    for opt in OPTIMIZATIONS:
+        distances[opt] = view[position:position + 8 * count * cities].cast('d')
+        position += 8 * count * cities
+
+    return LandmarkTable(landmarks, distances, roads)
+
+
+def load_landmarks(road_network, **paths):
+    """
+    Return the stored LandmarkTable, computing it and saving the result first
+    if there is no current one for the given network. A stored table with
+    other city or road counts is for another network, and is replaced. If the
+    result cannot be written, or a road update has made the network differ
+    from the data files, the in-memory table is returned.
+    """
+    if not road_network.modified:
+        try:
+            table = map_landmarks(**paths)
+            if table.fits(road_network):
+                return table
+        except StaleCacheError:
+            pass
+
+    table = LandmarkTable.compute(road_network)
+    if road_network.modified:
+        return table
+    try:
+        save_landmarks(table, **paths)
+    except OSError:
+        pass
+    return table
+
+
+class LandmarkHeuristic:
+    """A class to estimate the cost of reaching one goal city, for one
+    optimization method, from a LandmarkTable.
+
+    Called with a city id like GoalHeuristic. A city that some landmark can
+    reach while the goal is unreachable from it, or the other way round,
+    cannot reach the goal, and its value is inf.
+    """
+
+    def __init__(self, table, goal, opt, *, precompute=None):
+        """Initialize an instance of this class.
+
+        Parameters:
+            table: type LandmarkTable.
+            goal: City id of the goal city.
+            opt: Optimization method.
+            precompute: If True, compute every city's value up front. If
+                         None, precompute only when NumPy is installed.
+        """
+        self.table = table
+        self.goal = goal
+        self.opt = opt
+        self.rows = [table.row(opt, index) for index in range(len(table))]
+        self.to_goal = [row[goal] for row in self.rows]
+
+        precompute = np is not None if precompute is None else precompute
+        self.values = self.precompute() if precompute else None
+
+    def __call__(self, city_id):
+        """
+        Return the hofs value of the given city.
+        :param city_id: city id in the road network.
+        :return: float.
+        """
+        if self.values is not None:
+            return self.values[city_id]
+
+        bound = 0.00
+        for row, to_goal in zip(self.rows, self.to_goal):
+            from_landmark = row[city_id]
+            if from_landmark == to_goal:
+                continue
+            bound = max(bound, abs(to_goal - from_landmark))
+        return bound
+
+    def precompute(self):
+        """
+        Return a list of the hofs value of every city.
+        """
+        if np is None:
+            return [self(city_id) for city_id in range(self.table.city_count)]
+
+        table = np.frombuffer(self.table.distances[self.opt], dtype=np.float64)
+        table = table.reshape(len(self.table), self.table.city_count)
+        to_goal = table[:, self.goal:self.goal + 1]
+
+        with np.errstate(invalid='ignore'):
+            bounds = np.abs(to_goal - table)
+        bounds[table == to_goal] = 0.00     # Includes inf == inf.
+        return bounds.max(axis=0, initial=0.00).tolist()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description='Compute the ALT landmark table.')
+    ap.add_argument('--count', type=int, default=DEFAULT_COUNT,
+                    help=f'Number of landmarks (default: {DEFAULT_COUNT}).')
+    args = ap.parse_args()
+
+    start_time = time.perf_counter()
+    network = graph_cache.load_network()
+    table = LandmarkTable.compute(network, args.count)
+    save_landmarks(table)
+    seconds = time.perf_counter() - start_time
+
+    print(f'Wrote {config.LANDMARKS_PATH} in {seconds:.1f} seconds.')
+    print(f'\t{len(table)} landmarks, {table.city_count} cities, '
+          f'{os.path.getsize(config.LANDMARKS_PATH)} bytes')
+    for landmark in table.landmarks:
+        print(f'\t\t{network.names[landmark]}')
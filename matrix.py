@@ -0,0 +1,234 @@
+"""Many-to-many cost matrices.
+
+One shortest path tree is grown from each origin, stopping as soon as every
+destination has been settled, so a matrix costs one search per origin rather
+than one per pair. With more than one worker the origins are split across
+processes. Each process reads the same road network, which is inherited from
+the parent when processes are forked, and otherwise mapped from the cache
+that graph_cache.py writes.
+
+NumPy is optional. Without it the matrix is a list of array('d') rows.
+
+    $> python3 matrix.py --opt time --origins Bloomington,_Indiana Chicago,_Illinois \
+           --destinations Madison,_Indiana Gary,_Indiana
+    $> python3 matrix.py --opt distance --origins @origins.txt --destinations @cities.txt
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from math import inf
+from road_network import OPTIMIZATIONS
+from route_search import route_node
+from shortest_paths import dijkstra
+import argparse
+import csv
+import os
+import sys
+import graph_cache
+
+try:
+    import numpy as np
+except ImportError:     # pragma: no cover - exercised only without NumPy.
+    np = None
+
+# The network searched by worker processes. Set before the pool starts so
+# forked workers inherit it; spawned workers load it in init_worker().
+_shared_network = None
+
+
+class MatrixPaths:
+    """A class to recover the route behind each entry of a cost matrix.
+
+    For each origin it keeps the road by which every settled city was
+    reached, which is all the shortest path tree needs.
+    """
+
+    def __init__(self, road_network, origins, destinations, trees, matrix):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork the matrix was computed on.
+            origins: Origin city ids, one per matrix row.
+            destinations: Destination city ids, one per matrix column.
+            trees: For each origin, an array of the road id that reached
+                         every city, or -1.
+            matrix: The cost matrix.
+        """
+        self.road_network = road_network
+        self.origins = origins
+        self.destinations = destinations
+        self.trees = trees
+        self.matrix = matrix
+
+    def path(self, row, column):
+        """
+        Return (list of city ids, list of road ids) for the given entry, or
+        None if the destination cannot be reached.
+        """
+        network = self.road_network
+        origin = self.origins[row]
+        city_id = self.destinations[column]
+        tree = self.trees[row]
+
+        if city_id != origin and tree[city_id] < 0:
+            return None
+
+        cities = [city_id]
+        roads = list()
+        while city_id != origin:
+            road_id = tree[city_id]
+            city1 = network.city1[road_id]
+            city_id = network.city2[road_id] if city1 == city_id else city1
+            cities.append(city_id)
+            roads.append(road_id)
+
+        cities.reverse()
+        roads.reverse()
+        return cities, roads
+
+    def route(self, row, column):
+        """
+        Return the route for the given entry as a Node, as RouteSearch.solve()
+        does, or None if the destination cannot be reached.
+        """
+        path = self.path(row, column)
+        if path is None:
+            return None
+        return route_node(self.road_network, *path, self.matrix[row][column])
+
+
+def cost_row(road_network, origin, destinations, costs, *, tree=None):
+    """
+    Return an array of the cost from the origin to each destination, inf for
+    those that cannot be reached. The search stops once every destination is
+    settled. If tree is given, the road that reached each settled city is
+    written to it.
+    """
+    remaining = set(destinations)
+    found = dict()
+
+    for city_id, cost, _, road_id in dijkstra(road_network, origin, costs):
+        if tree is not None:
+            tree[city_id] = road_id
+        if city_id in remaining:
+            found[city_id] = cost
+            remaining.discard(city_id)
+            if not remaining:
+                break
+
+    return array('d', (found.get(city_id, inf) for city_id in destinations))
+
+
+def init_worker():
+    global _shared_network
+    if _shared_network is None:
+        _shared_network = graph_cache.load_network()
+
+
+def cost_rows(origins, destinations, opt, paths):
+    """
+    Return (cost rows, trees or None) for the given origins on the shared
+    network. Runs in a worker process.
+    """
+    network = _shared_network
+    costs = network.costs(opt)
+    rows = list()
+    trees = list() if paths else None
+
+    for origin in origins:
+        tree = array('i', [-1]) * len(network) if paths else None
+        rows.append(cost_row(network, origin, destinations, costs, tree=tree))
+        if paths:
+            trees.append(tree)
+
+    return rows, trees
+
+
+def matrix(road_network, origins, destinations, opt, *, paths=False, workers=1):
+    """
+    Return the matrix of best route costs from every origin to every
+    destination, inf where there is no route.
+    :param road_network: type RoadNetwork.
+    :param origins: city names, one per row.
+    :param destinations: city names, one per column.
+    :param opt: Optimization method, one of OPTIMIZATIONS.
+    :param paths: If True, return (matrix, MatrixPaths).
+    :param workers: Number of processes, or None for one per CPU.
+    :return: a NumPy array, or a list of array('d') rows without NumPy.
+    """
+    if opt not in OPTIMIZATIONS:
+        raise ValueError(f'Unknown optimization {opt!r}; expected one of '
+                         f'{", ".join(OPTIMIZATIONS)}.')
+
+    origin_ids = [road_network.ids[name] for name in origins]
+    destination_ids = [road_network.ids[name] for name in destinations]
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    workers = max(1, min(workers, len(origin_ids)))
+
+    global _shared_network
+    _shared_network = road_network
+    try:
+        if workers == 1:
+            rows, trees = cost_rows(origin_ids, destination_ids, opt, paths)
+        else:
+            # Contiguous chunks, a few per worker to even out uneven trees.
+            size = -(-len(origin_ids) // (workers * 4))
+            chunks = [origin_ids[i:i + size] for i in range(0, len(origin_ids), size)]
+            rows = list()
+            trees = list() if paths else None
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+                for chunk_rows, chunk_trees in executor.map(
+                        cost_rows, chunks, [destination_ids] * len(chunks),
+                        [opt] * len(chunks), [paths] * len(chunks)):
+                    rows.extend(chunk_rows)
+                    if paths:
+                        trees.extend(chunk_trees)
+    finally:
+        _shared_network = None
+
+    result = rows
+    if np is not None:
+        result = np.array(rows, dtype=np.float64).reshape(len(origin_ids), len(destination_ids))
+
+    if paths:
+        return result, MatrixPaths(road_network, origin_ids, destination_ids, trees, result)
+    return result
+
+
+def write_csv(result, origins, destinations, f):
+    """
+    Write the given matrix to f as CSV, with destinations across the top and
+    origins down the side.
+    """
+    writer = csv.writer(f)
+    writer.writerow([''] + list(destinations))
+    for name, row in zip(origins, result):
+        writer.writerow([name] + [repr(float(cost)) for cost in row])
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description='Write the matrix of best route costs between cities as CSV.',
+        fromfile_prefix_chars='@')
+    ap.add_argument('--origins', nargs='+', required=True,
+                    help='Origin cities, or @file with one per line.')
+    ap.add_argument('--destinations', nargs='+',
+                    help='Destination cities, or @file (default: the origins).')
+    ap.add_argument('--opt', choices=list(OPTIMIZATIONS), required=True)
+    ap.add_argument('--workers', type=int, default=1,
+                    help='Number of processes; 0 for one per CPU (default: 1).')
+    args = ap.parse_args()
+
+    from route_solver import RouteSolver    # Imports this module.
+
+    # Only used to resolve names and points, so the landmarks are not loaded.
+    solver = RouteSolver(landmarks=False)
+    try:
+        origins = [solver.resolve(place) for place in args.origins]
+        destinations = (origins if args.destinations is None
+                        else [solver.resolve(place) for place in args.destinations])
+    except ValueError as e:
+        sys.exit(str(e))
+
+    result = matrix(solver.road_network, origins, destinations, args.opt,
+                    workers=args.workers or None)
+    write_csv(result, origins, destinations, sys.stdout)
@@ -1,10 +1,12 @@
-from unique_instances import UniqueInstancesClass
-
-
-class Node(metaclass=UniqueInstancesClass):
+class Node:
     """A class to represent a node on a graph.
+
+    Nodes belong to a single search. They are not registered globally, so a
+    search never sees gofs, hofs or path values left behind by another one.
     """
 
+    __slots__ = ('data', 'name', 'gofs', 'hofs', 'path')
+
     def __init__(self, name, *, data, gofs=None, hofs=None, path=None):
         """Initialize an instance of this class.
         
@@ -30,3 +32,34 @@ class Node(metaclass=UniqueInstancesClass):
     @property
     def fofs(self):     # fofs = f(s)
         return self.gofs + self.hofs
+
+
+class Label:
+    """A class to represent the best known way a search has reached a city.
+
+    A label stores only its cost and a pointer back to the previous city and
+    road, so generating a successor costs the same however long the path is.
+    The path itself is rebuilt once, by following parent ids from the goal.
+    """
+
+    __slots__ = ('city', 'gofs', 'hofs', 'parent', 'road')
+
+    def __init__(self, city, *, gofs, hofs, parent=-1, road=-1):
+        """Initialize an instance of this class.
+
+        Parameters:
+            city: City id in the road network.
+            gofs: The cost to reach this city along the best known path.
+            hofs: Estimated cost to reach a goal state from this city.
+            parent: City id of the previous city on the path, or -1.
+            road: Road id used to arrive from the parent, or -1.
+        """
+        self.city = city
+        self.gofs = gofs
+        self.hofs = hofs
+        self.parent = parent
+        self.road = road
+
+    @property
+    def fofs(self):
+        return self.gofs + self.hofs
@@ -0,0 +1,269 @@
+"""Multi-objective routing: every route that is best in some trade-off between
+distance, travel time and cycling accidents.
+
+A route dominates another if it is no worse in all three totals and better
+in at least one. The search returns the Pareto set, the routes no other
+route dominates, with one route for each distinct set of totals.
+
+Each city keeps a bag of labels that do not dominate one another. One
+Dijkstra search per objective from the end city gives exact lower bounds on
+the remaining cost, and its trees give the three single-objective best
+routes, which seed the result. As in NAMOA*, labels are expanded in
+lexicographic order of their totals plus these bounds. The bounds are exact,
+hence consistent, so a label is still final when it is popped, and labels
+that head toward the end city settle first. A label is dropped if another
+label at its city dominates it, or if its totals plus the bounds are
+dominated by a route already found to the end city.
+"""
+from heapq import heappop, heappush
+from math import inf
+from route_search import route_node
+from search_stats import SearchStats
+from shortest_paths import dijkstra
+from time import perf_counter
+
+DEFAULT_MAX_LABELS = 100000
+DEFAULT_DEADLINE = 2.00     # seconds
+
+# Objective -> RoadNetwork.costs() key, in label order.
+OBJECTIVES = (('distance', 'distance'), ('hours', 'time'), ('accidents', 'accidents'))
+
+
+def dominates(a, b):
+    """
+    Return True if cost vector a is no worse than b in every objective. Equal
+    vectors count as dominated, so only one route per set of totals is kept.
+    """
+    return a[0] <= b[0] and a[1] <= b[1] and a[2] <= b[2]
+
+
+class ParetoSearch:
+    """
+    A class to hold the state of a single Pareto route query.
+    """
+
+    def __init__(self, road_network, *, start, end, max_labels=DEFAULT_MAX_LABELS,
+                 deadline=DEFAULT_DEADLINE):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork to search. It is not modified.
+            start: Name of the starting city or location.
+            end: Name of the ending city or location.
+            max_labels: Most labels the search may create. If the cap is
+                         reached, the search stops and returns the routes
+                         found so far, which always include the three
+                         single-objective best routes, and sets complete to
+                         False.
+            deadline: Seconds the search may take, or None for no limit. It
+                         stops at the deadline in the same way as at
+                         max_labels.
+        """
+        self.road_network = road_network
+        self.start_city = road_network.ids[start]
+        self.end_city = road_network.ids[end]
+        self.max_labels = max_labels
+        self.deadline = deadline
+
+        self.costs = [road_network.costs(opt) for _, opt in OBJECTIVES]
+        self.complete = True
+        self.stats = SearchStats()
+
+        # Label id -> (cost vector, city id, parent label id, road id).
+        self.labels = list()
+        self.dead = bytearray()     # Label id -> 1 once dominated.
+        self.targets = list()       # Label ids of routes to the end city.
+        self.front = list()         # Cost vectors of self.targets.
+
+    @property
+    def expanded(self):
+        return self.stats.expanded
+
+    def lower_bounds(self):
+        """
+        Return (bounds, trees): for each objective, the exact cost from every
+        city to the end city, and the road by which each city is reached in
+        that objective's shortest path tree from the end city.
+        """
+        network = self.road_network
+        bounds = list()
+        trees = list()
+        for costs in self.costs:
+            bound = [inf] * len(network)
+            tree = [-1] * len(network)
+            for city_id, cost, _, road_id in dijkstra(network, self.end_city, costs):
+                bound[city_id] = cost
+                tree[city_id] = road_id
+            bounds.append(bound)
+            trees.append(tree)
+        return bounds, trees
+
+    def add_label(self, costs, city_id, parent, road_id):
+        self.labels.append((costs, city_id, parent, road_id))
+        self.dead.append(0)
+        return len(self.labels) - 1
+
+    def add_target(self, label_id):
+        """
+        Add the given end city label to the result unless a route already
+        found dominates it, and drop any it dominates. Return True if added.
+        """
+        costs = self.labels[label_id][0]
+        if any(dominates(self.labels[other][0], costs) for other in self.targets):
+            return False
+        self.targets = [other for other in self.targets
+                        if not dominates(costs, self.labels[other][0])]
+        self.targets.append(label_id)
+        self.front = [self.labels[other][0] for other in self.targets]
+        return True
+
+    def seed(self, trees):
+        """
+        Add the single-objective best route for each objective, following
+        that objective's tree from the start city to the end city.
+        """
+        network = self.road_network
+        for tree in trees:
+            if self.start_city != self.end_city and tree[self.start_city] < 0:
+                return
+
+            label_id = self.add_label((0.00, 0.00, 0.00), self.start_city, -1, -1)
+            city_id = self.start_city
+            costs = [0.00, 0.00, 0.00]
+            while city_id != self.end_city:
+                road_id = tree[city_id]
+                for i, objective_costs in enumerate(self.costs):
+                    costs[i] += objective_costs[road_id]
+                city1 = network.city1[road_id]
+                city_id = network.city2[road_id] if city1 == city_id else city1
+                label_id = self.add_label(tuple(costs), city_id, label_id, road_id)
+
+            self.add_target(label_id)
+
+    def solve(self):
+        """
+        Find the Pareto set of routes between the start city and end city.
+        :return: list of Node, one per route, ordered by distance; empty if
+                 there is no route.
+        """
+        solve_start = perf_counter()
+        try:
+            return self.search()
+        finally:
+            self.stats.solve_seconds = perf_counter() - solve_start
+
+    def search(self):
+        """
+        Run the search for solve().
+        :return: list of Node.
+        """
+        network = self.road_network
+        stats = self.stats
+
+        heuristic_start = perf_counter()
+        (bound_distance, bound_hours, bound_accidents), trees = self.lower_bounds()
+        stats.heuristic_seconds = perf_counter() - heuristic_start
+
+        if bound_distance[self.start_city] == inf:
+            # You can't get there from here.
+            return list()
+
+        self.seed(trees)
+        distance_costs, hours_costs, accident_costs = self.costs
+        labels = self.labels
+        dead = self.dead
+
+        def optimistic(costs, city_id):
+            # The totals of the cheapest conceivable route through the label.
+            return (costs[0] + bound_distance[city_id], costs[1] + bound_hours[city_id],
+                    costs[2] + bound_accidents[city_id])
+
+        def pruned(estimate):
+            # Dominated, even at its most optimistic, by a route already found?
+            # This runs for every label, so dominates() is inlined.
+            distance, hours, accidents = estimate
+            for target in self.front:
+                if target[0] <= distance and target[1] <= hours and target[2] <= accidents:
+                    return True
+            return False
+
+        bags = dict()   # City id -> label ids that are not dominated.
+        start = self.add_label((0.00, 0.00, 0.00), self.start_city, -1, -1)
+        bags[self.start_city] = [start]
+        heap = [(optimistic((0.00, 0.00, 0.00), self.start_city), start)]
+        stats.pushes += 1
+        stop = inf if self.deadline is None else perf_counter() + self.deadline
+
+        while heap:
+            estimate, label_id = heappop(heap)
+            if dead[label_id]:
+                stats.stale_pops += 1
+                continue
+            stats.pops += 1
+
+            costs, city_id, _, _ = labels[label_id]
+            if city_id == self.end_city:
+                self.add_target(label_id)
+                continue
+            if pruned(estimate):
+                continue
+
+            stats.expanded += 1
+            if len(labels) >= self.max_labels or perf_counter() >= stop:
+                self.complete = False
+                break
+
+            for neighbor_id, road_id in network.neighbors(city_id):
+                successor = (costs[0] + distance_costs[road_id],
+                             costs[1] + hours_costs[road_id],
+                             costs[2] + accident_costs[road_id])
+                if successor[0] == inf or bound_distance[neighbor_id] == inf:
+                    continue
+                estimate = optimistic(successor, neighbor_id)
+                if pruned(estimate):
+                    continue
+
+                bag = bags.setdefault(neighbor_id, list())
+                if any(dominates(labels[other][0], successor) for other in bag):
+                    continue
+
+                # The new label may dominate labels still queued; they are
+                # marked dead and skipped when popped.
+
+                kept = list()
+                for other in bag:
+                    if dominates(successor, labels[other][0]):
+                        dead[other] = 1
+                    else:
+                        kept.append(other)
+
+                successor_id = self.add_label(successor, neighbor_id, label_id, road_id)
+                kept.append(successor_id)
+                bags[neighbor_id] = kept
+                heappush(heap, (estimate, successor_id))
+                stats.generated += 1
+                stats.pushes += 1
+
+            stats.peak_frontier = max(stats.peak_frontier, len(heap))
+
+        stats.peak_closed = len(labels)
+        return [self.route(label_id) for label_id in
+                sorted(self.targets, key=lambda label_id: labels[label_id][0])]
+
+    def route(self, label_id):
+        """
+        Return the route ending with the given label as a Node whose gofs is
+        its distance.
+        """
+        costs = self.labels[label_id][0]
+        cities = list()
+        roads = list()
+        while label_id >= 0:
+            _, city_id, parent, road_id = self.labels[label_id]
+            cities.append(city_id)
+            if road_id >= 0:
+                roads.append(road_id)
+            label_id = parent
+        cities.reverse()
+        roads.reverse()
+        return route_node(self.road_network, cities, roads, costs[0])
@@ -0,0 +1,61 @@
+"""Optional profiling of a block of code with cProfile or tracemalloc.
+
+    with profile('cprofile', 'route-solver.prof'):
+        solver.route(start, end, opt)
+
+cProfile output is written in pstats format, for `python3 -m pstats` or a
+viewer such as snakeviz. tracemalloc output is a text report of the lines
+that allocated the most memory still held at the end, and the peak. A summary
+of either is logged at INFO level.
+"""
+from contextlib import contextmanager
+import cProfile
+import io
+import logging
+import pstats
+import tracemalloc
+
+PROFILERS = ('cprofile', 'tracemalloc')
+TOP = 25    # Entries in the logged summary and the tracemalloc report.
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def profile(kind, path):
+    """
+    Profile the body of the with statement with the given profiler, one of
+    PROFILERS, and write the result to path. If kind is None, do nothing.
+    """
+    if kind is None:
+        yield
+        return
+    if kind not in PROFILERS:
+        raise ValueError(f'Unknown profiler {kind!r}; expected one of {", ".join(PROFILERS)}.')
+
+    if kind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            summary = io.StringIO()
+            pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(TOP)
+            logger.info('cProfile written to %s\n%s', path, summary.getvalue())
+        return
+
+    tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        lines = [f'Current {current} bytes, peak {peak} bytes.']
+        lines += [str(stat) for stat in snapshot.statistics('lineno')[:TOP]]
+        with open(path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        logger.info('tracemalloc written to %s\n%s', path, '\n'.join(lines[:10]))
@@ -1,3 +1,24 @@
+def car_hours(dist, speed):
+    """Return the time in hours needed to travel dist miles on a road with the
+    given speed limit, assuming a car that travels at 5 mph above the limit.
+    """
+    return dist / (speed + 5)
+
+
+def bike_hours(dist):
+    """Return the time in hours needed for a bicycle to travel dist miles,
+    assuming an average speed of 13.5 mph.
+    """
+    return dist / 13.5
+
+
+def bike_accidents(dist, speed):
+    """Return the expected number of accidents for a bicycle traveling dist
+    miles on a road with the given speed limit, per trip.
+    """
+    return 0.000001 * speed * dist
+
+
 class RoadData:
     """A class to representing a connecting road between two cities.
     """
@@ -22,16 +43,16 @@ class RoadData:
         # self.hours is the time in hours needed to travel on this road,
         # assuming a car that travels at 5 mph above the speed_limit limit.
 
-        self.hours = self.dist / (self.speed_limit + 5)
+        self.hours = car_hours(self.dist, self.speed_limit)
 
         # self.hours_bike is the time in hours needed for a bicycle to travel on
         # this road, assuming an average speed_limit of 13.5 mph.
 
-        self.hours_bike = self.dist / 13.5
+        self.hours_bike = bike_hours(self.dist)
 
         # self.accidents is the expected number of accidents for a bicycle
         # traveling on this road, per trip. If self.accidents = 0.25, it means
         # there is a virtual certainty that one in four bicyclists would be
         # involved in an accident on this road.
 
-        self.accidents = 0.000001 * self.speed_limit * self.dist
+        self.accidents = bike_accidents(self.dist, self.speed_limit)
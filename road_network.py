@@ -0,0 +1,392 @@
+from array import array
+from math import inf, isnan, nan
+from road_data import RoadData, bike_accidents, bike_hours, car_hours
+import logging
+import config
+
+# Optimization method -> name of the RoadNetwork road array holding its cost.
+# Every road counts as one segment, so 'segments' has no stored array.
+OPTIMIZATIONS = {'segments': None, 'distance': 'dist', 'time': 'hours',
+                 'accidents': 'accidents'}
+
+# Road arrays that RoadNetwork.update_road() rewrites.
+UPDATED_ARRAYS = ('dist', 'speed', 'hours', 'hours_bike', 'accidents')
+
+# Malformed lines RoadNetwork.from_files() logs and lists; the rest are counted.
+MALFORMED_LIMIT = 100
+
+logger = logging.getLogger(__name__)
+
+
+def road_error(dist, speed):
+    """Return why a road of the given length and speed limit cannot be
+    loaded or posted, or None. Both must be finite and not negative; a road
+    with a speed limit of 0 still has a travel time, see car_hours().
+    """
+    if not (0 <= dist < inf and 0 <= speed < inf):
+        return 'distance and speed limit must be finite and not negative'
+    return None
+
+
+class RoadNetwork:
+    """A class to index road segments by the cities they connect.
+
+    The network is stored as flat typed arrays so that it can be written to
+    and mapped back from a binary cache (see graph_cache.py) without
+    allocating one object per city or road.
+    """
+
+    def __init__(self, *, names, lat, lng, offsets, targets, edges,
+                 road_names, city1, city2, dist, speed, hours, hours_bike,
+                 accidents):
+        """Initialize an instance of this class.
+
+        City and road ids are positions in the arrays below. Every road is
+        listed in the adjacency of both of its cities, since either city can
+        be the starting city for a connection.
+
+        Parameters:
+            names: City id -> city name.
+            lat: City id -> latitude, or NaN if the city has no GPS row.
+            lng: City id -> longitude, or NaN if the city has no GPS row.
+            offsets: CSR row offsets. The roads incident to city i are at
+                         positions offsets[i] through offsets[i + 1] - 1 of
+                         targets and edges.
+            targets: Neighbor city id for each adjacency entry.
+            edges: Road id for each adjacency entry.
+            road_names: Road id -> road name.
+            city1: Road id -> id of one connecting city.
+            city2: Road id -> id of the other connecting city.
+            dist: Road id -> distance in miles.
+            speed: Road id -> speed limit in mph.
+            hours: Road id -> travel time by car (see RoadData).
+            hours_bike: Road id -> travel time by bicycle (see RoadData).
+            accidents: Road id -> expected cycling accidents (see RoadData).
+        """
+        self.names = names
+        self.ids = {name: city_id for city_id, name in enumerate(names)}
+        self.lat = lat
+        self.lng = lng
+        self.offsets = offsets
+        self.targets = targets
+        self.edges = edges
+        self.road_names = road_names
+        self.city1 = city1
+        self.city2 = city2
+        self.dist = dist
+        self.speed = speed
+        self.hours = hours
+        self.hours_bike = hours_bike
+        self.accidents = accidents
+
+        self.segments = None    # Initialized by self.costs('segments').
+        self.speed_bounds = None    # Initialized by self.speed_range().
+        self.junction_ids = None    # Initialized by self.junctions().
+        self.junction_adjacency = None  # Initialized by self.junction_roads().
+
+        self.updates = dict()   # Road id -> (length, speed, closed), see update_road().
+        self.modified = set()   # Optimization methods whose costs an update changed.
+
+        # (path, line number, reason) for the first MALFORMED_LIMIT lines that
+        # from_files() skipped, and the number skipped in all.
+
+        self.malformed = list()
+        self.malformed_count = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def road_count(self):
+        return len(self.road_names)
+
+    def has_coordinates(self, city_id):
+        """Return True if the given city has a row in the city GPS file.
+        """
+        return not isnan(self.lat[city_id])
+
+    def costs(self, opt):
+        """Return the road id -> cost array for the given optimization method.
+        Raise KeyError for an unknown method.
+        """
+        attribute = OPTIMIZATIONS[opt]
+        if attribute is not None:
+            return getattr(self, attribute)
+
+        if self.segments is None:
+            segments = array('d', [1.0]) * self.road_count
+            for road_id, (_, _, closed) in self.updates.items():
+                if closed:
+                    segments[road_id] = inf
+            self.segments = segments
+        return self.segments
+
+    def speed_range(self):
+        """Return (lowest, highest) speed limit over all roads.
+        """
+        if self.speed_bounds is None:
+            self.speed_bounds = (min(self.speed), max(self.speed))
+        return self.speed_bounds
+
+    def junctions(self):
+        """Return the ids of the cities without a row in the city GPS file.
+        """
+        if self.junction_ids is None:
+            lat = self.lat
+            self.junction_ids = [city_id for city_id in range(len(self.names))
+                                 if isnan(lat[city_id])]
+        return self.junction_ids
+
+    def junction_roads(self):
+        """Return parallel (junction id, neighbor id, road id) arrays with one
+        entry per road incident to a junction.
+        """
+        if self.junction_adjacency is None:
+            junctions = array('i')
+            neighbors = array('i')
+            roads = array('i')
+            for city_id in self.junctions():
+                for neighbor_id, road_id in self.neighbors(city_id):
+                    junctions.append(city_id)
+                    neighbors.append(neighbor_id)
+                    roads.append(road_id)
+            self.junction_adjacency = (junctions, neighbors, roads)
+        return self.junction_adjacency
+
+    def neighbors(self, city_id):
+        """Yield (neighbor id, road id) for every road incident to the given
+        city.
+        """
+        targets = self.targets
+        edges = self.edges
+        for k in range(self.offsets[city_id], self.offsets[city_id + 1]):
+            yield targets[k], edges[k]
+
+    def road_id(self, city1, city2, name=None):
+        """Return the id of the road between the two named cities, in either
+        order. If several roads connect them, name picks one. Raise KeyError if
+        there is no such road and ValueError if more than one matches.
+        """
+        end_id = self.ids[city2]
+        found = [road_id for neighbor_id, road_id in self.neighbors(self.ids[city1])
+                 if neighbor_id == end_id and (name is None or self.road_names[road_id] == name)]
+        if not found:
+            raise KeyError(f'No road {name or ""} between {city1} and {city2}.')
+        if len(found) > 1:
+            raise ValueError(f'{len(found)} roads between {city1} and {city2}; '
+                             f'name one of {", ".join(self.road_names[r] for r in found)}.')
+        return found[0]
+
+    def update_road(self, road_id, *, dist=None, speed=None, closed=None):
+        """Change the length or speed limit of the given road, or close or
+        reopen it, and recompute its hours, hours_bike and accidents. Only this
+        road's entries are rewritten. The first update copies the road arrays,
+        which may be read-only views of the mapped cache file.
+
+        A closed road costs inf in every optimization method, so no search
+        takes it. Its length and speed limit are kept, and can still be
+        changed, for when it is reopened.
+
+        Return a dict of optimization method -> (old cost, new cost) for every
+        method whose cost for the road changed. Whatever was computed from the
+        old costs of those methods is out of date; see
+        RouteSolver.update_road().
+        """
+        length, limit, was_closed = self.updates.get(
+            road_id, (self.dist[road_id], self.speed[road_id], False))
+        length = length if dist is None else dist
+        limit = limit if speed is None else speed
+        closed = was_closed if closed is None else closed
+        error = road_error(length, limit)
+        if error is not None:
+            raise ValueError(f'Road {error}, not {length} and {limit}.')
+
+        if not self.updates:
+            for attribute in UPDATED_ARRAYS:
+                setattr(self, attribute, array('d', getattr(self, attribute)))
+
+        old = {opt: self.costs(opt)[road_id] for opt in OPTIMIZATIONS}
+
+        self.speed[road_id] = limit
+        if closed:
+            self.dist[road_id] = inf
+            self.hours[road_id] = inf
+            self.hours_bike[road_id] = inf
+            self.accidents[road_id] = inf
+        else:
+            self.dist[road_id] = length
+            self.hours[road_id] = car_hours(length, limit)
+            self.hours_bike[road_id] = bike_hours(length)
+            self.accidents[road_id] = bike_accidents(length, limit)
+        if self.segments is not None:
+            self.segments[road_id] = inf if closed else 1.0
+
+        self.updates[road_id] = (length, limit, closed)
+        self.speed_bounds = None
+
+        changes = dict()
+        for opt in OPTIMIZATIONS:
+            new = self.costs(opt)[road_id]
+            if new != old[opt]:
+                changes[opt] = (old[opt], new)
+        self.modified.update(changes)
+        return changes
+
+    def road(self, road_id):
+        """Return a RoadData instance for the given road id.
+        """
+        return RoadData(self.road_names[road_id],
+                        city1=self.names[self.city1[road_id]],
+                        city2=self.names[self.city2[road_id]],
+                        dist=self.dist[road_id], speed=self.speed[road_id])
+
+    @classmethod
+    def from_files(cls, city_gps_path=None, road_segments_path=None):
+        """Return a new instance parsed from the given city GPS and road
+        segments files.
+
+        Both files are read one line at a time, straight into typed arrays, so
+        memory grows with the number of cities and roads rather than with the
+        size of the text. Each distinct road name is stored once. Malformed
+        lines are skipped, logged and listed in the new instance's malformed
+        attribute.
+        """
+        city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+        road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                              else road_segments_path)
+
+        names = list()
+        ids = dict()
+        lat = array('d')
+        lng = array('d')
+
+        def intern(name):
+            try:
+                return ids[name]
+            except KeyError:
+                ids[name] = len(names)
+                names.append(name)
+                lat.append(nan)
+                lng.append(nan)
+                return ids[name]
+
+        malformed = list()
+        malformed_count = 0
+
+        def reject(path, line_number, reason):
+            nonlocal malformed_count
+            malformed_count += 1
+            if len(malformed) < MALFORMED_LIMIT:
+                malformed.append((path, line_number, reason))
+                logger.warning('%s:%d: %s', path, line_number, reason)
+
+        with open(city_gps_path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                tokens = line.split()
+                if not tokens:
+                    continue
+                if len(tokens) != 3:
+                    reject(city_gps_path, line_number,
+                           f'expected 3 fields, found {len(tokens)}')
+                    continue
+                try:
+                    city_lat = float(tokens[1])
+                    city_lng = float(tokens[2])
+                except ValueError:
+                    reject(city_gps_path, line_number, 'latitude and longitude must be numbers')
+                    continue
+                if not (-90 <= city_lat <= 90 and -180 <= city_lng <= 180):
+                    reject(city_gps_path, line_number, 'latitude or longitude out of range')
+                    continue
+
+                city_id = intern(tokens[0])
+                lat[city_id] = city_lat
+                lng[city_id] = city_lng
+
+        road_names = list()
+        distinct_road_names = dict()
+        city1 = array('i')
+        city2 = array('i')
+        dist = array('d')
+        speed = array('d')
+
+        with open(road_segments_path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                tokens = line.split()
+                if not tokens:
+                    continue
+                if len(tokens) != 5:
+                    reject(road_segments_path, line_number,
+                           f'expected 5 fields, found {len(tokens)}')
+                    continue
+                try:
+                    road_dist = float(tokens[2])
+                    road_speed = float(tokens[3])
+                except ValueError:
+                    reject(road_segments_path, line_number,
+                           'distance and speed limit must be numbers')
+                    continue
+                error = road_error(road_dist, road_speed)
+                if error is not None:
+                    reject(road_segments_path, line_number, error)
+                    continue
+
+                city1.append(intern(tokens[0]))
+                city2.append(intern(tokens[1]))
+                dist.append(road_dist)
+                speed.append(road_speed)
+                road_names.append(distinct_road_names.setdefault(tokens[4], tokens[4]))
+
+        if malformed_count > len(malformed):
+            logger.warning('%d more malformed lines skipped.', malformed_count - len(malformed))
+
+        # The new instance builds its own name -> id index; drop this one
+        # first so the two never coexist.
+
+        ids.clear()
+        distinct_road_names.clear()
+        offsets, targets, edges = cls.build_adjacency(len(names), city1, city2)
+
+        network = cls(names=names, lat=lat, lng=lng, offsets=offsets,
+                      targets=targets, edges=edges, road_names=road_names,
+                      city1=city1, city2=city2, dist=dist, speed=speed,
+                      hours=array('d', map(car_hours, dist, speed)),
+                      hours_bike=array('d', map(bike_hours, dist)),
+                      accidents=array('d', map(bike_accidents, dist, speed)))
+        network.malformed = malformed
+        network.malformed_count = malformed_count
+        return network
+
+    @staticmethod
+    def build_adjacency(city_count, city1, city2):
+        """Return the CSR (offsets, targets, edges) arrays for the roads
+        described by the parallel city1 and city2 arrays. Roads keep their file
+        order within each city's adjacency. A road that starts and ends at the
+        same city is listed once.
+        """
+        degree = array('q', bytes(8 * (city_count + 1)))
+        for road_id in range(len(city1)):
+            degree[city1[road_id] + 1] += 1
+            if city2[road_id] != city1[road_id]:
+                degree[city2[road_id] + 1] += 1
+
+        offsets = degree
+        for city_id in range(city_count):
+            offsets[city_id + 1] += offsets[city_id]
+
+        targets = array('i', bytes(4 * offsets[city_count]))
+        edges = array('i', bytes(4 * offsets[city_count]))
+        cursor = array('q', offsets[:city_count])
+
+        for road_id in range(len(city1)):
+            a = city1[road_id]
+            b = city2[road_id]
+            targets[cursor[a]] = b
+            edges[cursor[a]] = road_id
+            cursor[a] += 1
+            if b != a:
+                targets[cursor[b]] = a
+                edges[cursor[b]] = road_id
+                cursor[b] += 1
+
+        return offsets, targets, edges
@@ -0,0 +1,261 @@
+"""A two-tier cache of route results.
+
+Results are kept in an in-process LRU and in a SQLite file next to the data
+files. Every entry is keyed by the start city, the end city, the optimization
+method and a data version, the SHA-256 of both data files. Entries written for
+any other version are never read and are deleted when the file is opened.
+
+Roads can be traveled in either direction, so the best route from A to B
+reversed is a best route from B to A. Each pair is stored once, in a canonical
+order, and a query for the other order gets the stored path reversed.
+
+When a road is updated on a loaded network, invalidate() drops only the
+in-process entries it can affect. The SQLite file still describes the
+unchanged data files, and other processes may be reading it, so from then on
+this cache neither reads nor writes it and keeps results in memory only.
+"""
+from city_data import CityData
+from collections import OrderedDict
+from graph_cache import file_hash
+from hashlib import sha256
+from node import Node
+import json
+import os
+import sqlite3
+import threading
+import config
+
+DEFAULT_SIZE = 10000
+
+# Totals stored for each route, as named in CityData.
+TOTALS = ('segments', 'distance', 'hours', 'hours_bike', 'accidents')
+
+
+def data_version(city_gps_path=None, road_segments_path=None):
+    """
+    Return a hex digest that changes whenever either data file does.
+    """
+    city_gps_path = config.CITY_GPS_PATH if city_gps_path is None else city_gps_path
+    road_segments_path = (config.ROAD_SEGMENTS_PATH if road_segments_path is None
+                          else road_segments_path)
+    return sha256(file_hash(city_gps_path) + file_hash(road_segments_path)).hexdigest()
+
+
+class RouteCache:
+    """A class to store route results in memory and on disk.
+
+    Thread-safe. A process that forks after using the cache opens its own
+    connection to the SQLite file on first use.
+    """
+
+    def __init__(self, path=None, *, size=DEFAULT_SIZE, version=None):
+        """Initialize an instance of this class.
+
+        Parameters:
+            path: SQLite file, or None for config.ROUTE_CACHE_PATH. ':memory:'
+                         keeps the second tier in memory too.
+            size: Number of results kept in the in-process LRU.
+            version: Data version, or None for data_version() of the
+                         configured data files.
+        """
+        self.path = config.ROUTE_CACHE_PATH if path is None else path
+        self.size = size
+        self.version = data_version() if version is None else version
+        self.updated = False    # Roads changed; the SQLite file no longer applies.
+
+        self.lru = OrderedDict()    # (start, end, opt) in canonical order -> record.
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None     # Process that opened self.connection.
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.reversed_hits = 0  # Hits of either tier served by reversing.
+        self.misses = 0
+
+    def connect(self):
+        if self.connection is not None and self.pid == os.getpid():
+            return self.connection
+
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS routes ('
+                           'version TEXT, start TEXT, end TEXT, opt TEXT, result TEXT, '
+                           'PRIMARY KEY (version, start, end, opt))')
+        # Only versions of whole data files are stored, never of data changed
+        # by road updates, so any other version is of files that have changed.
+        connection.execute('DELETE FROM routes WHERE version != ?', (self.version,))
+        connection.commit()
+
+        self.connection = connection
+        self.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def key(start, end, opt):
+        """
+        Return (key, reversed), where key puts the two cities in canonical
+        order and reversed is True if that swapped them.
+        """
+        if end < start:
+            return (end, start, opt), True
+        return (start, end, opt), False
+
+    def get(self, start, end, opt):
+        """
+        Return the cached record for the given query, or None on a miss. A
+        record is a dict with the route's 'path' (list of city names, or None
+        if there is no route), 'gofs' and the TOTALS.
+        """
+        key, swapped = self.key(start, end, opt)
+
+        with self.lock:
+            record = self.lru.get(key)
+            if record is not None:
+                self.lru.move_to_end(key)
+                self.memory_hits += 1
+            elif self.updated:
+                self.misses += 1
+                return None
+            else:
+                row = self.connect().execute(
+                    'SELECT result FROM routes WHERE version = ? AND start = ? '
+                    'AND end = ? AND opt = ?', (self.version, *key)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                record = json.loads(row[0])
+                self.remember(key, record)
+                self.disk_hits += 1
+
+            if swapped:
+                self.reversed_hits += 1
+
+        if swapped and record['path'] is not None:
+            record = dict(record, path=record['path'][::-1])
+        return record
+
+    def put(self, start, end, opt, record):
+        """
+        Store the given record, as returned by get(), for the given query.
+        """
+        key, swapped = self.key(start, end, opt)
+        if swapped and record['path'] is not None:
+            record = dict(record, path=record['path'][::-1])
+
+        with self.lock:
+            self.remember(key, record)
+            if self.updated:
+                return
+            connection = self.connect()
+            connection.execute('INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?)',
+                               (self.version, *key, json.dumps(record)))
+            connection.commit()
+
+    def remember(self, key, record):
+        self.lru[key] = record
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.size:
+            self.lru.popitem(last=False)
+
+    def invalidate(self, city1, city2, opts=(), *, updates=None):
+        """
+        Delete every entry whose route travels directly between the two given
+        cities, in either direction, and every entry for the given
+        optimization methods. Call it after changing a road between the two
+        cities, with the methods in which the road got cheaper: in those, any
+        route may now have a better alternative, while in the others only the
+        routes over the road, and their totals, can have changed.
+        :param city1: Name of one city of the road.
+        :param city2: Name of the other city.
+        :param opts: Optimization methods whose entries are all deleted.
+        :param updates: RoadNetwork.updates after the change. If given and
+                        not empty, the SQLite file is left as it is, for other
+                        processes on the unchanged data, and no longer used.
+        :return: number of entries deleted.
+        """
+
+        # A stored path is a JSON list, so a route over the road contains the
+        # two names as consecutive items in one order or the other.
+
+        patterns = [json.dumps([city1, city2])[1:-1], json.dumps([city2, city1])[1:-1]]
+        opts = list(opts)
+
+        with self.lock:
+            stale = [key for key, record in self.lru.items()
+                     if key[2] in opts or travels(record['path'], city1, city2)]
+            for key in stale:
+                del self.lru[key]
+
+            if updates:
+                self.updated = True
+            if self.updated:
+                return len(stale)
+
+            connection = self.connect()
+            deleted = connection.execute(
+                f'DELETE FROM routes WHERE version = ? AND (instr(result, ?) > 0 OR '
+                f'instr(result, ?) > 0 OR opt IN ({", ".join("?" * len(opts))}))',
+                (self.version, *patterns, *opts)).rowcount
+            connection.commit()
+
+        return deleted
+
+    def clear(self):
+        """
+        Delete every entry from both tiers.
+        """
+        with self.lock:
+            self.lru.clear()
+            connection = self.connect()
+            connection.execute('DELETE FROM routes')
+            connection.commit()
+
+    def stats(self):
+        """
+        Return a dict of hit and miss counts.
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {'memory_hits': self.memory_hits, 'disk_hits': self.disk_hits,
+                'reversed_hits': self.reversed_hits, 'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.00}
+
+
+def travels(path, city1, city2):
+    """
+    Return True if the given list of city names, or None, goes directly
+    from one of the two given cities to the other.
+    """
+    if path is None:
+        return False
+    return any((a == city1 and b == city2) or (a == city2 and b == city1)
+               for a, b in zip(path, path[1:]))
+
+
+def route_record(node):
+    """
+    Return the cache record for the given route Node, or for None.
+    """
+    if node is None:
+        return {'path': None}
+
+    record = {'path': list(node.path), 'gofs': node.gofs}
+    for total in TOTALS:
+        record[total] = getattr(node.data, total)
+    return record
+
+
+def record_node(road_network, record):
+    """
+    Return the route Node for the given cache record, or None if it records
+    that there is no route.
+    """
+    path = record['path']
+    if path is None:
+        return None
+
+    end_id = road_network.ids[path[-1]]
+    data = CityData(path[-1], lat=road_network.lat[end_id], lng=road_network.lng[end_id],
+                    starting_city=path[0], **{total: record[total] for total in TOTALS})
+    return Node(path[-1], data=data, gofs=record['gofs'], hofs=0.00, path=path)
@@ -0,0 +1,335 @@
+from node import Label, Node
+from frontier import Frontier
+from city_data import CityData
+from heuristics import GoalHeuristic
+from landmarks import LandmarkHeuristic
+from math import inf
+from road_network import OPTIMIZATIONS
+from search_stats import SearchStats
+from time import perf_counter
+
+
+class RouteSearch:
+    """
+    A class to hold the state of a single route query.
+
+    The search keeps one Label per city it has reached, keyed by city id, so
+    its memory grows with the number of cities visited rather than with the
+    length of the paths explored.
+    """
+
+    def __init__(self, road_network, *, start, end, opt,
+                 precompute_heuristic=None, landmarks=None, timed=False):
+        """Initialize an instance of this class.
+
+        Parameters:
+            road_network: The RoadNetwork to search. It is not modified.
+            start: Name of the starting city or location.
+            end: Name of the ending city or location.
+            opt: Optimization method.
+            precompute_heuristic: See GoalHeuristic.
+            landmarks: A LandmarkTable for the ALT heuristic, or None to use
+                         the straight-line heuristic.
+            timed: If True, split the time spent into heuristic, successor
+                         and queue time in self.stats. The timers slow the
+                         search by about a fifth, so counters alone are kept
+                         otherwise.
+        """
+        if opt not in OPTIMIZATIONS:
+            raise ValueError(f'Unknown optimization {opt!r}; expected one of '
+                             f'{", ".join(OPTIMIZATIONS)}.')
+
+        self.road_network = road_network
+        self.cost_function = opt
+        self.costs = road_network.costs(opt)
+
+        self.start_city = road_network.ids[start]
+        self.end_city = road_network.ids[end]
+        self.stats = SearchStats()
+
+        heuristic_start = perf_counter()
+        if landmarks is not None:
+            self.heuristic = LandmarkHeuristic(landmarks, self.end_city, opt,
+                                               precompute=precompute_heuristic)
+        else:
+            self.heuristic = GoalHeuristic(road_network, self.end_city, opt,
+                                           precompute=precompute_heuristic)
+        self.stats.heuristic_seconds = perf_counter() - heuristic_start
+
+        # A precomputed heuristic is a list lookup, too cheap to time per
+        # call; its cost is the precomputation timed above.
+
+        self.timed = timed
+        self.time_heuristic = timed and self.heuristic.values is None
+
+        self.labels = dict()  # City id -> Label, for every city reached.
+        self.fringe = Frontier()
+        self.closed = set()
+
+    @property
+    def expanded(self):
+        return self.stats.expanded  # Number of labels expanded.
+
+    def is_goal(self, label):
+        """
+        Return true if the given label is for the goal city.
+        :param label: type Label.
+        :return: bool
+        """
+        return label.city == self.end_city
+
+    @staticmethod
+    def priority(label):
+        """
+        Return the frontier priority of the given label. Ties on fofs go to
+        the label with the smaller hofs, that is, the one believed to be
+        closer to the goal, and then (in the Frontier) to the label queued
+        first. This ordering is the same for every cost function.
+        :param label: type Label.
+        :return: tuple.
+        """
+        return label.fofs, label.hofs
+
+    def begin(self):
+        """
+        Create the label for the start city and queue it.
+        :return: type Label.
+        """
+        start = Label(self.start_city, gofs=0.00,
+                      hofs=self.heuristic(self.start_city))
+        self.labels[self.start_city] = start
+        self.fringe.push(start.city, self.priority(start))
+        return start
+
+    def expand(self, label):
+        """
+        Close the given label and queue its successors.
+        :param label: type Label.
+        :return: list of Label.
+        """
+        stats = self.stats
+        self.closed.add(label.city)
+        stats.expanded += 1
+        if len(self.closed) > stats.peak_closed:
+            stats.peak_closed = len(self.closed)
+
+        if self.timed:
+            successors_start = perf_counter()
+            successors = self.successors(label)
+            queue_start = perf_counter()
+            self.queue(successors)
+            stats.successor_seconds += queue_start - successors_start
+            stats.queue_seconds += perf_counter() - queue_start
+        else:
+            successors = self.successors(label)
+            self.queue(successors)
+
+        stats.generated += len(successors)
+        if len(self.fringe) > stats.peak_frontier:
+            stats.peak_frontier = len(self.fringe)
+        return successors
+
+    def reopen(self, city_id):
+        """
+        Let the given city, whose gofs just dropped, be expanded again if it
+        was closed. queue() then queues it.
+        :param city_id: city id in the road network.
+        """
+        self.closed.discard(city_id)
+
+    def queue(self, successors):
+        """
+        Queue the given successors.
+        :param successors: list of Label.
+        """
+
+        # Successors are either new labels or queued labels whose gofs just
+        # dropped; pushing the latter lowers their priority in place.
+
+        # Cities whose hofs is inf cannot reach the goal, and cities reached
+        # only over closed roads, whose gofs is inf, cannot be reached at all.
+        # Neither is queued.
+
+        for successor in successors:
+            if successor.gofs + successor.hofs < inf:
+                self.fringe.push(successor.city, self.priority(successor))
+
+    def pop(self):
+        """
+        Remove the best label from the fringe and return it.
+        :return: type Label.
+        """
+        if not self.timed:
+            return self.labels[self.fringe.pop()[0]]
+
+        queue_start = perf_counter()
+        city_id, _ = self.fringe.pop()
+        self.stats.queue_seconds += perf_counter() - queue_start
+        return self.labels[city_id]
+
+    def update_stats(self):
+        """
+        Copy the fringe's counters into self.stats and return it.
+        :return: type SearchStats.
+        """
+        self.stats.pushes = self.fringe.pushes
+        self.stats.pops = self.fringe.pops
+        self.stats.stale_pops = self.fringe.stale_pops
+        return self.stats
+
+    def solve(self):
+        """
+        Find the best route between the start city and end city or fail.
+        Counters and timings are left in self.stats.
+        :return: type Node for the end city, or None.
+        """
+        solve_start = perf_counter()
+        try:
+            return self.search()
+        finally:
+            self.update_stats().solve_seconds = perf_counter() - solve_start
+
+    def search(self):
+        """
+        Run the search for solve().
+        :return: type Node for the end city, or None.
+        """
+        start = self.begin()
+
+        # Are we there yet?
+        if self.is_goal(start):
+            return self.route_to(start)
+
+        # The heuristic can prove the end city unreachable.
+        if start.hofs == inf:
+            return
+
+        while self.fringe:
+            label = self.pop()
+
+            # How much longer??
+            if self.is_goal(label):
+                return self.route_to(label)
+
+            # Can we stop for ice cream???
+            self.expand(label)
+
+        # You can't get there from here.
+        return
+
+    def successors(self, label):
+        """
+        Return the labels of cities reachable from the given one over one
+        road that are either new to this search or reached more cheaply than
+        before.
+        :param label: type Label.
+        :return: list of Label.
+        """
+        successors = list()
+
+        network = self.road_network
+        labels = self.labels
+        costs = self.costs
+        heuristic = self.heuristic
+        time_heuristic = self.time_heuristic
+        heuristic_seconds = 0.00
+
+        # Only the roads incident to this city are visited. The network index
+        # already resolves which end of each road is the neighbor.
+
+        for succ_city_id, road_id in network.neighbors(label.city):
+            gofs = label.gofs + costs[road_id]
+            successor = labels.get(succ_city_id)
+
+            if successor is None:
+                if time_heuristic:
+                    heuristic_start = perf_counter()
+                    hofs = heuristic(succ_city_id)
+                    heuristic_seconds += perf_counter() - heuristic_start
+                else:
+                    hofs = heuristic(succ_city_id)
+
+                successor = Label(succ_city_id, gofs=gofs, hofs=hofs,
+                                  parent=label.city, road=road_id)
+                labels[succ_city_id] = successor
+
+            elif gofs < successor.gofs:
+
+                # The hofs value cannot change, because it is calculated
+                # relative to the end city. Only the cost and the way back
+                # to the start are replaced. The straight-line and junction
+                # estimates are not always consistent, so a closed city can
+                # still be improved; it is then reopened.
+
+                successor.gofs = gofs
+                successor.parent = label.city
+                successor.road = road_id
+                self.reopen(succ_city_id)
+
+            else:
+                continue
+
+            successors.append(successor)
+
+        # Heuristic time is reported apart from the rest of successor
+        # generation, which expand() times as a whole.
+
+        if time_heuristic:
+            self.stats.heuristic_seconds += heuristic_seconds
+            self.stats.successor_seconds -= heuristic_seconds
+        return successors
+
+    def path_to(self, label):
+        """
+        Rebuild the path from the start city to the given label by following
+        parent ids.
+        :param label: type Label.
+        :return: (list of city ids, list of road ids).
+        """
+        cities = list()
+        roads = list()
+        current = label
+        while current is not None:
+            cities.append(current.city)
+            if current.road >= 0:
+                roads.append(current.road)
+            current = self.labels.get(current.parent)
+        cities.reverse()
+        roads.reverse()
+        return cities, roads
+
+    def route_to(self, label):
+        """
+        Return the route from the start city to the given label as a Node
+        whose data holds the route totals.
+        :param label: type Label.
+        :return: type Node.
+        """
+        cities, roads = self.path_to(label)
+        return route_node(self.road_network, cities, roads, label.gofs)
+
+
+def route_node(road_network, cities, roads, gofs):
+    """
+    Return a Node for the last of the given cities whose path lists the city
+    names and whose data (type CityData) holds the totals over the given
+    roads.
+    :param road_network: type RoadNetwork.
+    :param cities: list of city ids, from start to end.
+    :param roads: list of road ids, one fewer than cities.
+    :param gofs: cost of the route for the optimization method used.
+    :return: type Node.
+    """
+    network = road_network
+    path = [network.names[city_id] for city_id in cities]
+
+    data = CityData(path[-1], lat=network.lat[cities[-1]],
+                    lng=network.lng[cities[-1]], starting_city=path[0],
+                    segments=len(roads))
+    for road_id in roads:
+        data.distance += network.dist[road_id]
+        data.hours += network.hours[road_id]
+        data.hours_bike += network.hours_bike[road_id]
+        data.accidents += network.accidents[road_id]
+
+    return Node(path[-1], data=data, gofs=gofs, hofs=0.00, path=path)
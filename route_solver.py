@@ -1,46 +1,84 @@
-from node import Node
-from queue import PriorityQueue
-from math import atan, cos, radians, sin, sqrt
-from unique_instances import UniqueInstancesClass
-from city_data import CityData
-from road_data import RoadData
-import config
+from anytime import AnytimeSearch
+from bidirectional import BidirectionalSearch
+from difflib import get_close_matches
+from heuristics import great_circle
+from hierarchy import HierarchySearch, contract, load_hierarchy
+from isochrone import reachable
+from landmarks import load_landmarks
+from k_shortest import KShortestSearch
+from matrix import matrix
+from pareto import DEFAULT_DEADLINE, DEFAULT_MAX_LABELS, ParetoSearch
+from road_network import OPTIMIZATIONS
+from route_cache import record_node, route_record
+from route_search import RouteSearch
+from spatial_index import CityIndex, parse_point
+import threading
+import time
+import graph_cache
+
+# Search algorithm name -> search class. Every class takes the road network,
+# start, end, opt and timed, plus the options RouteSolver.search_options()
+# returns for it. Each has a solve() method returning a Node or None, and
+# expanded and stats attributes. AnytimeSearch.solve() also takes a deadline.
+ALGORITHMS = {'astar': RouteSearch, 'bidirectional': BidirectionalSearch,
+              'hierarchy': HierarchySearch, 'anytime': AnytimeSearch}
 
 
 class RouteSolver:
     """
     A class to find the best route between two cities.
+
+    The road network is loaded once per instance and only changed through
+    update_road(). Each query runs in its own RouteSearch, so one instance can
+    answer any number of queries, from several threads at once, without
+    carrying state from one search into the next.
     """
 
-    def __init__(self, *, start, end, opt):
+    def __init__(self, *, start=None, end=None, opt=None, algorithm='astar',
+                 network=None, precompute_heuristic=None, landmarks=None, cache=None):
         """Initialize an instance of this class.
 
         Parameters:
-            start: Name of the starting city or location.
-            end: Name of the ending city or location.
-            opt: Optimization method.
+            start: Name of the starting city or location used by solve().
+            end: Name of the ending city or location used by solve().
+            opt: Optimization method used by solve().
+            algorithm: Default search algorithm, one of ALGORITHMS.
+            network: A loaded RoadNetwork to share, or None to load one.
+            precompute_heuristic: Passed to GoalHeuristic for every query.
+                         If None, heuristics are precomputed when NumPy is
+                         installed.
+            landmarks: A LandmarkTable for the ALT heuristic. If None, the
+                         table written by landmarks.py is used, and computed
+                         and saved first if there is no current one. If
+                         False, the straight-line heuristic is always used;
+                         it overestimates on some roads of this data, so
+                         routes may then cost more than the best.
+            cache: A RouteCache consulted by route() before searching, or
+                         None.
         """
 
         self.start_city_name = start
         self.end_city_name = end
         self.cost_function = opt
-
-        self.city_data = dict()  # Initialized by self.build_city_data().
+        self.algorithm = algorithm
+        self.precompute_heuristic = precompute_heuristic
+
+        load_start = time.perf_counter()
+        self.road_network = graph_cache.load_network() if network is None else network
+        self.load_seconds = time.perf_counter() - load_start
+
+        if landmarks is None:
+            landmarks = load_landmarks(self.road_network)
+        self.landmarks = landmarks or None
+        self.cache = cache
+        self.hierarchies = dict()  # opt -> ContractionHierarchy, loaded on first use.
+        self.hierarchy_versions = dict()    # opt -> road updates that changed its costs.
+        self.rebuilding = set()     # Methods whose hierarchy a thread is contracting.
+        self.stale_landmarks = set()    # Methods whose landmark costs need recomputing.
+        self.lock = threading.Lock()    # Guards landmarks, the four above and road updates.
+        self.hierarchy_lock = threading.Lock()  # Serializes loading hierarchies.
         self.road_data = dict()  # Initialized by self.build_road_data().
-
-        self.build_city_data()
-        self.build_road_data()
-
-        start_city_data = self.city_data[start]
-        end_city_data = self.city_data[end]
-
-        self.start_city = Node(start, data=start_city_data, gofs=0.00,
-                               path=[start])
-        
-        self.end_city = Node(end, hofs=0.00, data=end_city_data)
-
-        self.fringe = PriorityQueue()
-        self.closed = list()
+        self.city_index = None  # Initialized by self.nearest().
 
     @classmethod
     def distance(cls, city1, city2):
@@ -50,266 +88,343 @@ class RouteSolver:
         :param city2: type Node.
         :return: the distance in miles.
         """
-
-        earth_radius = 3958.8  # miles
-
-        lat1 = radians(city1.data.lat)
-        lng1 = radians(city1.data.lng)
-        lat2 = radians(city2.data.lat)
-        lng2 = radians(city2.data.lng)
-        delta_lng = abs(lng2 - lng1)
-        cos_delta_lng = cos(delta_lng)
-        cos_lat1 = cos(lat1)
-        cos_lat2 = cos(lat2)
-        sin_delta_lng = sin(delta_lng)
-        sin_lat1 = sin(lat1)
-        sin_lat2 = sin(lat2)
-
-        term_a = (cos_lat2 * sin_delta_lng) ** 2
-        term_b = (cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_delta_lng) ** 2
-        term_c = sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * cos_delta_lng
-
-        try:
-            central_angle = atan(sqrt(term_a + term_b) / term_c)
-        except ZeroDivisionError:
-            return 0
-
-        return earth_radius * central_angle
-
-    def build_city_data(self):
-        """
-        Initialize self.city_data.
-        :return:
-        """
-        if len(self.city_data) > 0:
-            return self.city_data
-
-        with open(config.CITY_GPS_PATH, 'r') as f:
-            city_gps_lines = f.readlines()
-
-        for line in city_gps_lines:
-            tokens = line.split()
-            name = tokens[0]
-            lat = float(tokens[1])
-            lng = float(tokens[2])
-            self.city_data[tokens[0]] = CityData(name, lat=lat, lng=lng)
+        return great_circle(city1.data.lat, city1.data.lng,
+                            city2.data.lat, city2.data.lng)
 
     def build_road_data(self):
         """
-        Initialize self.road_data.
+        Initialize self.road_data, keyed by (city1, city2).
         :return:
         """
         if len(self.road_data) > 0:
             return self.road_data
 
-        with open(config.ROAD_SEGMENTS_PATH, 'r') as f:
-            road_segments_lines = f.readlines()
-
-        for line in road_segments_lines:
-            tokens = line.split()
-            city1 = tokens[0]
-            city2 = tokens[1]
-            dist = int(tokens[2])
-            speed = int(tokens[3])
-            name = tokens[4]
-            key = (city1, city2)
-            self.road_data[key] = RoadData(name, city1=city1, city2=city2,
-                                           dist=dist, speed=speed)
+        network = self.road_network
+        for road_id in range(network.road_count):
+            road = network.road(road_id)
+            self.road_data[(road.city1, road.city2)] = road
+        return self.road_data
 
-    def is_goal(self, city):
+    def nearest(self, lat, lng, k=1):
         """
-        Return true if the given city (type Node) is the goal city.
-        :param city: type Node.
-        :return: bool
+        Return the k cities with a GPS row nearest the given point. See
+        spatial_index.py.
+        :param lat: Latitude in degrees.
+        :param lng: Longitude in degrees.
+        :param k: Number of cities.
+        :return: list of (city name, miles), nearest first.
         """
-        return self.distance(city, self.end_city) == 0
+        if self.city_index is None:
+            self.city_index = CityIndex(self.road_network)
+        return self.city_index.nearest(lat, lng, k)
 
-    def solve(self):
+    def resolve(self, place):
         """
-        Find the best route between the start city and end city or fail.
-        :return:
+        Return the name of the city the given place stands for: the place
+        itself if it is a city name, or the nearest city if it is a 'lat,lng'
+        pair. Raise ValueError, naming the closest matches, for anything else.
+        :param place: City name or 'lat,lng' in degrees.
+        :return: City name.
         """
+        if place in self.road_network.ids:
+            return place
 
-        # Are we there yet?
-        if self.is_goal(self.start_city):
-            return self.start_city
-
-        if self.cost_function in ['segments']:
-            self.fringe.put((0.00, 0, self.start_city))
-        else:
-            self.fringe.put((0.00, self.start_city))
-
-        counter = 0
-        while not self.fringe.empty():
-            if self.cost_function in ['segments']:
-                fofs, _, next_city = self.fringe.get()
-            else:
-                fofs, next_city = self.fringe.get()
-
-            # How much longer??
-            if self.is_goal(next_city):
-                return next_city
+        point = parse_point(place)
+        if point is not None:
+            return self.nearest(*point)[0][0]
 
-            self.closed.append(next_city.name)
+        matches = get_close_matches(place, self.road_network.names, n=3)
+        hint = f'; did you mean {" or ".join(matches)}?' if matches else '.'
+        raise ValueError(f'Unknown city {place!r}{hint}')
 
-            # Can we stop for ice cream???
-            for successor in self.successors(next_city):
-                if self.cost_function in ['segments']:
-                    if (successor.fofs, 0, successor) not in self.fringe.queue:
-                        counter += 1
-                        self.fringe.put((successor.fofs, counter, successor))
-                else:
-                    if (successor.fofs, successor) not in self.fringe.queue:
-                        self.fringe.put((successor.fofs, successor))
-
-        # You can't get there from here.
-        return
-
-    def successors(self, city):
+    def hierarchy(self, opt):
         """
-        :param city: type Node.
-        :return:
+        Return the ContractionHierarchy for the given optimization method,
+        loading it, or contracting the network if there is no current one, on
+        first use. Once a road update has changed the method's costs, the
+        stored hierarchy no longer applies. The network is then contracted
+        again in a background thread, and None is returned until it is done.
         """
-        successors = list()
-        road_data = self.road_data
-
-        for pair in road_data.keys():
-            if city.name in pair:
-                index = {0: 1, 1: 0}[pair.index(city.name)]
-                succ_city_name = pair[index]
-                if succ_city_name in self.closed:
-                    continue
-                try:
-                    succ_data = self.city_data[succ_city_name]
-                except KeyError:
-                    continue
-                segments = city.data.segments + 1
-                distance = city.data.distance + road_data[pair].dist
-                hours = city.data.hours + road_data[pair].hours
-                hours_bike = city.data.hours_bike + road_data[pair].hours_bike
-                accidents = city.data.accidents + road_data[pair].accidents
-                path = city.path + [succ_city_name]
-                succ_data.starting_city = self.start_city
-                succ_data.segments = segments
-                succ_data.distance = distance
-                succ_data.hours = hours
-                succ_data.hours_bike = hours_bike
-                succ_data.accidents = accidents
-
-                # Is the goal city? Check by name. (This is not an exit
-                # condition.)
-
-                if succ_city_name == self.end_city.name:
-
-                    # This is the goal city!
-
-                    self.end_city.segments = segments
-                    self.end_city.distance = distance
-                    self.end_city.hours = hours
-                    self.end_city.hours_bike = hours_bike
-                    self.end_city.accidents = accidents
-                    self.end_city.path = path
-
-                    successors.append(self.end_city)
-
-                    continue
-
-                # The successor may already exist in the fringe. First we check
-                # if an instance has been created at all. Note that an instance
-                # of Node HAS been created for the goal city: self.end_city, but
-                # we already check for this.
-
-                existing_city_nodes = UniqueInstancesClass.get_instances()
-
-                search_name = f'Node:{succ_city_name}'
-
-                if search_name in existing_city_nodes.keys():
-
-                    # The successor already exists as an instantiated Node. The
-                    # hofs value cannot change, because it is calculated
-                    # relative to the end city. But the gofs will be smaller if
-                    # the search has (just now) discovered a shorter path to
-                    # reach the successor.
-
-                    city = existing_city_nodes[search_name]
-
-                    # Now we must check if the successor, which already exists,
-                    # is in the fringe. It should be, because we would not
-                    # reach this point if the successor name was in self.closed
-                    # or if the successor was the goal city, and there is
-                    # nowhere else for it to be.
-
-                    if (city.fofs, city) in self.fringe.queue:
-
-                        # Now check if the distance just calculated is less than
-                        # the current gofs.
-
-                        if succ_data.distance + city.hofs > city.fofs:
-
-                            # The new gofs is less, so remove the existing node
-                            # from the fringe.
-
-                            self.fringe.queue.remove((city.fofs, city))
-
-                            # Overwrite the stored value of gofs, and overwrite
-                            # the path (since it must be different).
-
-                            city.gofs = succ_data.distance
-                            city.path = path
-
-                            # Add the existing node to the successors. After the
-                            # return to the calling unit, the existing node will
-                            # be put back on the fringe, but with new values
-                            # for gofs and path.
-
-                            successors.append(city)
-
-                            continue
+        hierarchy = self.hierarchies.get(opt)
+        if hierarchy is not None:
+            return hierarchy
+
+        with self.hierarchy_lock:
+            with self.lock:
+                if opt in self.hierarchies or opt in self.rebuilding:
+                    return self.hierarchies.get(opt)
+                if opt in self.road_network.modified:
+                    self.start_rebuild(opt)
+                    return None
+                version = self.hierarchy_versions.get(opt, 0)
+
+            # Loading may take as long as contracting, so road updates and
+            # other searches are not held up meanwhile.
+
+            hierarchy = load_hierarchy(self.road_network, opt)
+            with self.lock:
+                if self.hierarchy_versions.get(opt, 0) != version:
+                    self.start_rebuild(opt)
+                    return None
+                self.hierarchies[opt] = hierarchy
+                return hierarchy
+
+    def start_rebuild(self, opt):
+        """
+        Start contracting the network for the given optimization method in a
+        background thread. Call with self.lock held.
+        """
+        self.rebuilding.add(opt)
+        threading.Thread(target=self.rebuild_hierarchy, args=(opt,),
+                         name=f'hierarchy-{opt}', daemon=True).start()
 
-                        else:
+    def rebuild_hierarchy(self, opt):
+        """
+        Contract the network for the given optimization method, again if a
+        road update changed its costs meanwhile, and keep the result.
+        """
+        try:
+            while True:
+                with self.lock:
+                    version = self.hierarchy_versions.get(opt, 0)
+                hierarchy = contract(self.road_network, opt)
+                with self.lock:
+                    if self.hierarchy_versions.get(opt, 0) == version:
+                        self.hierarchies[opt] = hierarchy
+                        self.rebuilding.discard(opt)
+                        return
+        finally:
+            with self.lock:
+                self.rebuilding.discard(opt)
+
+    def landmark_table(self, opt):
+        """
+        Return the LandmarkTable to use for the given optimization method, or
+        None, first recomputing its costs for the method if a road update has
+        made some road cheaper in it.
+        """
+        if opt not in self.stale_landmarks:
+            return self.landmarks
 
-                            # The new gofs is greater than the existing value.
-                            # We can reject this city as a viable successor.
+        with self.lock:
+            if opt in self.stale_landmarks:
+                self.landmarks = self.landmarks.recompute(self.road_network, [opt])
+                self.stale_landmarks.discard(opt)
+            return self.landmarks
 
-                            continue
+    def search_options(self, algorithm, opt):
+        """
+        Return the keyword arguments, beyond the network and the query, that
+        the given algorithm's search class takes. For 'hierarchy', the
+        hierarchy is None while it is being rebuilt.
+        """
+        if algorithm == 'hierarchy':
+            return {'hierarchy': self.hierarchy(opt)}
+        return {'precompute_heuristic': self.precompute_heuristic,
+                'landmarks': self.landmark_table(opt)}
 
-                    # The successor exists as an instantiated node but it is not
-                    # referenced by name in self.closed, is not on the fringe,
-                    # and is not the goal city. So this is a stray node that is
-                    # somehow lost, and indicates a logic error.
+    @staticmethod
+    def search_class(algorithm, opt):
+        """
+        Return the search class for the given algorithm, or raise ValueError
+        if either the algorithm or the optimization method is unknown.
+        """
+        try:
+            search_class = ALGORITHMS[algorithm]
+        except KeyError:
+            raise ValueError(f'Unknown algorithm {algorithm!r}; expected one of '
+                             f'{", ".join(ALGORITHMS)}.')
+        if opt not in OPTIMIZATIONS:
+            raise ValueError(f'Unknown optimization {opt!r}; expected one of '
+                             f'{", ".join(OPTIMIZATIONS)}.')
+        return search_class
+
+    def search(self, start, end, opt, algorithm=None, *, timed=False, **options):
+        """
+        Return a new, unsolved search for the best route between the given
+        cities. Call its solve() method to run it; afterwards its expanded
+        attribute holds the number of cities expanded.
+        :param start: Name of the starting city, or 'lat,lng'.
+        :param end: Name of the ending city, or 'lat,lng'.
+        :param opt: Optimization method, one of OPTIMIZATIONS.
+        :param algorithm: One of ALGORITHMS, or None for self.algorithm.
+        :param timed: If True, the search's stats include a split of the
+                      time spent. See RouteSearch.
+        :param options: Further keyword arguments for the search class, such
+                        as weight, max_frontier and max_closed for
+                        AnytimeSearch.
+        :return: an instance of the algorithm's class in ALGORITHMS.
+        """
+        algorithm = self.algorithm if algorithm is None else algorithm
+        start, end = self.resolve(start), self.resolve(end)
+        search_class = self.search_class(algorithm, opt)
 
-                    continue
+        search_options = self.search_options(algorithm, opt)
+        if algorithm == 'hierarchy' and search_options['hierarchy'] is None:
+            # Being rebuilt after a road update; A* finds the same routes.
+            search_class = ALGORITHMS['astar']
+            search_options = self.search_options('astar', opt)
 
-                else:
-                    # The successor has not been instantiated. Instantiate it,
-                    # and add it to the list of successors.
+        return search_class(self.road_network, start=start, end=end, opt=opt,
+                            timed=timed, **search_options, **options)
 
-                    # The choice of gofs and hofs depends on the cost function
-                    # specified by the user.
+    def update_road(self, city1, city2, *, name=None, dist=None, speed=None, closed=None):
+        """
+        Change the length or speed limit of the road between the given cities,
+        or close or reopen it, and invalidate only what depended on its old
+        costs. See RoadNetwork.update_road().
+
+        - Hierarchies for the methods whose cost changed are dropped and
+          contracted again in a background thread. Hierarchy searches for
+          those methods run as A* searches until it is done.
+        - Landmark costs for the methods in which the road got cheaper are
+          recomputed on next use. Dearer roads leave the bounds admissible.
+        - Cached routes over the road are deleted, and so are all cached
+          routes for the methods in which it got cheaper.
+
+        Searches already running may see the road's old or new costs.
+        :param city1: Name of one city of the road.
+        :param city2: Name of the other city.
+        :param name: Road name, needed only if several roads join the cities.
+        :param dist: New length in miles, or None to keep it.
+        :param speed: New speed limit in mph, or None to keep it.
+        :param closed: True to close the road, False to reopen it, or None to
+                       leave it as it is.
+        :return: dict, optimization method -> (old cost, new cost), for the
+                 methods whose cost for the road changed.
+        """
+        network = self.road_network
+        road_id = network.road_id(city1, city2, name)
+
+        with self.lock:
+            changes = network.update_road(road_id, dist=dist, speed=speed, closed=closed)
+            if not changes:
+                return changes
+
+            cheaper = [opt for opt, (old, new) in changes.items() if new < old]
+            for opt in changes:
+                self.hierarchy_versions[opt] = self.hierarchy_versions.get(opt, 0) + 1
+                if self.hierarchies.pop(opt, None) is not None and opt not in self.rebuilding:
+                    self.start_rebuild(opt)
+            if self.landmarks is not None:
+                self.stale_landmarks.update(cheaper)
+
+            road = network.road(road_id)
+            if self.road_data:
+                self.road_data[(road.city1, road.city2)] = road
+            if self.cache is not None:
+                self.cache.invalidate(road.city1, road.city2, cheaper, updates=network.updates)
+
+        return changes
+
+    def close_road(self, city1, city2, *, name=None):
+        """
+        Close the road between the given cities. See update_road().
+        """
+        return self.update_road(city1, city2, name=name, closed=True)
 
-                    gofs = {
-                        'segments': succ_data.segments, 'distance': succ_data.distance,
-                        'time': succ_data.hours, 'cycling': succ_data.accidents
-                    }[self.cost_function]
+    def reopen_road(self, city1, city2, *, name=None):
+        """
+        Reopen the road between the given cities. See update_road().
+        """
+        return self.update_road(city1, city2, name=name, closed=False)
 
-                    successor = Node(succ_city_name, data=succ_data,
-                                     gofs=gofs, path=path)
+    def route(self, start, end, opt, algorithm=None, *, deadline=None):
+        """
+        Find the best route between the given cities or fail.
+        :param start: Name of the starting city, or 'lat,lng'.
+        :param end: Name of the ending city, or 'lat,lng'.
+        :param opt: Optimization method, one of OPTIMIZATIONS.
+        :param algorithm: One of ALGORITHMS, or None for self.algorithm.
+        :param deadline: Seconds the search may take, or None for no limit.
+                         If given, the search is an AnytimeSearch, and the
+                         best route found by then is returned; it is cached
+                         only if it is proven the best.
+        :return: type Node for the end city, or None if there is no route, or
+                 none was found before the deadline.
+        """
+        start, end = self.resolve(start), self.resolve(end)
+        algorithm = self.algorithm if algorithm is None else algorithm
+        self.search_class(algorithm, opt)   # Fail as a search would, even on a cache hit.
+        if deadline is not None:
+            if algorithm not in ('astar', 'anytime'):
+                raise ValueError(f'A deadline needs the anytime algorithm, not {algorithm!r}.')
+            algorithm = 'anytime'
+
+        if self.cache is not None:
+            record = self.cache.get(start, end, opt)
+            if record is not None:
+                return record_node(self.road_network, record)
+
+        search = self.search(start, end, opt, algorithm)
+        if deadline is None:
+            solution = search.solve()
+        else:
+            solution = search.solve(deadline)
 
-                    distance = self.distance(successor, self.end_city)
+        if self.cache is not None and (deadline is None or search.finished):
+            self.cache.put(start, end, opt, route_record(solution))
+        return solution
 
-                    try:
-                        hours = distance / (city.data.distance / city.data.hours)
-                    except ZeroDivisionError:
-                        hours = distance / self.road_data[pair].speed_limit
+    def matrix(self, origins, destinations, opt, *, paths=False, workers=1):
+        """
+        Return the matrix of best route costs from every origin to every
+        destination. See matrix.matrix().
+        :param origins: City names or 'lat,lng' points, one per row.
+        :param destinations: City names or 'lat,lng' points, one per column.
+        :param opt: Optimization method, one of OPTIMIZATIONS.
+        :param paths: If True, return (matrix, MatrixPaths).
+        :param workers: Number of processes, or None for one per CPU.
+        :return: a NumPy array, or a list of array('d') rows without NumPy.
+        """
+        origins = [self.resolve(place) for place in origins]
+        destinations = [self.resolve(place) for place in destinations]
+        return matrix(self.road_network, origins, destinations, opt,
+                      paths=paths, workers=workers)
 
-                    try:
-                        accidents = 0.000001 * (city.data.distance / city.data.hours) * distance
-                    except ZeroDivisionError:
-                        accidents = 0.000001 * self.road_data[pair].speed_limit * distance
+    def alternatives(self, start, end, opt, k):
+        """
+        Find up to k loopless routes between the given cities, best first.
+        See k_shortest.py.
+        :param start: Name of the starting city, or 'lat,lng'.
+        :param end: Name of the ending city, or 'lat,lng'.
+        :param opt: Optimization method the routes are ranked by.
+        :param k: Most routes to return.
+        :return: list of Node.
+        """
+        return KShortestSearch(self.road_network, start=self.resolve(start),
+                               end=self.resolve(end), opt=opt, k=k).solve()
 
-                    successor.hofs = {'segments': 1, 'distance': distance,
-                                      'time': hours, 'cycling': accidents}[self.cost_function]
+    def reachable(self, start, budget, measure='hours'):
+        """
+        Yield (city name, cost, parent city name) for every city reachable
+        from the given city within the budget, cheapest first. See
+        isochrone.py.
+        :param start: Name of the starting city, or 'lat,lng'.
+        :param budget: Largest cost to include, in the units of the measure.
+        :param measure: One of isochrone.MEASURES.
+        """
+        return reachable(self.road_network, self.resolve(start), budget, measure)
 
-                    successors.append(successor)
+    def pareto(self, start, end, *, max_labels=DEFAULT_MAX_LABELS, deadline=DEFAULT_DEADLINE):
+        """
+        Find every route between the given cities that no other route beats
+        in distance, time and cycling accidents at once. See pareto.py.
+        :param start: Name of the starting city, or 'lat,lng'.
+        :param end: Name of the ending city, or 'lat,lng'.
+        :param max_labels: See ParetoSearch.
+        :param deadline: See ParetoSearch.
+        :return: list of Node, ordered by distance.
+        """
+        return ParetoSearch(self.road_network, start=self.resolve(start),
+                            end=self.resolve(end), max_labels=max_labels,
+                            deadline=deadline).solve()
 
-        return successors
+    def solve(self, *, deadline=None):
+        """
+        Find the best route between the start city and end city or fail.
+        :param deadline: See route().
+        :return:
+        """
+        return self.route(self.start_city_name, self.end_city_name, self.cost_function,
+                          deadline=deadline)
@@ -1,6 +1,18 @@
-from route_solver import RouteSolver
+from batch import read_queries, run_batch
+from pareto import ParetoSearch
+from profiling import PROFILERS, profile
+from route_cache import RouteCache
+from route_solver import ALGORITHMS, RouteSolver
+import json
+import logging
+import logging.config
+import os
+import sys
 import time
 import argparse
+import config
+
+logger = logging.getLogger('runner')
 
 
 def setup():
@@ -11,17 +23,159 @@ def setup():
         description=f'This program finds a best route between two U.S. cities.'
     )
 
-    ap.add_argument('--start', help='The starting city.', required=True)
-    ap.add_argument('--end', help='The ending city.', required=True)
+    ap.add_argument('--start', help='The starting city, or lat,lng for the nearest city.')
+    ap.add_argument('--end', help='The ending city, or lat,lng for the nearest city.')
     ap.add_argument('--opt', help='The choice of optimization:'
                                   '\n\tsegments.... fewest connecting roads,'
                                   '\n\tdistance.... shortest distance'
                                   '\n\ttime........ fastest time'
                                   '\n\taccidents... lowest-probability (cycling)')
+    ap.add_argument('--algorithm', default='astar', choices=list(ALGORITHMS),
+                    help='The search algorithm (default: astar).')
+    ap.add_argument('--batch', metavar='FILE',
+                    help='Answer the CSV or JSONL queries in FILE, or - for stdin,'
+                         ' and write JSONL results to stdout. --opt and'
+                         ' --algorithm are the defaults for queries without them.')
+    ap.add_argument('--format', choices=['csv', 'jsonl'],
+                    help='Format of the batch queries (default: from the first line).')
+    ap.add_argument('--workers', type=int, default=1,
+                    help='Worker processes for --batch; 0 for one per CPU (default: 1).')
+    ap.add_argument('--cache', action='store_true',
+                    help='Reuse results stored by earlier runs, and store new ones.')
+    ap.add_argument('--k', type=int, default=1,
+                    help='List up to this many alternative routes, best first (default: 1).')
+    ap.add_argument('--pareto', action='store_true',
+                    help='List every route that no other route beats in distance,'
+                         ' time and cycling accidents at once; --opt is not needed.')
+    ap.add_argument('--deadline', type=float, metavar='SECONDS',
+                    help='Return the best route found within SECONDS, with a bound on'
+                         ' how far from the best it can be. Implies --algorithm anytime.')
+    ap.add_argument('--max-frontier', type=int, metavar='N',
+                    help='Stop once N cities are queued, keeping the best route found.'
+                         ' Implies --algorithm anytime.')
+    ap.add_argument('--max-closed', type=int, metavar='N',
+                    help='Stop once N cities are expanded in a pass, keeping the best'
+                         ' route found. Implies --algorithm anytime.')
+    ap.add_argument('--stats', action='store_true',
+                    help='Print search counters and timings, and log them.')
+    ap.add_argument('--profile', choices=PROFILERS,
+                    help='Profile loading and searching with cProfile or tracemalloc.')
+    ap.add_argument('--profile-output', metavar='FILE',
+                    help='Where --profile writes (default: route-solver.prof for cprofile,'
+                         ' route-solver.tracemalloc.txt for tracemalloc).')
 
     args = ap.parse_args()
+    if args.batch is None and not (args.start and args.end):
+        ap.error('--start and --end are required without --batch')
+
+    limits = {'deadline': args.deadline, 'max_frontier': args.max_frontier,
+              'max_closed': args.max_closed}
+    if any(value is not None for value in limits.values()):
+        if args.algorithm not in ('astar', 'anytime'):
+            ap.error('--deadline, --max-frontier and --max-closed need --algorithm anytime')
+        if args.batch is not None or args.cache or args.k > 1 or args.pareto:
+            ap.error('--deadline, --max-frontier and --max-closed apply to a single search')
+        args.algorithm = 'anytime'
+    if args.stats and (args.batch is not None or args.cache or args.k > 1 or args.pareto):
+        ap.error('--stats applies to a single search without --cache')
+    if args.profile and (args.batch is not None or args.k > 1 or args.pareto):
+        ap.error('--profile applies to a single search')
+
+    return {'start': args.start, 'end': args.end, 'opt': args.opt,
+            'algorithm': args.algorithm, 'batch': args.batch,
+            'format': args.format, 'workers': args.workers, 'cache': args.cache,
+            'k': args.k, 'pareto': args.pareto, 'stats': args.stats, **limits,
+            'profile': args.profile,
+            'profile_output': args.profile_output or {
+                'cprofile': 'route-solver.prof',
+                'tracemalloc': 'route-solver.tracemalloc.txt'}.get(args.profile)}
+
+
+def resolve(solver, params):
+    """Replace params['start'] and params['end'] with the cities they stand for,
+    saying which city was chosen for a lat,lng point. Exit with the reason if
+    either is unknown.
+    """
+    for key in ('start', 'end'):
+        try:
+            city = solver.resolve(params[key])
+        except ValueError as e:
+            sys.exit(str(e))
+        if city != params[key]:
+            print(f'Nearest city to {params[key]}: {city.replace("_", " ")}.')
+        params[key] = city
+
+
+def pareto(params):
+    """Print the Pareto set of routes between params['start'] and params['end'].
+    """
+    solver = RouteSolver()
+    resolve(solver, params)
+    start_time = time.time()
+    search = ParetoSearch(solver.road_network, start=params['start'], end=params['end'])
+    routes = search.solve()
+    calc_time = time.time() - start_time
+
+    print('********* ROUTE SOLVER STARTING *********')
+    print(f'Searching for routes between {params["start"].replace("_", " ")} and '
+          f'{params["end"].replace("_", " ")}.')
+    print('Finding every best trade-off of distance, time and cycling accidents.')
+    print(f'Found {len(routes)} routes in {round(calc_time, 4)} seconds.')
+    if not search.complete:
+        if len(search.labels) >= search.max_labels:
+            reason = f'{search.max_labels} labels'
+        else:
+            reason = f'the {search.deadline}-second deadline'
+        print(f'Stopped at {reason}; more trade-offs may exist.')
+
+    print_routes(routes)
+    print('********* ROUTE SOLVER FINISHED *********')
+
+
+def alternatives(params, opt_string):
+    """Print up to params['k'] routes between params['start'] and params['end'].
+    """
+    solver = RouteSolver()
+    resolve(solver, params)
+    start_time = time.time()
+    routes = solver.alternatives(params['start'], params['end'], params['opt'], params['k'])
+    calc_time = time.time() - start_time
+
+    print('********* ROUTE SOLVER STARTING *********')
+    print(f'Searching for routes between {params["start"].replace("_", " ")} and '
+          f'{params["end"].replace("_", " ")}.')
+    print(opt_string)
+    print(f'Found {len(routes)} routes in {round(calc_time, 4)} seconds.')
+    print_routes(routes)
+    print('********* ROUTE SOLVER FINISHED *********')
+
+
+def print_routes(routes):
+    """Print the totals and cities of each of the given routes.
+    """
+    for number, route in enumerate(routes, 1):
+        print(f'ROUTE {number}:')
+        print(f'\tRoad segments:\t{route.data.segments}')
+        print(f'\tDistance: \t{route.data.distance} miles')
+        print(f'\tTravel Time:\t{round(route.data.hours, 4)} hours')
+        print(f'\tExpected cycling accidents: {round(route.data.accidents, 6)}')
+        print('\tConnecting cities:\n\t\t' + list_to_str(route.path, delimiter='\n\t\t'))
+
 
-    return {'start': args.start, 'end': args.end, 'opt': args.opt}
+def batch(params):
+    """Answer the queries in params['batch'], reporting throughput on stderr.
+    """
+    f = sys.stdin if params['batch'] == '-' else open(params['batch'], newline='')
+    start_time = time.time()
+    with f:
+        queries = read_queries(f, format=params['format'], opt=params['opt'],
+                               algorithm=params['algorithm'])
+        count = run_batch(queries, sys.stdout, workers=params['workers'] or None,
+                          algorithm=params['algorithm'],
+                          cache=RouteCache() if params['cache'] else None)
+    calc_time = time.time() - start_time
+    print(f'Answered {count} queries in {round(calc_time, 4)} seconds '
+          f'({count / max(calc_time, 1e-9):.1f} queries/sec).', file=sys.stderr)
 
 
 def list_to_str(list_, *, end_line=False, delimiter=None):
@@ -37,7 +191,17 @@ def list_to_str(list_, *, end_line=False, delimiter=None):
 
 if __name__ == "__main__":
     params = setup()
-    solver = RouteSolver(start=params['start'], end=params['end'], opt=params['opt'])
+    if params['batch'] is not None:
+        batch(params)
+        sys.exit()
+    if params['pareto']:
+        pareto(params)
+        sys.exit()
+
+    if params['stats'] or params['profile']:
+        logging.config.fileConfig(os.path.join(config.ROOT_PATH, config.LOG_CONFIG),
+                                  defaults=config.LOG_DEFAULT,
+                                  disable_existing_loggers=False)
 
     opt_string = {
         'segments': 'Optimizing for fewest connecting roads.',
@@ -46,6 +210,10 @@ if __name__ == "__main__":
         'accidents': 'Optimizing for smallest probability of a bicycling accident.'
     }[params['opt']]
 
+    if params['k'] > 1:
+        alternatives(params, opt_string)
+        sys.exit()
+
     starting_at = params['start'].replace('_', ' ')
     ending_at = params['end'].replace('_', ' ')
 
@@ -53,10 +221,53 @@ if __name__ == "__main__":
     print('********* ROUTE SOLVER STARTING *********')
     print(f'Searching for route between {starting_at} and {ending_at}.')
     print(opt_string)
-    solution = solver.solve()
+    with profile(params['profile'], params['profile_output']):
+        solver = RouteSolver(start=params['start'], end=params['end'], opt=params['opt'],
+                             algorithm=params['algorithm'],
+                             cache=RouteCache() if params['cache'] else None)
+        resolve(solver, params)
+        search_start_time = time.time()
+        if solver.cache is None:
+            if params['algorithm'] == 'anytime':
+                search = solver.search(params['start'], params['end'], params['opt'],
+                                       timed=params['stats'],
+                                       max_frontier=params['max_frontier'],
+                                       max_closed=params['max_closed'])
+                solution = search.solve(params['deadline'])
+            else:
+                search = solver.search(params['start'], params['end'], params['opt'],
+                                       timed=params['stats'])
+                solution = search.solve()
+        else:
+            solution = solver.route(params['start'], params['end'], params['opt'])
     end_time = time.time()
     calc_time = end_time - start_time
-    print(f'Found solution in {round(calc_time, 4)} seconds.')
+    # An anytime search cut short by its deadline or a size cap proves nothing
+    # about a route it has not found.
+    stopped = params['algorithm'] == 'anytime' and solver.cache is None and not search.finished
+    reason = 'a size cap' if stopped and search.capped else 'the deadline'
+    if solution is None and stopped:
+        print(f'Stopped at {reason} after {round(end_time - search_start_time, 4)} seconds '
+              f'({round(calc_time, 4)} seconds including startup), before finding a route.')
+    else:
+        print(f'Found solution in {round(end_time - search_start_time, 4)} seconds '
+              f'({round(calc_time, 4)} seconds including startup).')
+    if solver.cache is None:
+        print(f'Expanded {search.expanded} cities ({params["algorithm"]}).')
+        if stopped and solution is not None and search.bound > 1:
+            print(f'Stopped at {reason}; the route costs at most '
+                  f'{search.bound:.4f} times the best.')
+        if params['stats']:
+            stats = search.stats
+            stats.load_seconds = solver.load_seconds
+            print('STATS:\n\t' + list_to_str(stats.lines(), delimiter='\n\t'))
+            logger.info('search stats %s', json.dumps({
+                'start': params['start'], 'end': params['end'], 'opt': params['opt'],
+                'algorithm': params['algorithm'], **stats.as_dict()}))
+    else:
+        stats = solver.cache.stats()
+        print(f'Cache: {stats["memory_hits"] + stats["disk_hits"]} hits '
+              f'({stats["reversed_hits"]} reversed), {stats["misses"]} misses.')
     print(f'SOLUTION:')
 
     if solution is not None:
@@ -71,6 +282,8 @@ if __name__ == "__main__":
         output.append(route)
 
         print(list_to_str(output))
+    elif stopped:
+        print(f'No route found before {reason}.')
     else:
         print('No solution.')
     print('********* ROUTE SOLVER FINISHED *********')
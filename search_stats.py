@@ -0,0 +1,67 @@
+"""Counters and timings describing how a search ran.
+"""
+
+# (attribute, label) for each counter, in report order.
+COUNTERS = (
+    ('expanded', 'Cities expanded'),
+    ('generated', 'Successors generated'),
+    ('pushes', 'Frontier pushes'),
+    ('pops', 'Frontier pops'),
+    ('stale_pops', 'Stale pops'),
+    ('peak_frontier', 'Peak frontier size'),
+    ('peak_closed', 'Peak closed-set size'),
+)
+
+# (attribute, label) for each timing, in seconds, in report order.
+TIMINGS = (
+    ('load_seconds', 'Loading the network'),
+    ('heuristic_seconds', 'Heuristic evaluation'),
+    ('successor_seconds', 'Successor generation'),
+    ('queue_seconds', 'Queue operations'),
+    ('solve_seconds', 'Whole search'),
+)
+
+
+class SearchStats:
+    """A class to hold the counters and timings of one search.
+
+    Heuristic time includes precomputing the heuristic when the search is
+    created. Successor time excludes the heuristic calls made while
+    generating successors. Load time is the time the solver took to load the
+    network, which every search it runs shares.
+    """
+
+    def __init__(self, **values):
+        """Initialize an instance of this class.
+
+        Parameters:
+            values: Initial value of any attribute in COUNTERS or TIMINGS;
+                         the rest start at 0.
+        """
+        for attribute, _ in COUNTERS + TIMINGS:
+            setattr(self, attribute, values.pop(attribute, 0))
+        if values:
+            raise TypeError(f'Unknown statistics: {", ".join(values)}')
+
+    def __add__(self, other):
+        """
+        Return the combined stats of two searches, such as the two sides of a
+        bidirectional search. Peaks are added too, since both sides hold their
+        frontier and closed set at once. Load time is shared, not added.
+        """
+        total = SearchStats(**{attribute: getattr(self, attribute) + getattr(other, attribute)
+                               for attribute, _ in COUNTERS + TIMINGS})
+        total.load_seconds = max(self.load_seconds, other.load_seconds)
+        return total
+
+    def as_dict(self):
+        return {attribute: getattr(self, attribute) for attribute, _ in COUNTERS + TIMINGS}
+
+    def lines(self):
+        """
+        Return the report as a list of lines.
+        """
+        lines = [f'{label + ":":<24}{getattr(self, attribute)}' for attribute, label in COUNTERS]
+        lines += [f'{label + ":":<24}{getattr(self, attribute) * 1e3:.3f} ms'
+                  for attribute, label in TIMINGS]
+        return lines
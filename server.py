@@ -0,0 +1,236 @@
+"""A route-serving daemon.
+
+The server loads the road network once and answers requests over a local TCP
+or Unix socket. Each request is one line of JSON, and each response is one
+line of JSON:
+
+    {"start": "Madison,_Indiana", "end": "Chicago,_Illinois", "opt": "time"}
+
+A request may also name an "algorithm" and carry an "id", which is echoed
+back. {"command": "stats"} returns the server's counters instead of a route.
+
+Searches run in a pool of worker processes, forked after the solver is
+loaded, so they share its mapped network. At most --max-pending searches are
+queued or running at once; further requests wait for room. Identical
+requests that arrive while a search for them is running share its result,
+and recent results are kept in an LRU cache.
+
+    $> python3 server.py --port 8765 --workers 4
+    $> python3 server.py --unix /tmp/route-solver.sock
+"""
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import json
+import time
+import batch
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_MAX_PENDING = 64
+LATENCY_WINDOW = 10000      # Recent requests kept for latency percentiles.
+
+
+class ServerStats:
+    """A class to hold the counters reported by the stats command.
+    """
+
+    def __init__(self):
+        """Initialize an instance of this class.
+        """
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.coalesced = 0      # Requests that joined an in-flight search.
+        self.searches = 0       # Searches sent to the workers.
+        self.queue_depth = 0    # Searches queued or running now.
+        self.peak_queue_depth = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.started = time.time()
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1e3, 3)
+
+        return {'uptime': round(time.time() - self.started, 3),
+                'requests': self.requests, 'errors': self.errors,
+                'cache_hits': self.cache_hits, 'coalesced': self.coalesced,
+                'searches': self.searches, 'queue_depth': self.queue_depth,
+                'peak_queue_depth': self.peak_queue_depth,
+                'latency_ms': {'p50': percentile(0.50), 'p95': percentile(0.95),
+                               'p99': percentile(0.99),
+                               'max': percentile(1.00)}}
+
+
+class RouteServer:
+    """A class to answer route requests with coalescing and caching.
+    """
+
+    def __init__(self, executor, *, cache_size=DEFAULT_CACHE_SIZE,
+                 max_pending=DEFAULT_MAX_PENDING):
+        """Initialize an instance of this class.
+
+        Parameters:
+            executor: A concurrent.futures executor whose workers answer with
+                         batch.answer().
+            cache_size: Number of results kept in the LRU cache; 0 disables it.
+            max_pending: Most searches queued or running at once.
+        """
+        self.executor = executor
+        self.cache_size = cache_size
+        self.cache = OrderedDict()      # Query key -> result dict.
+        self.in_flight = dict()         # Query key -> asyncio.Future.
+        self.pending = asyncio.Semaphore(max_pending)
+        self.stats = ServerStats()
+
+    @staticmethod
+    def key(query):
+        return query['start'], query['end'], query['opt'], query.get('algorithm')
+
+    async def answer(self, query):
+        """
+        Return the result dict for the given query, from the cache, from a
+        search already running for the same query, or from a new search.
+        """
+        key = self.key(query)
+
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.stats.cache_hits += 1
+            return self.cache[key]
+
+        if key in self.in_flight:
+            self.stats.coalesced += 1
+            return await asyncio.shield(self.in_flight[key])
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await self.search(query)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()      # Consumed here when nobody joined.
+            raise
+        finally:
+            del self.in_flight[key]
+
+        future.set_result(result)
+        if self.cache_size > 0 and 'error' not in result:
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result
+
+    async def search(self, query):
+        stats = self.stats
+        async with self.pending:
+            stats.searches += 1
+            stats.queue_depth += 1
+            stats.peak_queue_depth = max(stats.peak_queue_depth, stats.queue_depth)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self.executor, batch.answer, query)
+            finally:
+                stats.queue_depth -= 1
+
+    async def respond(self, line):
+        """
+        Return the response dict for one request line.
+        """
+        start_time = time.perf_counter()
+        self.stats.requests += 1
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError(f'expected an object, not {request!r}')
+        except ValueError as e:
+            self.stats.errors += 1
+            return {'error': f'Malformed request: {e}'}
+
+        if request.get('command') == 'stats':
+            return self.stats.as_dict()
+
+        query = {'start': request.get('start'), 'end': request.get('end'),
+                 'opt': request.get('opt'), 'algorithm': request.get('algorithm')}
+
+        # Checked before key(), which needs hashable fields.
+        error = batch.query_error(query)
+        if error is not None:
+            query['error'] = error
+            response = batch.answer(query)
+        else:
+            try:
+                response = dict(await self.answer(query))
+            except Exception as e:
+                response = {'start': query['start'], 'end': query['end'],
+                            'opt': query['opt'], 'error': f'Request failed: {e!r}'}
+
+        if 'error' in response:
+            self.stats.errors += 1
+        if 'id' in request:
+            response['id'] = request['id']
+        self.stats.record(time.perf_counter() - start_time)
+        return response
+
+    async def handle(self, reader, writer):
+        """
+        Answer the requests on one connection, one per line, in order.
+        """
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                response = await self.respond(line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    batch.init_worker({'algorithm': args.algorithm})
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=batch.init_worker,
+                             initargs=({'algorithm': args.algorithm},)) as executor:
+        route_server = RouteServer(executor, cache_size=args.cache_size,
+                                   max_pending=args.max_pending)
+        if args.unix:
+            server = await asyncio.start_unix_server(route_server.handle, path=args.unix)
+        else:
+            server = await asyncio.start_server(route_server.handle, args.host, args.port)
+
+        addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+        print(f'Serving routes on {addresses} with {args.workers} workers.', flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description='Serve route requests over a local socket.')
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8765)
+    ap.add_argument('--unix', metavar='PATH', help='Listen on a Unix socket instead.')
+    ap.add_argument('--workers', type=int, default=1,
+                    help='Worker processes (default: 1).')
+    ap.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING,
+                    help=f'Most searches queued or running (default: {DEFAULT_MAX_PENDING}).')
+    ap.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                    help=f'Results kept in the LRU cache (default: {DEFAULT_CACHE_SIZE}).')
+    ap.add_argument('--algorithm', default='astar',
+                    help='Algorithm for requests that do not name one (default: astar).')
+    args = ap.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
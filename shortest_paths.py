@@ -0,0 +1,53 @@
+"""One-to-all shortest path searches over a RoadNetwork.
+"""
+from array import array
+from heapq import heappop, heappush
+from math import inf
+
+
+def dijkstra(road_network, source, costs, limit=inf):
+    """
+    Yield (city id, cost, parent city id, road id) for every city reachable
+    from the source, in order of increasing cost. The source is yielded first
+    with parent and road -1. Each city is yielded once, when its cost is
+    final.
+    :param road_network: type RoadNetwork.
+    :param source: city id to search from.
+    :param costs: road id -> cost, e.g. road_network.costs(opt).
+    :param limit: cities costing more than this are neither yielded nor
+                  queued.
+    """
+    offsets = road_network.offsets
+    targets = road_network.targets
+    edges = road_network.edges
+
+    best = {source: 0.00}
+    settled = set()
+    heap = [(0.00, source, -1, -1)]
+
+    while heap:
+        cost, city_id, parent, road_id = heappop(heap)
+        if city_id in settled:
+            continue
+        settled.add(city_id)
+        yield city_id, cost, parent, road_id
+
+        for k in range(offsets[city_id], offsets[city_id + 1]):
+            neighbor_id = targets[k]
+            if neighbor_id in settled:
+                continue
+            candidate = cost + costs[edges[k]]
+            if candidate <= limit and candidate < best.get(neighbor_id, inf):
+                best[neighbor_id] = candidate
+                heappush(heap, (candidate, neighbor_id, city_id, edges[k]))
+
+
+def one_to_all(road_network, source, costs):
+    """
+    Return an array of the cost from the source to every city, inf for
+    cities that cannot be reached.
+    """
+    distances = array('d', [inf]) * len(road_network)
+    for city_id, cost, _, _ in dijkstra(road_network, source, costs):
+        distances[city_id] = cost
+    return distances
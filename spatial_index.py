@@ -0,0 +1,258 @@
+"""Nearest-city lookup by latitude and longitude.
+
+CityIndex is a k-d tree over the cities in the city GPS file. The earth is
+not flat, so each city is stored as a point on the unit sphere in 3-D. The
+straight-line distance between two such points grows with the great-circle
+distance between the cities, so the nearest cities by the one are the
+nearest by the other, and the tree's axis-aligned bounds prune exactly. A
+query visits O(log n) cities on typical data.
+
+nearest_many() answers a batch of points at once. With NumPy it compares each
+point with every city in one matrix product, which costs more arithmetic
+than walking the tree but none of its per-city Python overhead.
+
+    $> python3 spatial_index.py 39.17,-86.53 41.88,-87.63 --k 3
+"""
+from array import array
+from heapq import heappop, heappush, heapreplace
+from heuristics import great_circle
+from math import cos, radians, sin
+import argparse
+import graph_cache
+
+try:
+    import numpy as np
+except ImportError:     # pragma: no cover - exercised only without NumPy.
+    np = None
+
+LEAF_SIZE = 8
+BATCH_ROWS = 1024    # Points per matrix product in nearest_many().
+
+
+def unit_vector(lat, lng):
+    """
+    Return the (x, y, z) point on the unit sphere for the given coordinates,
+    in degrees.
+    """
+    lat = radians(lat)
+    lng = radians(lng)
+    return cos(lat) * cos(lng), cos(lat) * sin(lng), sin(lat)
+
+
+def parse_point(text):
+    """
+    Return (lat, lng) if the given text is a 'lat,lng' pair in degrees, or
+    None if it is not, e.g. because it is a city name.
+    """
+    fields = text.split(',')
+    if len(fields) != 2:
+        return None
+    try:
+        lat, lng = float(fields[0]), float(fields[1])
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+class CityIndex:
+    """A class to find the cities nearest to a point.
+
+    Junctions, which have no GPS row, are not indexed.
+    """
+
+    def __init__(self, road_network, *, leaf_size=LEAF_SIZE):
+        """Initialize an instance of this class.
+
+        The tree is stored in flat arrays. Node i covers positions
+        node_start[i] through node_end[i] - 1 of cities. An inner node splits
+        them on node_axis[i] at node_split[i] into children node_left[i] and
+        node_left[i] + 1; a leaf has node_axis[i] == -1.
+
+        Parameters:
+            road_network: The RoadNetwork whose cities are indexed. Only the
+                         coordinates are read.
+            leaf_size: Most cities in a leaf.
+        """
+        self.road_network = road_network
+        self.cities = array('i', (city_id for city_id in range(len(road_network))
+                                  if road_network.has_coordinates(city_id)))
+        vectors = [unit_vector(road_network.lat[city_id], road_network.lng[city_id])
+                   for city_id in self.cities]
+        self.points = tuple(array('d', (vector[axis] for vector in vectors))
+                            for axis in range(3))   # Axis -> coordinate, by position in cities.
+
+        self.node_start = array('i')
+        self.node_end = array('i')
+        self.node_axis = array('b')
+        self.node_split = array('d')
+        self.node_left = array('i')
+        self.build(leaf_size)
+
+        self.matrix = None  # Initialized by self.nearest_many() with NumPy.
+
+    def __len__(self):
+        return len(self.cities)
+
+    def add_node(self, start, end):
+        self.node_start.append(start)
+        self.node_end.append(end)
+        self.node_axis.append(-1)
+        self.node_split.append(0.00)
+        self.node_left.append(-1)
+        return len(self.node_start) - 1
+
+    def build(self, leaf_size):
+        """
+        Build the tree, splitting each node at the median of its widest axis
+        until no leaf holds more than leaf_size cities.
+        """
+        cities = self.cities
+        points = self.points
+        order = list(range(len(cities)))   # Position in the tree -> position in cities.
+        stack = [self.add_node(0, len(cities))] if len(cities) else []
+
+        while stack:
+            node = stack.pop()
+            start = self.node_start[node]
+            end = self.node_end[node]
+            if end - start <= leaf_size:
+                continue
+
+            axis = max(range(3), key=lambda a: (max(points[a][i] for i in order[start:end])
+                                                - min(points[a][i] for i in order[start:end])))
+            order[start:end] = sorted(order[start:end], key=points[axis].__getitem__)
+            middle = (start + end) // 2
+
+            self.node_axis[node] = axis
+            self.node_split[node] = points[axis][order[middle]]
+            self.node_left[node] = self.add_node(start, middle)
+            self.add_node(middle, end)
+            stack.append(self.node_left[node])
+            stack.append(self.node_left[node] + 1)
+
+        self.cities = array('i', (cities[i] for i in order))
+        self.points = tuple(array('d', (values[i] for i in order)) for values in points)
+
+    def nearest(self, lat, lng, k=1):
+        """
+        Return the k cities nearest the given point.
+        :param lat: Latitude in degrees.
+        :param lng: Longitude in degrees.
+        :param k: Number of cities.
+        :return: list of (city name, miles), nearest first.
+        """
+        return self.results(lat, lng, self.nearest_positions(unit_vector(lat, lng), k))
+
+    def nearest_positions(self, point, k):
+        """
+        Return [(squared chord distance, position in self.cities)] for the k
+        cities nearest the given unit vector, nearest first.
+        """
+        xs, ys, zs = self.points
+        px, py, pz = point
+        node_axis = self.node_axis
+        node_split = self.node_split
+        node_left = self.node_left
+
+        best = list()   # Max-heap of (-squared distance, position) of the k best so far.
+        stack = [(0.00, 0)] if len(self.cities) and k > 0 else []
+
+        while stack:
+            bound, node = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+
+            axis = node_axis[node]
+            if axis < 0:
+                for i in range(self.node_start[node], self.node_end[node]):
+                    d = (xs[i] - px) ** 2 + (ys[i] - py) ** 2 + (zs[i] - pz) ** 2
+                    if len(best) < k:
+                        heappush(best, (-d, i))
+                    elif d < -best[0][0]:
+                        heapreplace(best, (-d, i))
+                continue
+
+            # Visit the side holding the point first; the other side is at
+            # least the distance to the splitting plane away.
+
+            offset = point[axis] - node_split[node]
+            near = node_left[node] + (offset >= 0)
+            far = node_left[node] + (offset < 0)
+            stack.append((max(bound, offset * offset), far))
+            stack.append((bound, near))
+
+        result = list()
+        while best:
+            d, i = heappop(best)
+            result.append((-d, i))
+        result.reverse()
+        return result
+
+    def results(self, lat, lng, positions):
+        """
+        Return (city name, miles from the given point) for each of the given
+        (distance, position in self.cities) pairs.
+        """
+        network = self.road_network
+        return [(network.names[self.cities[i]],
+                 great_circle(lat, lng, network.lat[self.cities[i]], network.lng[self.cities[i]]))
+                for _, i in positions]
+
+    def nearest_many(self, points, k=1):
+        """
+        Return the k cities nearest each of the given points.
+        :param points: Iterable of (lat, lng) in degrees.
+        :param k: Number of cities per point.
+        :return: list with one list of (city name, miles) per point, nearest
+                 first, as nearest() returns.
+        """
+        points = list(points)
+        if np is None or k <= 0 or not len(self.cities):
+            return [self.nearest(lat, lng, k) for lat, lng in points]
+
+        if self.matrix is None:
+            self.matrix = np.column_stack([np.frombuffer(values, dtype=np.float64)
+                                           for values in self.points])
+
+        # On the unit sphere |p - c|^2 = 2 - 2 p.c, so the nearest cities are
+        # those with the largest dot products.
+
+        k = min(k, len(self.cities))
+        results = list()
+        for first in range(0, len(points), BATCH_ROWS):
+            block = points[first:first + BATCH_ROWS]
+            lat = np.radians([lat for lat, _ in block])
+            lng = np.radians([lng for _, lng in block])
+            vectors = np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng),
+                                       np.sin(lat)))
+            dots = vectors @ self.matrix.T
+            if k < len(self.cities):
+                top = np.argpartition(-dots, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(k), (len(block), k))
+            ordered = np.take_along_axis(
+                top, np.argsort(-np.take_along_axis(dots, top, axis=1), axis=1), axis=1)
+
+            for (point_lat, point_lng), row in zip(block, ordered.tolist()):
+                results.append(self.results(point_lat, point_lng, [(None, i) for i in row]))
+        return results
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description='List the cities nearest to each lat,lng point.')
+    ap.add_argument('points', nargs='+', metavar='LAT,LNG')
+    ap.add_argument('--k', type=int, default=1, help='Cities per point (default: 1).')
+    args = ap.parse_args()
+
+    parsed = [parse_point(text) for text in args.points]
+    for text, point in zip(args.points, parsed):
+        if point is None:
+            ap.error(f'{text!r} is not a lat,lng point')
+
+    index = CityIndex(graph_cache.load_network())
+    for text, nearest in zip(args.points, index.nearest_many(parsed, args.k)):
+        print(text)
+        for name, miles in nearest:
+            print(f'\t{name}\t{miles:.2f} miles')